@@ -524,3 +524,253 @@ def linewidth_fwhm_err(cube, scale, how='auto', moment0=None, moment1=None,
                                          moment2, moment1_err)
 
     return SIGMA2FWHM * del_lwidth_sig
+
+
+def fused_moments(data, spectral_axis, scale, mask=None, pix_size=None,
+                  int_threshold=None, chunk_size=8):
+    '''
+    Compute the first three moments, the integrated intensity and their
+    errors with a single pass over the spectral axis.
+
+    The cube is read `chunk_size` channels at a time, so `data` can be a
+    memory-mapped array. Each pixel accumulates the sums of I, I * v and
+    I * v^2 over the spectrum, along with the sums of sigma^2 * v^p that the
+    error propagation in `moment0_error`, `moment1_error` and
+    `moment2_error` depends on.
+
+    Parameters
+    ----------
+    data : `~numpy.ndarray`
+        3D array with the spectral dimension first. NaNs are ignored. Any
+        object with a `shape` that returns arrays when sliced along the
+        first dimension can also be given.
+    spectral_axis : `~numpy.ndarray`
+        Spectral coordinate of each channel.
+    scale : float or `~numpy.ndarray`
+        The noise level in the data, either as a single value or an array
+        with the same shape as `data`.
+    mask : `~numpy.ndarray`, optional
+        Boolean array of the voxels to include.
+    pix_size : float, optional
+        Channel width. Defaults to the spacing of `spectral_axis`.
+    int_threshold : float, optional
+        Channels whose peak is above this value set the range used for the
+        integrated intensity. The longest continuous set of channels is
+        used. The integrated intensity is not computed when this is not
+        given.
+    chunk_size : int, optional
+        Number of channels to read at once.
+
+    Returns
+    -------
+    results : dict
+        Contains 'moment0', 'moment1', 'moment2', 'linewidth' and their
+        errors (e.g., 'moment0_err'). When `int_threshold` is given,
+        'intint', 'intint_err' and 'channel_range' (the first and last
+        channels used) are also included.
+    '''
+
+    nchan = data.shape[0]
+    shp = data.shape[1:]
+
+    spectral_axis = np.asarray(spectral_axis, dtype=np.float64)
+
+    if pix_size is None:
+        pix_size = np.abs(spectral_axis[1] - spectral_axis[0]) \
+            if nchan > 1 else 1.
+
+    # Offsets from the first channel, as in cube._pix_cen.
+    offsets = spectral_axis - spectral_axis[0]
+
+    scale_cube = len(getattr(scale, 'shape', ())) == 3
+    if scale_cube and tuple(scale.shape) != tuple(data.shape):
+        raise IndexError("When scale is an array, it must have the"
+                         " same shape as the data.")
+
+    chunk_size = max(int(chunk_size), 1)
+
+    sum0 = np.zeros(shp)
+    sum1 = np.zeros(shp)
+    sum2 = np.zeros(shp)
+    count = np.zeros(shp, dtype=np.int64)
+    # Sum of the noise variance over the included voxels
+    noise_sum = np.zeros(shp)
+    # Sums of sigma^2 * v^p for p = 0 to 4 over all channels
+    noise_moments = np.zeros((5,) + shp)
+
+    channel_max = np.empty(nchan)
+
+    for start in range(0, nchan, chunk_size):
+        end = min(start + chunk_size, nchan)
+
+        plane, include, sigma2 = \
+            _fused_chunk(data, mask, scale, scale_cube, start, end)
+
+        chan_offs = offsets[start:end, np.newaxis, np.newaxis]
+
+        sum0 += plane.sum(0)
+        weighted = plane * chan_offs
+        sum1 += weighted.sum(0)
+        sum2 += (weighted * chan_offs).sum(0)
+
+        count += include.sum(0)
+
+        channel_max[start:end] = \
+            np.where(include, plane, -np.inf).reshape(end - start, -1).max(1)
+
+        if scale_cube:
+            noise_sum += (sigma2 * include).sum(0)
+
+            weighted = sigma2
+            for p in range(5):
+                noise_moments[p] += weighted.sum(0)
+                weighted = weighted * chan_offs
+
+    if not scale_cube:
+        noise_sum = count * scale ** 2
+
+        for p in range(5):
+            noise_moments[p] = scale ** 2 * np.sum(offsets ** p)
+
+    channel_max[~np.isfinite(channel_max)] = np.nan
+
+    valid = count > 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        moment0 = sum0 * pix_size
+        moment0[~valid] = np.nan
+
+        # Centroid offset from the first channel
+        cent = sum1 / sum0
+        moment2 = sum2 / sum0 - cent ** 2
+
+        moment0_err = np.sqrt(noise_sum) * pix_size
+        moment0_err[~valid] = np.nan
+
+        w0, w1, w2, w3, w4 = noise_moments
+
+        # sum(sigma^2 (v - M1)^2)
+        moment1_err = \
+            np.sqrt(np.maximum(w2 - 2 * cent * w1 + cent ** 2 * w0, 0.)) / \
+            np.abs(sum0)
+
+        # sum(sigma^2 ((v - M1)^2 - M2)^2)
+        const = cent ** 2 - moment2
+        term1 = w4 - 4 * cent * w3 + (4 * cent ** 2 + 2 * const) * w2 - \
+            4 * cent * const * w1 + const ** 2 * w0
+        term1 = np.maximum(term1, 0.) / sum0 ** 2
+        term2 = 4 * ((moment1_err * (sum1 - cent * sum0)) / sum0) ** 2
+
+        moment2_err = np.sqrt(term1 + term2)
+
+        linewidth = np.sqrt(moment2)
+        linewidth_err = moment2_err / (2 * linewidth)
+
+    results = {'moment0': moment0,
+               'moment1': cent + spectral_axis[0],
+               'moment2': moment2,
+               'linewidth': linewidth,
+               'moment0_err': moment0_err,
+               'moment1_err': moment1_err,
+               'moment2_err': moment2_err,
+               'linewidth_err': linewidth_err}
+
+    if int_threshold is None:
+        return results
+
+    good_channels = np.where(channel_max > int_threshold)[0]
+
+    if good_channels.size == 0:
+        raise ValueError("Cannot find any channels with signal.")
+
+    # Get the longest sequence
+    breaks = np.where(np.diff(good_channels) != 1)[0] + 1
+    sequences = np.split(good_channels, breaks)
+    longest = sequences[np.argmax([seq.size for seq in sequences])]
+
+    first, last = longest[0], longest[-1] + 1
+
+    # Only the channels inside or outside of the range are read again,
+    # whichever is fewer.
+    if last - first <= nchan // 2:
+        int_sum, int_count, int_noise = \
+            _fused_channel_sums(data, mask, scale, scale_cube, first, last,
+                                chunk_size)
+    else:
+        int_sum = sum0.copy()
+        int_count = count.copy()
+        int_noise = noise_sum.copy()
+        for start, end in [(0, first), (last, nchan)]:
+            out_sum, out_count, out_noise = \
+                _fused_channel_sums(data, mask, scale, scale_cube, start,
+                                    end, chunk_size)
+            int_sum -= out_sum
+            int_count -= out_count
+            int_noise -= out_noise
+
+    if not scale_cube:
+        int_noise = int_count * scale ** 2
+
+    int_valid = int_count > 0
+
+    intint = int_sum * pix_size
+    intint[~int_valid] = np.nan
+
+    intint_err = np.sqrt(np.maximum(int_noise, 0.)) * pix_size
+    intint_err[~int_valid] = np.nan
+
+    results['intint'] = intint
+    results['intint_err'] = intint_err
+    results['channel_range'] = (longest[0], longest[-1])
+
+    return results
+
+
+def _fused_chunk(data, mask, scale, scale_cube, start, end):
+    '''
+    Read a chunk of channels and return the data with excluded voxels set
+    to zero, the included voxels, and the noise variance.
+    '''
+
+    chunk = np.asarray(data[start:end], dtype=np.float64)
+
+    include = np.isfinite(chunk)
+    if mask is not None:
+        include &= np.asarray(mask[start:end], dtype=bool)
+
+    plane = np.where(include, chunk, 0.)
+
+    if scale_cube:
+        sigma2 = np.nan_to_num(np.asarray(scale[start:end],
+                                          dtype=np.float64)) ** 2
+    else:
+        sigma2 = None
+
+    return plane, include, sigma2
+
+
+def _fused_channel_sums(data, mask, scale, scale_cube, first, last,
+                        chunk_size):
+    '''
+    Sum of the data, number of included voxels and sum of the noise
+    variance over a range of channels.
+    '''
+
+    shp = data.shape[1:]
+
+    data_sum = np.zeros(shp)
+    count = np.zeros(shp, dtype=np.int64)
+    noise_sum = np.zeros(shp)
+
+    for start in range(first, last, chunk_size):
+        end = min(start + chunk_size, last)
+
+        plane, include, sigma2 = \
+            _fused_chunk(data, mask, scale, scale_cube, start, end)
+
+        data_sum += plane.sum(0)
+        count += include.sum(0)
+        if scale_cube:
+            noise_sum += (sigma2 * include).sum(0)
+
+    return data_sum, count, noise_sum
@@ -3,7 +3,6 @@ from __future__ import print_function, absolute_import, division
 
 import numpy as np
 from astropy.io import fits
-from astropy.convolution import convolve
 import astropy.units as u
 from scipy import ndimage as nd
 import itertools as it
@@ -13,6 +12,7 @@ import os
 try:
     from spectral_cube import SpectralCube, LazyMask
     from spectral_cube.wcs_utils import drop_axis
+    from spectral_cube.lower_dimensional_structures import Projection
     spectral_cube_flag = True
 except ImportError:
     Warning("spectral-cube is not installed. Using Mask_and_Moments requires"
@@ -26,7 +26,9 @@ except ImportError:
     Warning("signal-id is not installed. Disabling associated functionality.")
     signal_id_flag = False
 
-from ._moment_errs import (moment0_error, moment1_error, linewidth_sigma_err)
+from ..statistics.stats_utils import parallel_map
+from ._moment_errs import (moment0_error, moment1_error, linewidth_sigma_err,
+                           fused_moments, np2wcs)
 
 
 class Mask_and_Moments(object):
@@ -49,9 +51,12 @@ class Mask_and_Moments(object):
     scale : `~astropy.units.Quantity`, optional
         The noise level in the cube. Overrides estimation using
         `signal_id <https://github.com/radio-astro-tools/signal-id>`_
-    moment_method : {'slice', 'cube', 'ray'}, optional
+    moment_method : {'slice', 'cube', 'ray', 'fused'}, optional
         The method to use for creating the moments. See the spectral-cube
-        docs for an explanation of the differences.
+        docs for an explanation of the differences. 'fused' computes all of
+        the moments and their errors in a single pass over the cube, reading
+        a few channels at a time
+        (see `~turbustat.data_reduction._moment_errs.fused_moments`).
     """
     def __init__(self, cube, noise_type='constant', clip=3, scale=None,
                  moment_method='slice'):
@@ -73,8 +78,9 @@ class Mask_and_Moments(object):
         self.noise_type = noise_type
         self.clip = clip
 
-        if moment_method not in ['slice', 'cube', 'ray']:
-            raise TypeError("Moment method must be 'slice', 'cube', or 'ray'.")
+        if moment_method not in ['slice', 'cube', 'ray', 'fused']:
+            raise TypeError("Moment method must be 'slice', 'cube', 'ray' or"
+                            " 'fused'.")
         self.moment_how = moment_method
 
         if scale is None:
@@ -149,18 +155,22 @@ class Mask_and_Moments(object):
             If enabled, the units of the arrays are kept.
         '''
 
-        self._moment0 = self.cube.moment0(axis=axis, how=self.moment_how)
-        self._moment1 = self.cube.moment1(axis=axis, how=self.moment_how)
-        self._linewidth = \
-            self.cube.linewidth_sigma(how=self.moment_how)
+        if self.moment_how == 'fused':
+            # The errors are computed in the same pass.
+            self._make_fused_moments(axis=axis)
+        else:
+            self._moment0 = self.cube.moment0(axis=axis, how=self.moment_how)
+            self._moment1 = self.cube.moment1(axis=axis, how=self.moment_how)
+            self._linewidth = \
+                self.cube.linewidth_sigma(how=self.moment_how)
 
-        # The 'how' is set directly in the int intensity function.
-        self._intint = self._get_int_intensity(axis=axis)
+            # The 'how' is set directly in the int intensity function.
+            self._intint = self._get_int_intensity(axis=axis)
 
         if not units:
             self._moment0 = self._moment0.value
             self._moment1 = self._moment1.value
-            self._moment2 = self._moment2.value
+            self._linewidth = self._linewidth.value
             self._intint = self._intint.value
 
     def make_moment_errors(self, axis=0):
@@ -173,6 +183,12 @@ class Mask_and_Moments(object):
             The axis to calculate the moments along.
         '''
 
+        if self.moment_how == 'fused':
+            # Already computed with the moments.
+            if not hasattr(self, "_moment0_err"):
+                self._make_fused_moments(axis=axis)
+            return
+
         self._moment0_err = moment0_error(self.cube, self.scale,
                                           how=self.moment_how, axis=axis)
         self._moment1_err = moment1_error(self.cube, self.scale,
@@ -187,6 +203,78 @@ class Mask_and_Moments(object):
 
         self._intint_err = self._get_int_intensity_err(axis=axis)
 
+    def _make_fused_moments(self, axis=0):
+        '''
+        Compute the moments, integrated intensity and their errors with
+        `~turbustat.data_reduction._moment_errs.fused_moments`.
+
+        Parameters
+        ----------
+        axis : int, optional
+            Must be the spectral axis (0).
+        '''
+
+        if axis != 0:
+            raise ValueError("The fused moments can only be computed along"
+                             " the spectral axis (axis=0).")
+
+        if isinstance(self.scale, SpectralCube):
+            if self.scale.shape != self.cube.shape:
+                raise IndexError("When scale is a SpectralCube, it must have"
+                                 " the same shape as the cube.")
+            scale = _FilledChannels(self.scale)
+        else:
+            scale = u.Quantity(self.scale, self.cube.unit).value
+
+        spec_unit = self.cube.spectral_axis.unit
+        int_unit = self.cube.unit * spec_unit
+
+        clip_level = u.Quantity(self.clip * self.scale, self.cube.unit)
+
+        if self.cube._mask is None:
+            mask = None
+        else:
+            mask = _MaskChannels(self.cube)
+
+        results = \
+            fused_moments(self.cube._data, self.cube.spectral_axis.value,
+                          scale, mask=mask,
+                          pix_size=self.cube._pix_size_slice(axis),
+                          int_threshold=clip_level.value)
+
+        chan_range = list(results['channel_range'])
+        self.channel_range = self.cube.spectral_axis[chan_range]
+
+        self._moment0 = self._to_projection(results['moment0'], int_unit, 0)
+        self._moment1 = self._to_projection(results['moment1'], spec_unit, 1)
+        self._linewidth = self._to_projection(results['linewidth'],
+                                              spec_unit, 2)
+        self._intint = self._to_projection(results['intint'], int_unit, 0)
+
+        self._moment0_err = self._to_projection(results['moment0_err'],
+                                                int_unit, 0)
+        self._moment1_err = self._to_projection(results['moment1_err'],
+                                                spec_unit, 1)
+        self._linewidth_err = self._to_projection(results['linewidth_err'],
+                                                  spec_unit, 2)
+        self._intint_err = self._to_projection(results['intint_err'],
+                                               int_unit, 0)
+
+    def _to_projection(self, arr, unit, order, axis=0):
+        '''
+        Return a moment array as a Projection, as spectral-cube does.
+        '''
+
+        meta = {'moment_order': order,
+                'moment_axis': axis,
+                'moment_method': self.moment_how}
+        meta.update(self.cube.meta.copy())
+
+        new_wcs = drop_axis(self.cube._wcs, np2wcs[axis])
+
+        return Projection(arr * unit, copy=False, wcs=new_wcs, meta=meta,
+                          header=self.cube._nowcs_header)
+
     @property
     def moment0(self):
         return self._moment0
@@ -549,33 +637,169 @@ class Mask_and_Moments(object):
         return moment0_error(slab, self.scale, axis=axis, how=self.moment_how)
 
 
-def moment_masking(cube, kernel_size, clip=5, dilations=1):
+def moment_masking(cube, kernel_size, clip=5, dilations=1, scale=None,
+                   chunk_size=32, n_jobs=1, packed=False,
+                   max_samples=1000000):
     '''
+    Create a signal mask by smoothing the cube, keeping voxels above
+    `clip` times the noise in the smoothed cube and dilating the result.
+
+    The cube is processed in slabs of `chunk_size` channels, each read with
+    enough neighbouring channels to make the smoothing and dilation exact.
+    The Gaussian kernel from `gauss_kern` is separable, so the smoothing is
+    applied one axis at a time. This gives the same result as a 3D
+    convolution with `~astropy.convolution.convolve` (including its
+    interpolation over NaNs).
+
+    Parameters
+    ----------
+    cube : `~spectral_cube.SpectralCube` or `~numpy.ndarray`
+        Data cube with the spectral axis first. A memory-mapped array can be
+        given.
+    kernel_size : int
+        Size of the Gaussian smoothing kernel (see `gauss_kern`).
+    clip : float, optional
+        Keep voxels in the smoothed cube above this multiple of the noise.
+    dilations : int, optional
+        Number of times to dilate the mask.
+    scale : float, optional
+        Noise level in the smoothed cube. When not given, this is estimated
+        from the median absolute deviation of up to `max_samples` evenly
+        spaced voxels in the smoothed cube.
+    chunk_size : int, optional
+        Number of channels in each slab.
+    n_jobs : int, optional
+        Number of threads used to process the slabs.
+    packed : bool, optional
+        Return the mask packed into bits along the last axis with
+        `~numpy.packbits`. Use `~numpy.unpackbits` along the last axis, and
+        trim to the cube shape, to recover the boolean mask.
+    max_samples : int, optional
+        Maximum number of voxels used to estimate the noise.
+
+    Returns
+    -------
+    mask : `~numpy.ndarray`
+        Boolean signal mask, or a `~numpy.uint8` array if `packed` is
+        enabled.
     '''
 
-    if not signal_id_flag:
-        raise ImportError("signal-id is not installed."
-                          " This function is not available.")
+    shape = cube.shape
+    nchan = shape[0]
+
+    size = int(kernel_size)
+    x = np.arange(-size, size + 1)
+    kern_1d = np.exp(-x ** 2 / float(size))
+    kern_1d /= kern_1d.sum()
 
-    smooth_data = convolve(cube.filled_data[:], gauss_kern(kernel_size))
+    chunk_size = max(int(chunk_size), 1)
+    slabs = [(start, min(start + chunk_size, nchan))
+             for start in range(0, nchan, chunk_size)]
 
-    fake_mask = LazyMask(np.isfinite, cube=cube)
+    if scale is None:
+        # Sample every `stride` voxel in the flattened cube.
+        stride = max(int(np.prod(shape)) // int(max_samples), 1)
+        plane_size = shape[1] * shape[2]
 
-    smooth_cube = SpectralCube(data=smooth_data, wcs=cube.wcs, mask=fake_mask)
+        def sample_slab(slab):
+            start, end = slab
+            smooth, good = _smooth_slab(cube, start, end, size, kern_1d)
 
-    smooth_scale = Noise(smooth_cube).scale
+            first = (-start * plane_size) % stride
+            samps = smooth.ravel()[first::stride]
+            return samps[good.ravel()[first::stride]]
 
-    mask = (smooth_cube > (clip * smooth_scale)).include()
+        samps = np.concatenate(parallel_map(sample_slab, slabs,
+                                            n_jobs=n_jobs,
+                                            use_threads=True))
 
-    # Now dilate the mask once
+        scale = 1.4826 * np.median(np.abs(samps - np.median(samps)))
 
     dilate_struct = nd.generate_binary_structure(3, 3)
-    mask = nd.binary_dilation(mask, structure=dilate_struct,
-                              iterations=dilations)
+    dilations = int(dilations)
+
+    if packed:
+        mask = np.zeros(shape[:2] + ((shape[2] + 7) // 8,), dtype=np.uint8)
+    else:
+        mask = np.zeros(shape, dtype=bool)
+
+    def mask_slab(slab):
+        start, end = slab
+
+        # Extend the slab so the dilation is exact within it
+        lower = max(start - dilations, 0)
+        upper = min(end + dilations, nchan)
+
+        smooth, good = _smooth_slab(cube, lower, upper, size, kern_1d)
+
+        slab_mask = good & (smooth > clip * scale)
+
+        if dilations > 0:
+            slab_mask = nd.binary_dilation(slab_mask,
+                                           structure=dilate_struct,
+                                           iterations=dilations)
+
+        slab_mask = slab_mask[start - lower:end - lower]
+
+        if packed:
+            mask[start:end] = np.packbits(slab_mask, axis=-1)
+        else:
+            mask[start:end] = slab_mask
+
+    parallel_map(mask_slab, slabs, n_jobs=n_jobs, use_threads=True)
 
     return mask
 
 
+def _smooth_slab(cube, start, end, size, kern_1d):
+    '''
+    Smooth channels `start` to `end` with the separable Gaussian kernel.
+    Returns the smoothed data and where the original data is finite.
+    '''
+
+    nchan = cube.shape[0]
+
+    lower = max(start - size, 0)
+    upper = min(end + size, nchan)
+
+    data = _read_channels(cube, lower, upper)
+
+    good = np.isfinite(data)
+    all_good = good.all()
+
+    if not all_good:
+        weights = good.astype(np.float64)
+        data = np.where(good, data, 0.)
+
+    # NaNs are interpolated over by normalizing by the smoothed weights.
+    # Outside the cube, the data is filled with zeros and counted as valid,
+    # as in astropy.convolution.convolve, so the weights are all 1 when
+    # there are no NaNs.
+    for axis in range(3):
+        data = nd.convolve1d(data, kern_1d, axis=axis, mode='constant',
+                             cval=0.)
+        if not all_good:
+            weights = nd.convolve1d(weights, kern_1d, axis=axis,
+                                    mode='constant', cval=1.)
+
+    keep = slice(start - lower, end - lower)
+
+    if all_good:
+        return data[keep], good[keep]
+
+    return data[keep] / weights[keep], good[keep]
+
+
+def _read_channels(cube, start, end):
+    '''
+    Read a range of channels from a SpectralCube or an array.
+    '''
+    if spectral_cube_flag and isinstance(cube, SpectralCube):
+        return np.asarray(cube.filled_data[start:end].value,
+                          dtype=np.float64)
+    return np.asarray(cube[start:end], dtype=np.float64)
+
+
 def gauss_kern(size, ysize=None, zsize=None):
     """ Returns a normalized 3D gauss kernel array for convolutions """
     size = int(size)
@@ -594,6 +818,32 @@ def gauss_kern(size, ysize=None, zsize=None):
     return g / g.sum()
 
 
+class _MaskChannels(object):
+    '''
+    Read the mask of a SpectralCube for a range of channels, so the whole
+    mask is never held in memory.
+    '''
+    def __init__(self, cube):
+        self.cube = cube
+        self.shape = cube.shape
+
+    def __getitem__(self, view):
+        return self.cube._mask.include(data=self.cube._data,
+                                       wcs=self.cube._wcs, view=(view,))
+
+
+class _FilledChannels(object):
+    '''
+    Read the filled data of a SpectralCube for a range of channels.
+    '''
+    def __init__(self, cube):
+        self.cube = cube
+        self.shape = cube.shape
+
+    def __getitem__(self, view):
+        return self.cube.filled_data[view].value
+
+
 def _try_remove_unit(arr):
     try:
         unit = arr.unit
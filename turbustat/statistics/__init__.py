@@ -14,3 +14,4 @@ from .pdf import *
 from .mahalanobis import *
 from .statistics_list import statistics_list, twoD_statistics_list
 from .lm_seg import Lm_Seg
+from .precision import set_precision, get_precision, precision_mode
@@ -0,0 +1,252 @@
+# Licensed under an MIT open source license - see LICENSE
+from __future__ import print_function, absolute_import, division
+
+import numpy as np
+import threading
+from collections import OrderedDict
+
+try:
+    from scipy.fft import next_fast_len
+except ImportError:
+    from scipy.fftpack import next_fast_len
+
+'''
+Apodizing windows to taper the edges of images before taking FFTs, and
+zero-padding to sizes with fast FFTs.
+'''
+
+apodize_kernels = ['tukey', 'hanning', 'splitcosinebell']
+
+
+def tukey_window(shape, alpha=0.5):
+    '''
+    Separable Tukey (tapered cosine) window.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the window.
+    alpha : float, optional
+        Fraction of each axis within the tapered region. 0 gives a
+        rectangular window and 1 gives a Hann window.
+
+    Returns
+    -------
+    window : `~numpy.ndarray`
+        The window with the given shape.
+    '''
+
+    if alpha < 0 or alpha > 1:
+        raise ValueError("alpha must be between 0 and 1.")
+
+    window = np.ones(shape)
+
+    for axis, size in enumerate(shape):
+        window_1D = _tukey_1D(size, alpha)
+
+        bcast = [np.newaxis] * len(shape)
+        bcast[axis] = slice(None)
+
+        window = window * window_1D[tuple(bcast)]
+
+    return window
+
+
+def _tukey_1D(size, alpha):
+
+    if alpha == 0 or size < 2:
+        return np.ones(size)
+
+    posn = np.arange(size) / float(size - 1)
+
+    window = np.ones(size)
+
+    lower = posn < alpha / 2.
+    upper = posn > 1 - alpha / 2.
+
+    window[lower] = 0.5 * (1 + np.cos(np.pi * (2 * posn[lower] / alpha - 1)))
+    window[upper] = \
+        0.5 * (1 + np.cos(np.pi * (2 * posn[upper] / alpha - 2 / alpha + 1)))
+
+    return window
+
+
+def hanning_window(shape):
+    '''
+    Separable Hanning window. Equivalent to a Tukey window with `alpha=1`.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the window.
+
+    Returns
+    -------
+    window : `~numpy.ndarray`
+        The window with the given shape.
+    '''
+    return tukey_window(shape, alpha=1.)
+
+
+def split_cosine_bell_window(shape, alpha=0.3, beta=0.0):
+    '''
+    Radial split cosine bell window. The window is one within a radius of
+    `beta` times half of the smallest axis, then tapers to zero with a cosine
+    over a further `alpha` times half of the smallest axis.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the 2D window.
+    alpha : float, optional
+        Fraction of the half-size within the tapered region.
+    beta : float, optional
+        Fraction of the half-size where the window is one.
+
+    Returns
+    -------
+    window : `~numpy.ndarray`
+        The window with the given shape.
+    '''
+
+    if len(shape) != 2:
+        raise ValueError("split_cosine_bell_window requires a 2D shape.")
+
+    yy, xx = np.mgrid[:shape[0], :shape[1]]
+    center = (np.array(shape) - 1) / 2.
+    dists = np.hypot(yy - center[0], xx - center[1])
+
+    half_size = (min(shape) + 1.) / 2.
+    r_inner = beta * half_size
+    r_taper = int(np.floor(alpha * half_size))
+    r_outer = r_inner + r_taper
+
+    window = np.ones(shape)
+    window[dists > r_outer] = 0.
+
+    if r_taper != 0:
+        taper = (dists >= r_inner) & (dists <= r_outer)
+        window[taper] = \
+            0.5 * (1 + np.cos(np.pi * (dists[taper] - r_inner) / r_taper))
+
+    return window
+
+
+# Windows are re-used by every statistic computed on the same shape.
+_window_cache = OrderedDict()
+_window_cache_lock = threading.Lock()
+WINDOW_CACHE_SIZE = 32
+
+
+def apodizing_window(shape, apodize_kernel='tukey', alpha=0.3, beta=0.0):
+    '''
+    Return an apodizing window, re-using a stored copy when the same window
+    has already been created. The returned array is read-only.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the window.
+    apodize_kernel : {'tukey', 'hanning', 'splitcosinebell'}, optional
+        Type of window.
+    alpha : float, optional
+        Taper fraction. See `tukey_window` and `split_cosine_bell_window`.
+    beta : float, optional
+        Inner flat fraction for the split cosine bell window.
+
+    Returns
+    -------
+    window : `~numpy.ndarray`
+        The window with the given shape.
+    '''
+
+    if apodize_kernel not in apodize_kernels:
+        raise ValueError("apodize_kernel must be one of {}. Given {}"
+                         .format(apodize_kernels, apodize_kernel))
+
+    # Only keep the parameters that change the window in the key.
+    if apodize_kernel == 'tukey':
+        params = (float(alpha),)
+    elif apodize_kernel == 'hanning':
+        params = ()
+    else:
+        params = (float(alpha), float(beta))
+
+    key = (tuple(shape), apodize_kernel, params)
+
+    with _window_cache_lock:
+        if key in _window_cache:
+            window = _window_cache.pop(key)
+            _window_cache[key] = window
+            return window
+
+    if apodize_kernel == 'tukey':
+        window = tukey_window(shape, alpha=alpha)
+    elif apodize_kernel == 'hanning':
+        window = hanning_window(shape)
+    else:
+        window = split_cosine_bell_window(shape, alpha=alpha, beta=beta)
+
+    window.flags.writeable = False
+
+    with _window_cache_lock:
+        _window_cache[key] = window
+        while len(_window_cache) > WINDOW_CACHE_SIZE:
+            _window_cache.popitem(last=False)
+
+    return window
+
+
+def fast_fft_shape(shape):
+    '''
+    Smallest shape, no smaller than `shape`, whose dimensions have fast FFTs.
+    '''
+    return tuple(next_fast_len(int(size)) for size in shape)
+
+
+def apodize_and_pad(data, apodize_kernel=None, alpha=0.3, beta=0.0,
+                    pad_to_fast_len=False):
+    '''
+    Apply an apodizing window to the last two axes of `data` and optionally
+    zero-pad those axes to sizes with fast FFTs.
+
+    Parameters
+    ----------
+    data : `~numpy.ndarray`
+        2D image or 3D cube.
+    apodize_kernel : {None, 'tukey', 'hanning', 'splitcosinebell'}, optional
+        Window to apply. No window is applied when None. The window is
+        divided by the square root of its mean squared value so that the
+        power spectrum amplitude is not lowered by the window.
+    alpha : float, optional
+        See `apodizing_window`.
+    beta : float, optional
+        See `apodizing_window`.
+    pad_to_fast_len : bool, optional
+        Zero-pad the end of the last two axes to sizes from
+        `~scipy.fft.next_fast_len`.
+
+    Returns
+    -------
+    out : `~numpy.ndarray`
+        The windowed and padded data. `data` is returned unchanged when
+        neither option is used.
+    '''
+
+    if apodize_kernel is not None:
+        window = apodizing_window(data.shape[-2:],
+                                  apodize_kernel=apodize_kernel,
+                                  alpha=alpha, beta=beta)
+        # Keep the total power of the data.
+        data = data * (window / np.sqrt(np.mean(window**2)))
+
+    if pad_to_fast_len:
+        pad_shape = fast_fft_shape(data.shape[-2:])
+
+        pad_width = [(0, 0)] * (data.ndim - 2) + \
+            [(0, new - old) for new, old in zip(pad_shape, data.shape[-2:])]
+
+        if any(width[1] > 0 for width in pad_width):
+            data = np.pad(data, pad_width, mode='constant')
+
+    return data
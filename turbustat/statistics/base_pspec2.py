@@ -2,11 +2,11 @@
 from __future__ import print_function, absolute_import, division
 
 import numpy as np
-import statsmodels.api as sm
 import warnings
 import astropy.units as u
 
-from .lm_seg import Lm_Seg
+from .lm_seg import (Lm_Seg, ols_fit, ols_fit_batch,
+                     fit_segmented_batch)
 from .psds import pspec, make_radial_freq_arrays
 from .fitting_utils import clip_func
 from .elliptical_powerlaw import (fit_elliptical_powerlaw,
@@ -181,11 +181,7 @@ class StatisticBase_PSpec2D(object):
             self._brk_err = None
 
         if self.brk is None:
-            x = sm.add_constant(x)
-
-            model = sm.OLS(y, x, missing='drop')
-
-            self.fit = model.fit()
+            self.fit = ols_fit(np.column_stack((np.ones_like(x), x)), y)
 
             self._slope = self.fit.params[1]
             self._slope_err = self.fit.bse[1]
@@ -219,15 +215,17 @@ class StatisticBase_PSpec2D(object):
         return self._brk_err
 
     def fit_2Dpspec(self, fit_method='LevMarq', p0=(), low_cut=None,
-                    high_cut=None, bootstrap=True, niters=100):
+                    high_cut=None, bootstrap=True, niters=100, seed=None,
+                    n_jobs=1):
         '''
         Model the 2D power-spectrum surface with an elliptical power-law model.
 
         Parameters
         ----------
-        fit_method : str, optional
-            The algorithm fitting to use. Only 'LevMarq' is currently
-            available.
+        fit_method : {'LevMarq', 'LeastSq'}, optional
+            The fitting algorithm to use. 'LeastSq' uses the analytic Jacobian
+            of the model and is faster. See
+            `~turbustat.statistics.elliptical_powerlaw.fit_elliptical_powerlaw`.
         p0 : tuple, optional
             Initial parameters for fitting. If no values are given, the initial
             parameters start from the 1D fit parameters.
@@ -241,6 +239,10 @@ class StatisticBase_PSpec2D(object):
             the covariance matrix.
         niters : int, optional
             Number of bootstrap iterations.
+        seed : int, optional
+            Seed for the bootstrap resampling.
+        n_jobs : int, optional
+            Number of processes to run the bootstrap fits in.
         '''
 
         # Make the data to fit to
@@ -290,7 +292,8 @@ class StatisticBase_PSpec2D(object):
                                     yy_freq[mask], p0,
                                     fit_method=fit_method,
                                     bootstrap=bootstrap,
-                                    niters=niters)
+                                    niters=niters, seed=seed,
+                                    n_jobs=n_jobs)
 
         self.fit2D = fit_2Dmodel
         self._fitter = fitter
@@ -441,3 +444,132 @@ class StatisticBase_PSpec2D(object):
 
         if show:
             p.show()
+
+
+def fit_pspec_batch(freqs, ps1Ds, brk=None, log_break=False, low_cut=None,
+                    high_cut=None, min_fits_pts=10, shape=None,
+                    return_intercepts=False):
+    '''
+    Fit many 1D power spectra that share the same frequencies at once. The
+    fitting follows `StatisticBase_PSpec2D.fit_pspec`, but all spectra are
+    fit together with stacked linear algebra. This is useful for fitting
+    the spectra of many sub-regions or time steps.
+
+    Parameters
+    ----------
+    freqs : `~astropy.units.Quantity`
+        Spatial frequencies of the 1D power spectra in pixel units.
+    ps1Ds : `~numpy.ndarray`
+        1D power spectra with shape (n_spectra, n_freqs).
+    brk : `~astropy.units.Quantity`, optional
+        Initial guess for the break point in pixel units. If None, no break
+        is fit.
+    log_break : bool, optional
+        Sets whether the provided break estimate is log-ed (base 10). The
+        brk must be unitless in this case.
+    low_cut : `~astropy.units.Quantity`, optional
+        Lowest frequency to consider in the fit. When not given, the shape
+        of the 2D power spectra is required to set the default.
+    high_cut : `~astropy.units.Quantity`, optional
+        Highest frequency to consider in the fit.
+    min_fits_pts : int, optional
+        Sets the minimum number of points needed below the break. If not
+        met, the break is rejected for that spectrum.
+    shape : tuple, optional
+        Shape of the 2D power spectra. Sets the default `low_cut`.
+    return_intercepts : bool, optional
+        Also return the fitted intercepts (the log10 amplitudes).
+
+    Returns
+    -------
+    slopes : `~numpy.ndarray`
+        Fitted slopes. With a break, the shape is (n_spectra, 2) and the
+        second slope is NaN where the break was rejected.
+    slope_errs : `~numpy.ndarray`
+        1-sigma errors on the slopes.
+    brks : `~astropy.units.Quantity`
+        Fitted break points (NaN where no break was used). Only returned
+        when `brk` is given.
+    brk_errs : `~astropy.units.Quantity`
+        1-sigma errors on the break points. Only returned when `brk` is
+        given.
+    intercepts : `~numpy.ndarray`
+        Fitted intercepts. Only returned when `return_intercepts` is enabled.
+    '''
+
+    freqs = u.Quantity(freqs, u.pix**-1)
+    ps1Ds = np.atleast_2d(ps1Ds)
+
+    if ps1Ds.shape[1] != freqs.size:
+        raise ValueError("ps1Ds must have shape (n_spectra, freqs.size).")
+
+    if low_cut is None:
+        if shape is None:
+            raise ValueError("shape must be given when low_cut is not.")
+        low_cut = 1. / (0.5 * float(max(shape)) * u.pix)
+    else:
+        low_cut = u.Quantity(low_cut, u.pix**-1)
+
+    if high_cut is None:
+        high_cut = freqs.max().value / u.pix
+    else:
+        high_cut = u.Quantity(high_cut, u.pix**-1)
+
+    in_range = clip_func(freqs.value, low_cut.value, high_cut.value)
+
+    if not in_range.any():
+        raise ValueError("Limits have removed all points to fit. "
+                         "Make low_cut and high_cut less restrictive.")
+
+    x = np.log10(freqs[in_range].value)
+    ys = np.log10(ps1Ds[:, in_range])
+
+    # Model without a break
+    weights = np.isfinite(ys)
+    X = np.empty(ys.shape + (2,))
+    X[..., 0] = 1.
+    X[..., 1] = x
+
+    params, cov, ssr, dof = ols_fit_batch(X, np.where(weights, ys, 0.),
+                                          weights)
+    errs = np.sqrt(cov[:, 1, 1] * ssr / dof)
+
+    if brk is None:
+        if return_intercepts:
+            return params[:, 1], errs, params[:, 0]
+        return params[:, 1], errs
+
+    if not log_break:
+        brk = np.log10(u.Quantity(brk, u.pix**-1).value)
+    else:
+        # A value given in log shouldn't have dimensions
+        if hasattr(brk, "unit"):
+            assert brk.unit == u.dimensionless_unscaled
+            brk = brk.value
+
+    brk_fits = fit_segmented_batch(x, ys, brk)
+
+    # Check to make sure each break leaves enough to fit to.
+    enough_pts = (x < brk_fits['brk'][:, np.newaxis]).sum(1) >= min_fits_pts
+    use_brk = brk_fits['break_flag'] & enough_pts
+
+    if not use_brk.all():
+        warnings.warn("Break fit failed or left too few points for {} of {} "
+                      "spectra. Reverting to the model without a break for "
+                      "these.".format((~use_brk).sum(), use_brk.size))
+
+    slopes = np.where(use_brk[:, np.newaxis], brk_fits['slopes'], np.nan)
+    slope_errs = np.where(use_brk[:, np.newaxis], brk_fits['slope_errs'],
+                          np.nan)
+    slopes[~use_brk, 0] = params[~use_brk, 1]
+    slope_errs[~use_brk, 0] = errs[~use_brk]
+
+    brks = np.where(use_brk, 10**brk_fits['brk'], np.nan)
+    brk_errs = np.log(10) * brks * brk_fits['brk_err']
+
+    if return_intercepts:
+        intercepts = np.where(use_brk, brk_fits['params'][:, 0],
+                              params[:, 0])
+        return slopes, slope_errs, brks / u.pix, brk_errs / u.pix, intercepts
+
+    return slopes, slope_errs, brks / u.pix, brk_errs / u.pix
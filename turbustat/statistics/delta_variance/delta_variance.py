@@ -11,6 +11,8 @@ from copy import copy
 import statsmodels.api as sm
 from astropy.extern.six import string_types
 from warnings import warn
+from collections import OrderedDict
+import threading
 
 from ..base_statistic import BaseStatisticMixIn
 from ...io import common_types, twod_types, input_data
@@ -18,6 +20,7 @@ from ..stats_utils import common_scale, padwithzeros
 from ..fitting_utils import check_fit_limits
 from .kernels import core_kernel, annulus_kernel
 from ..stats_warnings import TurbuStatMetricWarning
+from ..precision import as_working, float_dtype, convolve_fft_kwargs
 
 
 class DeltaVariance(BaseStatisticMixIn):
@@ -64,8 +67,10 @@ class DeltaVariance(BaseStatisticMixIn):
 
         self.diam_ratio = diam_ratio
 
+        # Uniform weights are handled without creating or convolving an
+        # array of ones.
         if weights is None:
-            self.weights = np.ones(self.data.shape)
+            self._weights = None
         else:
             self.weights = input_data(weights, no_header=True)
 
@@ -73,7 +78,8 @@ class DeltaVariance(BaseStatisticMixIn):
             self.distance = distance
 
         self.nanflag = False
-        if np.isnan(self.data).any() or np.isnan(self.weights).any():
+        if np.isnan(self.data).any() or \
+                (not self.unweighted and np.isnan(self.weights).any()):
             self.nanflag = True
 
         if lags is None:
@@ -123,8 +129,17 @@ class DeltaVariance(BaseStatisticMixIn):
         '''
         Array of weights.
         '''
+        if self._weights is None:
+            return np.ones(self.data.shape)
         return self._weights
 
+    @property
+    def unweighted(self):
+        '''
+        True when no weights were given.
+        '''
+        return self._weights is None
+
     @weights.setter
     def weights(self, arr):
 
@@ -134,7 +149,8 @@ class DeltaVariance(BaseStatisticMixIn):
 
         self._weights = arr
 
-    def do_convolutions(self, allow_huge=False, boundary='wrap'):
+    def do_convolutions(self, allow_huge=False, boundary='wrap',
+                        pyramid=False, pyramid_threshold=16.):
         '''
         Perform the convolutions at all lags.
 
@@ -145,48 +161,60 @@ class DeltaVariance(BaseStatisticMixIn):
             images larger than 1 Gb.
         boundary : {"wrap", "fill"}, optional
             Use "wrap" for periodic boundaries, and "fill" for non-periodic.
+        pyramid : bool, optional
+            Compute the large lags on block-averaged images. Lags of at least
+            `2 * pyramid_threshold` pixels use the image and weights averaged
+            over blocks of 2, 4, ... pixels, with the largest block size that
+            keeps the rescaled lag at or above `pyramid_threshold`. The
+            kernels at these lags are wide compared to the blocks, so the
+            delta-variance agrees with the full resolution values to within
+            `PYRAMID_TOLERANCE`.
+        pyramid_threshold : float, optional
+            Smallest lag, in pixels of the block-averaged image, that is
+            computed on a block-averaged image.
         '''
-        for i, lag in enumerate(self.lags.value):
-            core = core_kernel(lag, self.data.shape[0], self.data.shape[1])
-            annulus = annulus_kernel(
-                lag, self.diam_ratio, self.data.shape[0], self.data.shape[1])
-
-            if boundary == "wrap":
-                # Don't pad for periodic boundaries
-                pad_weights = self.weights
-                pad_img = self.data * self.weights
-            elif boundary == "fill":
-                # Extend to avoid boundary effects from non-periodicity
-                pad_weights = np.pad(self.weights, int(lag), padwithzeros)
-                pad_img = np.pad(self.data, int(lag), padwithzeros) * \
-                    pad_weights
-            else:
-                raise ValueError("boundary must be 'wrap' or 'fill'. "
-                                 "Given {}".format(boundary))
-
-            img_core = \
-                convolution_wrapper(pad_img, core, boundary=boundary,
-                                    fill_value=np.NaN,
-                                    allow_huge=allow_huge,)
-            img_annulus = \
-                convolution_wrapper(pad_img, annulus,
-                                    boundary=boundary, fill_value=np.NaN,
-                                    allow_huge=allow_huge)
-            weights_core = \
-                convolution_wrapper(pad_weights, core,
-                                    boundary='fill', fill_value=np.NaN,
-                                    allow_huge=allow_huge)
-            weights_annulus = \
-                convolution_wrapper(pad_weights, annulus,
-                                    boundary='fill', fill_value=np.NaN,
-                                    allow_huge=allow_huge)
-
-            weights_core[np.where(weights_core == 0)] = np.NaN
-            weights_annulus[np.where(weights_annulus == 0)] = np.NaN
-
-            self.convolved_arrays.append(
-                (img_core / weights_core) - (img_annulus / weights_annulus))
-            self.convolved_weights.append(weights_core * weights_annulus)
+        if boundary not in ["wrap", "fill"]:
+            raise ValueError("boundary must be 'wrap' or 'fill'. "
+                             "Given {}".format(boundary))
+
+        if pyramid and pyramid_threshold < 1:
+            raise ValueError("pyramid_threshold must be at least one pixel.")
+
+        self.convolved_arrays = []
+        self.convolved_weights = []
+
+        if pyramid:
+            self._pyramid_factors = \
+                np.array([_pyramid_factor(lag, pyramid_threshold)
+                          for lag in self.lags.value])
+        else:
+            self._pyramid_factors = np.ones(len(self.lags), dtype=int)
+
+        weights = None if self.unweighted else self.weights
+
+        # Block-averaged images are shared by all lags with the same factor
+        levels = {1: (self.data, weights)}
+
+        for lag, factor in zip(self.lags.value, self._pyramid_factors):
+
+            if factor not in levels:
+                levels[factor] = _block_average(self.data, weights, factor)
+
+            conv_arr, conv_weight = \
+                _lag_convolutions(levels[factor][0], levels[factor][1],
+                                  lag / factor, self.diam_ratio, boundary,
+                                  allow_huge=allow_huge)
+
+            self.convolved_arrays.append(conv_arr)
+            self.convolved_weights.append(conv_weight)
+
+    @property
+    def pyramid_factors(self):
+        '''
+        Block size of the image used at each lag. All ones unless `pyramid`
+        is enabled in `~DeltaVariance.do_convolutions`.
+        '''
+        return self._pyramid_factors
 
     def compute_deltavar(self):
         '''
@@ -202,7 +230,9 @@ class DeltaVariance(BaseStatisticMixIn):
                                       self.convolved_weights,
                                       self.lags.value)):
 
-            val, err = _delvar(conv_arr, conv_weight, lag)
+            # The lag in pixels of the (block-averaged) convolved array
+            val, err = _delvar(conv_arr, conv_weight,
+                               lag / self._pyramid_factors[i])
 
             if (val <= 0) or (err <= 0) or np.isnan(val) or np.isnan(err):
                 self._delta_var[i] = np.NaN
@@ -332,7 +362,8 @@ class DeltaVariance(BaseStatisticMixIn):
         return model_values
 
     def run(self, verbose=False, xunit=u.pix, allow_huge=False,
-            boundary='wrap', xlow=None, xhigh=None, save_name=None):
+            boundary='wrap', xlow=None, xhigh=None, save_name=None,
+            pyramid=False, pyramid_threshold=16.):
         '''
         Compute the delta-variance.
 
@@ -352,9 +383,16 @@ class DeltaVariance(BaseStatisticMixIn):
             Upper lag value to consider in the fit.
         save_name : str,optional
             Save the figure when a file name is given.
+        pyramid : bool, optional
+            Compute the large lags on block-averaged images. See
+            `~DeltaVariance.do_convolutions`.
+        pyramid_threshold : float, optional
+            See `~DeltaVariance.do_convolutions`.
         '''
 
-        self.do_convolutions(allow_huge=allow_huge, boundary=boundary)
+        self.do_convolutions(allow_huge=allow_huge, boundary=boundary,
+                             pyramid=pyramid,
+                             pyramid_threshold=pyramid_threshold)
         self.compute_deltavar()
         self.fit_plaw(xlow=xlow, xhigh=xhigh, verbose=verbose)
 
@@ -662,14 +700,121 @@ class DeltaVariance_Distance(object):
         return self
 
 
+# Relative agreement of the delta-variance from block-averaged images
+# (`pyramid=True` in `DeltaVariance.do_convolutions`) with the full
+# resolution values. Tested in `turbustat/tests/test_delvar.py`.
+PYRAMID_TOLERANCE = 0.03
+
+
+def _pyramid_factor(lag, threshold):
+    '''
+    Largest power of 2 that keeps `lag / factor >= threshold`.
+    '''
+    if lag < 2 * threshold:
+        return 1
+    return 2 ** int(np.floor(np.log2(lag / threshold)))
+
+
+def _block_average(data, weights, factor):
+    '''
+    Average the image and weights over blocks of `factor` pixels. The image
+    is padded with NaNs to a multiple of `factor`, and is the weighted
+    average within each block when weights are given. Blocks with no finite
+    pixels are NaN.
+    '''
+
+    pad_width = [(0, -size % factor) for size in data.shape]
+    new_shape = (data.shape[0] // factor + (pad_width[0][1] > 0), factor,
+                 data.shape[1] // factor + (pad_width[1][1] > 0), factor)
+
+    def block_sums(arr):
+        arr = np.pad(arr, pad_width, mode='constant', constant_values=np.NaN)
+        return np.nansum(arr.reshape(new_shape), axis=(1, 3),
+                         dtype=np.float64)
+
+    data = np.asarray(data, dtype=np.float64)
+
+    if weights is None:
+        finite = np.isfinite(data)
+        sums = block_sums(np.where(finite, data, np.NaN))
+        counts = block_sums(finite.astype(np.float64))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            block_data = sums / counts
+        return as_working(block_data), None
+
+    weights = np.asarray(weights, dtype=np.float64)
+    finite = np.isfinite(data) & np.isfinite(weights)
+
+    weight_sums = block_sums(np.where(finite, weights, np.NaN))
+    sums = block_sums(np.where(finite, data * weights, np.NaN))
+    counts = block_sums(finite.astype(np.float64))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        block_data = sums / weight_sums
+        block_weights = weight_sums / counts
+
+    block_data[counts == 0] = np.NaN
+    block_weights[counts == 0] = np.NaN
+
+    return as_working(block_data), as_working(block_weights)
+
+
+def _lag_convolutions(data, weights, lag, diam_ratio, boundary,
+                      allow_huge=False):
+    '''
+    Difference of the core and annulus convolutions at one lag, and the
+    product of the convolved weights. Uniform weights are used when `weights`
+    is None.
+    '''
+
+    core = core_kernel(lag, data.shape[0], data.shape[1])
+    annulus = annulus_kernel(lag, diam_ratio, data.shape[0], data.shape[1])
+
+    if boundary == "wrap":
+        # Don't pad for periodic boundaries
+        pad_img = as_working(data)
+        if weights is not None:
+            pad_weights = as_working(weights)
+            pad_img = pad_img * pad_weights
+    else:
+        # Extend to avoid boundary effects from non-periodicity
+        pad_img = np.pad(as_working(data), int(lag), padwithzeros)
+        if weights is not None:
+            pad_weights = np.pad(as_working(weights), int(lag),
+                                 padwithzeros)
+            pad_img = pad_img * pad_weights
+
+    img_core = \
+        convolution_wrapper(pad_img, core, boundary=boundary,
+                            fill_value=np.NaN,
+                            allow_huge=allow_huge,)
+    img_annulus = \
+        convolution_wrapper(pad_img, annulus,
+                            boundary=boundary, fill_value=np.NaN,
+                            allow_huge=allow_huge)
+
+    if weights is None:
+        weights_core, weights_annulus = \
+            _unit_weight_convolutions(data.shape, lag, diam_ratio, boundary,
+                                      allow_huge=allow_huge)
+    else:
+        weights_core, weights_annulus = \
+            _weight_convolutions(pad_weights, core, annulus,
+                                 allow_huge=allow_huge)
+
+    return ((img_core / weights_core) - (img_annulus / weights_annulus),
+            weights_core * weights_annulus)
+
+
 def _delvar(array, weight, lag):
     '''
     Computes the delta variance of the given array.
     '''
-    arr_cent = array.copy() - np.nanmean(array, axis=None)
+    # Accumulate in double precision when the arrays are single precision.
+    arr_cent = array - np.nanmean(array, axis=None, dtype=np.float64)
 
-    val = np.nansum(arr_cent ** 2. * weight) /\
-        np.nansum(weight)
+    val = np.nansum(arr_cent ** 2. * weight, dtype=np.float64) /\
+        np.nansum(weight, dtype=np.float64)
 
     # The error needs to be normalized by the number of independent
     # pixels in the array.
@@ -678,17 +823,99 @@ def _delvar(array, weight, lag):
     kern_area = np.ceil(0.5 * np.pi * np.log(2) * lag**2).astype(int)
     nindep = np.sqrt(np.isfinite(arr_cent).sum() // kern_area)
 
-    val_err = np.sqrt((np.nansum(arr_cent ** 4. * weight) /
-                       np.nansum(weight)) - val**2) / nindep
+    val_err = np.sqrt((np.nansum(arr_cent ** 4. * weight, dtype=np.float64) /
+                       np.nansum(weight, dtype=np.float64)) - val**2) / nindep
 
     return val, val_err
 
 
+def _weight_convolutions(pad_weights, core, annulus, allow_huge=False):
+    '''
+    Convolve the weights with the core and annulus kernels. Zeros are set to
+    NaN.
+    '''
+
+    weights_core = \
+        convolution_wrapper(pad_weights, core,
+                            boundary='fill', fill_value=np.NaN,
+                            allow_huge=allow_huge)
+    weights_annulus = \
+        convolution_wrapper(pad_weights, annulus,
+                            boundary='fill', fill_value=np.NaN,
+                            allow_huge=allow_huge)
+
+    weights_core[np.where(weights_core == 0)] = np.NaN
+    weights_annulus[np.where(weights_annulus == 0)] = np.NaN
+
+    return weights_core, weights_annulus
+
+
+# Convolved uniform weights for boundary='fill'. These only depend on the
+# image shape, lag and kernel, so they are shared between DeltaVariance
+# instances. Bounded by the total size of the stored arrays.
+_unit_weight_cache = OrderedDict()
+_unit_weight_cache_lock = threading.Lock()
+UNIT_WEIGHT_CACHE_MAX_BYTES = 256 * 1024**2
+
+
+def _unit_weight_convolutions(shape, lag, diam_ratio, boundary,
+                              allow_huge=False):
+    '''
+    Convolutions of uniform weights with the core and annulus kernels.
+
+    With periodic boundaries, the normalized convolutions are one everywhere.
+    Otherwise they are computed from the zero-padded weights and cached. The
+    returned arrays are read-only.
+    '''
+
+    if boundary == "wrap":
+        ones = np.broadcast_to(as_working(1.), shape)
+        return ones, ones
+
+    key = (tuple(shape), float(lag), float(diam_ratio),
+           np.dtype(float_dtype()).str)
+
+    with _unit_weight_cache_lock:
+        if key in _unit_weight_cache:
+            value = _unit_weight_cache.pop(key)
+            _unit_weight_cache[key] = value
+            return value
+
+    core = core_kernel(lag, shape[0], shape[1])
+    annulus = annulus_kernel(lag, diam_ratio, shape[0], shape[1])
+
+    pad_weights = np.pad(np.ones(shape, dtype=float_dtype()), int(lag),
+                         padwithzeros)
+
+    value = _weight_convolutions(pad_weights, core, annulus,
+                                 allow_huge=allow_huge)
+
+    for arr in value:
+        arr.flags.writeable = False
+
+    nbytes = sum(arr.nbytes for arr in value)
+
+    if nbytes <= UNIT_WEIGHT_CACHE_MAX_BYTES:
+        with _unit_weight_cache_lock:
+            _unit_weight_cache[key] = value
+
+            total = sum(arr.nbytes for entry in _unit_weight_cache.values()
+                        for arr in entry)
+            while total > UNIT_WEIGHT_CACHE_MAX_BYTES:
+                _, old = _unit_weight_cache.popitem(last=False)
+                total -= sum(arr.nbytes for arr in old)
+
+    return value
+
+
 def convolution_wrapper(img, kernel, **kwargs):
     '''
-    Adjust parameter setting to be consistent with astropy <2 and >=2.
+    Adjust parameter setting to be consistent with astropy <2 and >=2. The
+    FFTs use the working precision (`~turbustat.statistics.precision`).
     '''
 
+    kwargs.update(convolve_fft_kwargs())
+
     if int(astro_version[0]) >= 2:
         conv_img = convolve_fft(img, kernel, normalize_kernel=True,
                                 nan_treatment='interpolate',
@@ -702,4 +929,4 @@ def convolution_wrapper(img, kernel, **kwargs):
                                 interpolate_nan=True,
                                 ignore_edge_zeros=True, **kwargs)
 
-    return conv_img
+    return as_working(conv_img)
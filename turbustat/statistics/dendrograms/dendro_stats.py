@@ -146,13 +146,10 @@ class Dendrogram_Stats(BaseStatisticMixIn):
                                       d.all_structures]))
 
         if len(self.min_deltas) > 1:
-            for i, delta in enumerate(self.min_deltas[1:]):
-                if verbose:
-                    print("On %s of %s" % (i + 1, len(self.min_deltas[1:])))
-                d.prune(min_delta=delta)
-                self._numfeatures[i + 1] = len(d)
-                self._values.append(np.array([struct.vmax for struct in
-                                              d.all_structures]))
+            numfeatures, values = prune_sweep(d, self.min_deltas[1:],
+                                              verbose=verbose)
+            self._numfeatures[1:] = numfeatures
+            self._values.extend(values)
 
     @property
     def numfeatures(self):
@@ -725,6 +722,173 @@ class DendroDistance(object):
         return self
 
 
+def prune_sweep(dendro, min_deltas, min_npix=None, verbose=False):
+    '''
+    Number of structures and their peak values after successively pruning a
+    dendrogram to each of `min_deltas`.
+
+    The tree is extracted once into arrays of the parents, children, minima,
+    maxima and number of pixels of each structure. Pruning then follows the
+    merging rules of `~astrodendro.Dendrogram.prune` on these arrays, so the
+    results are the same as calling `prune` for each delta, without merging
+    the pixel lists and re-indexing the dendrogram at every step. The
+    dendrogram is not modified.
+
+    Parameters
+    ----------
+    dendro : `~astrodendro.Dendrogram`
+        Computed dendrogram.
+    min_deltas : numpy.ndarray
+        Minimum deltas to prune to, in the order they are applied.
+    min_npix : int, optional
+        Minimum number of pixels in a leaf. Defaults to the value used to
+        compute `dendro`.
+    verbose : bool, optional
+        Print the progress.
+
+    Returns
+    -------
+    numfeatures : numpy.ndarray
+        Number of structures remaining after pruning to each delta.
+    values : list of numpy.ndarray
+        Peak values of the remaining structures at each delta.
+    '''
+
+    if min_npix is None:
+        min_npix = dendro.params["min_npix"]
+
+    structs = list(dendro.all_structures)
+    posn = dict((struct.idx, i) for i, struct in enumerate(structs))
+
+    parent = [posn[struct.parent.idx] if struct.parent is not None else -1
+              for struct in structs]
+    children = [[posn[child.idx] for child in struct.children]
+                for struct in structs]
+    vmin = [struct.vmin for struct in structs]
+    vmax = [struct.vmax for struct in structs]
+    npix = [len(struct.values(subtree=False)) for struct in structs]
+
+    # The trunk is ordered by the structure index after pruning.
+    trunk = [posn[idx] for idx in
+             sorted(struct.idx for struct in dendro.trunk)]
+
+    tree = (parent, children, vmin, vmax, npix, trunk)
+
+    numfeatures = np.empty(len(min_deltas), dtype=int)
+    values = []
+
+    for i, delta in enumerate(min_deltas):
+        if verbose:
+            print("On %s of %s" % (i + 1, len(min_deltas)))
+
+        # Same as astrodendro when no min_delta is given.
+        if delta == 0:
+            delta = dendro.params["min_delta"]
+
+        _prune_arrays(tree, delta, min_npix)
+
+        order = _prefix_order(children, trunk)
+
+        numfeatures[i] = len(order)
+        values.append(np.array(vmax)[order])
+
+    return numfeatures, values
+
+
+def _prune_arrays(tree, delta, min_npix):
+    '''
+    Prune the tree arrays in place. The leaves are checked in prefix order and
+    the first that fails is merged into its parent, as in
+    `~astrodendro.Dendrogram.prune`. A merge can only change the checks of
+    leaves below the grandparent of the merged leaf, so the scan continues
+    from there rather than from the start of the tree.
+    '''
+
+    parent, children, vmin, vmax, npix, trunk = tree
+
+    def is_independent(i):
+        if npix[i] < min_npix:
+            return False
+        if parent[i] < 0:
+            return (vmax[i] - vmin[i]) >= delta
+        return (vmax[i] - min(vmin[c] for c in children[parent[i]])) >= delta
+
+    todo = list(reversed(trunk))
+
+    while todo:
+        i = todo.pop()
+
+        if children[i]:
+            todo.extend(reversed(children[i]))
+            continue
+
+        if parent[i] < 0 or is_independent(i):
+            continue
+
+        par = parent[i]
+
+        # With one sibling, both merge into the parent. Otherwise only the
+        # leaf is merged.
+        if len(children[par]) <= 2:
+            merge = list(children[par])
+        else:
+            merge = [i]
+
+        for m in merge:
+            vmin[par] = min(vmin[m], vmin[par])
+            vmax[par] = max(vmax[m], vmax[par])
+            npix[par] += npix[m]
+
+            children[par].remove(m)
+            children[par].extend(children[m])
+            for child in children[m]:
+                parent[child] = par
+
+        restart = parent[par] if parent[par] >= 0 else par
+        todo = _resume_order(restart, parent, children, trunk)
+
+    # Remove leaves in the trunk that fail the test.
+    for i in [i for i in trunk if not children[i]]:
+        if not is_independent(i):
+            trunk.remove(i)
+
+
+def _resume_order(start, parent, children, trunk):
+    '''
+    Stack of structures left to visit in a prefix order traversal when
+    `start` is reached.
+    '''
+
+    later = []
+    node = start
+    while node >= 0:
+        siblings = children[parent[node]] if parent[node] >= 0 else trunk
+        later.append(siblings[siblings.index(node) + 1:])
+        node = parent[node]
+
+    todo = []
+    for siblings in reversed(later):
+        todo.extend(reversed(siblings))
+    todo.append(start)
+
+    return todo
+
+
+def _prefix_order(children, trunk):
+    '''
+    Structures in the tree in prefix order.
+    '''
+
+    order = []
+    todo = list(reversed(trunk))
+    while todo:
+        i = todo.pop()
+        order.append(i)
+        todo.extend(reversed(children[i]))
+
+    return order
+
+
 def hellinger_stat(x, y):
     '''
     Compute the Hellinger statistic of multiple samples.
@@ -3,12 +3,16 @@ from __future__ import print_function, absolute_import, division
 
 import numpy as np
 from astropy.modeling import Fittable2DModel, Parameter, fitting
+from scipy.optimize import least_squares
+from multiprocessing import cpu_count
 from warnings import warn
 
+from .stats_utils import parallel_map
+
 
 def fit_elliptical_powerlaw(values, x, y, p0, fit_method='LevMarq',
                             bootstrap=False, niters=100, alpha=0.6827,
-                            debug=False):
+                            debug=False, seed=None, n_jobs=1):
     '''
     General function for fitting the 2D elliptical power-law model.
 
@@ -18,12 +22,60 @@ def fit_elliptical_powerlaw(values, x, y, p0, fit_method='LevMarq',
     offset by pi / 2 from the original guess. Whichever fit has the lowest
     residuals is returned.
 
+    Parameters
+    ----------
+    values : `~numpy.ndarray`
+        log10 of the 2D spectrum values to fit.
+    x : `~numpy.ndarray`
+        x values.
+    y : `~numpy.ndarray`
+        y values.
+    p0 : tuple
+        Initial parameters (logamplitude, ellip_transf, theta, gamma).
+    fit_method : {'LevMarq', 'LeastSq'}, optional
+        'LevMarq' uses astropy's `~astropy.modeling.fitting.LevMarLSQFitter`.
+        'LeastSq' uses `~scipy.optimize.least_squares` with the analytic
+        Jacobian of `LogEllipticalPowerLaw2D`, which is considerably faster.
+    bootstrap : bool, optional
+        Estimate the standard errors by bootstrapping the model residuals.
+        The bootstrap fits always use the analytic Jacobian fitter, starting
+        from the best-fit parameters.
+    niters : int, optional
+        Number of bootstrap iterations.
+    alpha : float, optional
+        Confidence level of the bootstrap interval used for the standard
+        errors.
+    debug : bool, optional
+        Plot the bootstrap parameter distributions.
+    seed : int, optional
+        Seed for the bootstrap resampling.
+    n_jobs : int, optional
+        Number of processes to run the bootstrap fits in.
+
+    Returns
+    -------
+    params : `~numpy.ndarray`
+        Fitted parameters.
+    stderrs : `~numpy.ndarray`
+        Standard errors of the parameters.
+    fit_model : `LogEllipticalPowerLaw2D`
+        Model with the fitted parameters.
+    fitter : `~astropy.modeling.fitting.LevMarLSQFitter` or
+             `~scipy.optimize.OptimizeResult`
+        The fitter ('LevMarq') or the optimization result ('LeastSq').
     '''
 
     # All values must be finite.
     if not np.isfinite(values).all():
         raise ValueError("values contains a non-finite value.")
 
+    if fit_method not in ['LevMarq', 'LeastSq']:
+        raise ValueError("fit_method must be 'LevMarq' or 'LeastSq'.")
+
+    # Fit again w/ theta offset by pi / 2
+    p0_f = list(p0)
+    p0_f[2] = (p0[2] + np.pi / 2.) % np.pi
+
     if fit_method == 'LevMarq':
 
         model = LogEllipticalPowerLaw2D(*p0)
@@ -33,13 +85,10 @@ def fit_elliptical_powerlaw(values, x, y, p0, fit_method='LevMarq',
 
         resids = np.sum(np.abs(values - fit_model(x, y)))
 
-        # Fit again w/ theta offset by pi / 2
-        p0_f = list(p0)
-        p0_f[2] = (p0[2] + np.pi / 2.) % np.pi
         model_f = LogEllipticalPowerLaw2D(*p0_f)
 
         fitter_f = fitting.LevMarLSQFitter()
-        fit_model_f = fitter(model_f, x, y, values)
+        fit_model_f = fitter_f(model_f, x, y, values)
 
         resids_f = np.sum(np.abs(values - fit_model_f(x, y)))
 
@@ -49,68 +98,151 @@ def fit_elliptical_powerlaw(values, x, y, p0, fit_method='LevMarq',
             fitter = fitter_f
             fit_model = fit_model_f
 
-        # Use bootstrap re-sampling of the model residuals to estimate
-        # 1-sigma CIs.
-        if bootstrap:
-            niters = int(niters)
-            params = np.empty((4, niters))
+        # theta is only defined modulo pi.
+        fit_model.theta = fit_model.theta.value % np.pi
+
+        params = fit_model.parameters.copy()
 
-            resid = values - fit_model(x, y)
+    else:
+
+        fitter = _fit_logellipplaw(values, x, y, p0)
+        resids = np.sum(np.abs(fitter.fun))
 
-            for i in range(niters):
-                boot_fit = fitting.LevMarLSQFitter()
+        fitter_f = _fit_logellipplaw(values, x, y, p0_f)
+        resids_f = np.sum(np.abs(fitter_f.fun))
+
+        if resids > resids_f:
+            if debug:
+                print("Using theta flipped model fit!")
+            fitter = fitter_f
 
-                resamp_y = y + resid[np.random.permutation(resid.size)]
+        params = fitter.x.copy()
+        params[2] = params[2] % np.pi
 
-                boot_model = boot_fit(fit_model, x, resamp_y, values)
+        fit_model = LogEllipticalPowerLaw2D(*params)
 
-                params[:, i] = boot_model.parameters
+    # Use bootstrap re-sampling of the model residuals to estimate
+    # 1-sigma CIs.
+    if bootstrap:
+        niters = int(niters)
 
-            percentiles = np.percentile(params,
-                                        [100 * (0.5 - alpha / 2.),
-                                         100 * (0.5 + alpha / 2.)],
-                                        axis=1)
+        model_vals = fit_model(x, y)
+        resid = values - model_vals
 
-            if debug:
-                import matplotlib.pyplot as plt
-
-                plt.subplot(221)
-                _ = plt.hist(params[0], bins=10)
-                plt.axvline(fit_model.parameters[0])
-                plt.subplot(222)
-                _ = plt.hist(params[1], bins=10)
-                plt.axvline(fit_model.parameters[1])
-                plt.subplot(223)
-                _ = plt.hist(params[2], bins=10)
-                plt.axvline(fit_model.parameters[2])
-                plt.subplot(224)
-                _ = plt.hist(params[3], bins=10)
-                plt.axvline(fit_model.parameters[3])
-
-            stderrs = 0.5 * (percentiles[1] - percentiles[0])
-
-        # Otherwise use the covariance matrix to get standard errors.
-        # These WILL be underestimated! In many cases Lev-Marq won't return
-        # the covariance matrix at all (though the fit is usually correct).
+        # Draw all permutations up front so the results only depend on
+        # the seed, not the number of processes.
+        rng = np.random.RandomState(seed)
+        perms = [rng.permutation(resid.size) for i in range(niters)]
+
+        if n_jobs == 1:
+            chunks = [perms]
         else:
-            # Try extracting the covariance matrix
-            cov_matrix = fitter.fit_info.get('param_cov')
-            # cov_matrix = None
-            if cov_matrix is None:
-                warn("Covariance matrix calculation failed. Check results "
-                     "carefully.")
-                stderrs = np.zeros((4,)) * np.NaN
-            else:
-                stderrs = np.sqrt(np.abs(np.diag(cov_matrix)))
-
-        params = fit_model.parameters
+            nchunks = n_jobs if n_jobs > 0 else cpu_count()
+            chunks = [perms[i::nchunks] for i in range(nchunks)]
+
+        boot_args = [(model_vals, resid, chunk, x, y, params)
+                     for chunk in chunks if len(chunk) > 0]
+
+        boot_params = parallel_map(_bootstrap_logellipplaw, boot_args,
+                                   n_jobs=n_jobs)
+
+        boot_params = np.hstack(boot_params)
+
+        percentiles = np.percentile(boot_params,
+                                    [100 * (0.5 - alpha / 2.),
+                                     100 * (0.5 + alpha / 2.)],
+                                    axis=1)
+
+        if debug:
+            import matplotlib.pyplot as plt
+
+            plt.subplot(221)
+            _ = plt.hist(boot_params[0], bins=10)
+            plt.axvline(params[0])
+            plt.subplot(222)
+            _ = plt.hist(boot_params[1], bins=10)
+            plt.axvline(params[1])
+            plt.subplot(223)
+            _ = plt.hist(boot_params[2], bins=10)
+            plt.axvline(params[2])
+            plt.subplot(224)
+            _ = plt.hist(boot_params[3], bins=10)
+            plt.axvline(params[3])
+
+        stderrs = 0.5 * (percentiles[1] - percentiles[0])
+
+    # Otherwise use the covariance matrix to get standard errors.
+    # These WILL be underestimated! In many cases Lev-Marq won't return
+    # the covariance matrix at all (though the fit is usually correct).
     else:
-        raise ValueError("'LevMarq' is the only implemented fitting method. "
-                         "'fit_method' must be set to this.")
+        # Try extracting the covariance matrix
+        if fit_method == 'LevMarq':
+            cov_matrix = fitter.fit_info.get('param_cov')
+        else:
+            cov_matrix = _leastsq_covariance(fitter)
+
+        if cov_matrix is None:
+            warn("Covariance matrix calculation failed. Check results "
+                 "carefully.")
+            stderrs = np.zeros((4,)) * np.NaN
+        else:
+            stderrs = np.sqrt(np.abs(np.diag(cov_matrix)))
 
     return params, stderrs, fit_model, fitter
 
 
+def _logellipplaw_resid(params, values, x, y):
+    return LogEllipticalPowerLaw2D.evaluate(x, y, *params) - values
+
+
+def _logellipplaw_jac(params, values, x, y):
+    return np.vstack(LogEllipticalPowerLaw2D.jacobian(x, y, *params)).T
+
+
+def _fit_logellipplaw(values, x, y, p0):
+    '''
+    Fit `LogEllipticalPowerLaw2D` with the analytic Jacobian.
+    '''
+    return least_squares(_logellipplaw_resid, np.asarray(p0, dtype=float),
+                         jac=_logellipplaw_jac, args=(values, x, y),
+                         method='lm')
+
+
+def _leastsq_covariance(result):
+    '''
+    Parameter covariance from the Jacobian at the solution, scaled by the
+    reduced chi-square.
+    '''
+    jac = result.jac
+    dof = jac.shape[0] - jac.shape[1]
+
+    if dof <= 0:
+        return None
+
+    try:
+        cov = np.linalg.inv(np.dot(jac.T, jac))
+    except np.linalg.LinAlgError:
+        return None
+
+    return cov * np.sum(result.fun**2) / dof
+
+
+def _bootstrap_logellipplaw(args):
+    '''
+    Refit the model to the model values plus re-ordered residuals for each
+    of the given permutations.
+    '''
+    model_vals, resid, perms, x, y, p0 = args
+
+    params = np.empty((4, len(perms)))
+
+    for i, perm in enumerate(perms):
+        resamp_vals = model_vals + resid[perm]
+        params[:, i] = _fit_logellipplaw(resamp_vals, x, y, p0).x
+
+    return params
+
+
 class LogEllipticalPowerLaw2D(Fittable2DModel):
     """
     Two-dimensional elliptical power-law fit in log-log space.
@@ -178,6 +310,52 @@ class LogEllipticalPowerLaw2D(Fittable2DModel):
 
         return model
 
+    @staticmethod
+    def jacobian(x, y, logamplitude, ellip_transf, theta, gamma):
+        '''
+        Analytic derivatives of the model with respect to the parameters.
+        This is not named `fit_deriv` so the astropy fitters keep using
+        numerical derivatives.
+        '''
+
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+
+        q = 1. / (1 + np.exp(-ellip_transf))
+
+        costhet = np.cos(theta)
+        sinthet = np.sin(theta)
+
+        term1 = (q * costhet)**2 + sinthet**2
+        term2 = 2 * (1 - q**2) * sinthet * costhet
+        term3 = (q * sinthet)**2 + costhet**2
+
+        rad = x**2 * term1 + x * y * term2 + y**2 * term3
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_rad = np.log10(rad)
+            scale = 0.5 * gamma / (rad * np.log(10))
+
+        # Derivatives of the radius term with respect to q and theta
+        drad_dq = 2 * q * (x * costhet - y * sinthet)**2
+        drad_dtheta = 2 * (1 - q**2) * \
+            ((x**2 - y**2) * sinthet * costhet +
+             x * y * (costhet**2 - sinthet**2))
+
+        d_logamplitude = np.ones_like(rad)
+        d_ellip_transf = scale * drad_dq * q * (1 - q)
+        d_theta = scale * drad_dtheta
+        d_gamma = 0.5 * log_rad
+
+        derivs = [d_logamplitude, d_ellip_transf, d_theta, d_gamma]
+
+        # The zero-frequency term is not defined by the model.
+        bad_pts = ~(np.isfinite(log_rad) & np.isfinite(scale))
+        for deriv in derivs:
+            deriv[bad_pts] = 0.0
+
+        return derivs
+
 
 def interval_transform(x, a, b):
 
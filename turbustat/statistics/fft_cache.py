@@ -0,0 +1,278 @@
+# Licensed under an MIT open source license - see LICENSE
+from __future__ import print_function, absolute_import, division
+
+import numpy as np
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+
+from .precision import rfftn as _rfftn, as_working, get_precision
+
+'''
+Memoised FFTs of 2D images.
+
+Several statistics transform the same image when run on the same data set
+(e.g., PowerSpectrum and BiSpectrum both take the FFT of the zeroth
+moment). The RFFT of each image is cached here, keyed by the content of the
+array, and the full complex FFT is reconstructed from the cached RFFT using
+the Hermitian symmetry of a real-valued transform.
+'''
+
+
+class FFTCache(object):
+    """
+    Bounded, thread-safe cache of the RFFTs of real-valued arrays.
+
+    Entries are keyed by a digest of the array contents, the shape, dtype,
+    FFT normalization and working precision. Each entry holds weak
+    references to the arrays that were used to create it, and is dropped
+    once all of those arrays have been garbage collected. The least
+    recently used entries are removed when the total size of the cache
+    exceeds `max_bytes`.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Maximum size of the cached transforms in bytes. Defaults to 256 MB.
+    enabled : bool, optional
+        When disabled, transforms are computed without being stored.
+    """
+
+    def __init__(self, max_bytes=256 * 1024**2, enabled=True):
+        super(FFTCache, self).__init__()
+
+        self.max_bytes = int(max_bytes)
+        self.enabled = enabled
+
+        self._entries = OrderedDict()
+        self._refs = {}
+        self._nbytes = 0
+        self._lock = threading.RLock()
+
+    @property
+    def nbytes(self):
+        '''
+        Total size of the cached transforms in bytes.
+        '''
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @staticmethod
+    def make_key(arr, norm=None):
+        '''
+        Hash the contents of an array to create the cache key.
+
+        Parameters
+        ----------
+        arr : `~numpy.ndarray`
+            Array to be transformed.
+        norm : {None, "ortho"}, optional
+            Normalization passed to the FFT.
+
+        Returns
+        -------
+        key : tuple
+            Key containing the digest, shape, dtype, normalization and
+            working precision.
+        '''
+        arr = np.ascontiguousarray(arr)
+        digest = hashlib.sha1(arr.view(np.uint8)).hexdigest()
+
+        return (digest, arr.shape, arr.dtype.str, norm, get_precision())
+
+    def rfftn(self, arr, norm=None):
+        '''
+        Return the RFFT of `arr`, computing and storing it if needed. The
+        returned array is read-only since it is shared between callers. The
+        transform is computed in the working precision
+        (`~turbustat.statistics.precision`).
+
+        Parameters
+        ----------
+        arr : `~numpy.ndarray`
+            Real-valued array.
+        norm : {None, "ortho"}, optional
+            Normalization passed to `~numpy.fft.rfftn`.
+
+        Returns
+        -------
+        rfft : `~numpy.ndarray`
+            Complex RFFT of `arr`.
+        '''
+
+        if not self.enabled:
+            return _rfftn(as_working(arr), norm=norm)
+
+        key = self.make_key(arr, norm=norm)
+
+        with self._lock:
+            if key in self._entries:
+                # Mark as most recently used
+                rfft = self._entries.pop(key)
+                self._entries[key] = rfft
+                self._track(key, arr)
+                return rfft
+
+        rfft = _rfftn(as_working(arr), norm=norm)
+        rfft.flags.writeable = False
+
+        # Too large to ever be cached.
+        if rfft.nbytes > self.max_bytes:
+            return rfft
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = rfft
+                self._nbytes += rfft.nbytes
+                self._evict()
+            self._track(key, arr)
+
+            return self._entries.get(key, rfft)
+
+    def fftn(self, arr, norm=None):
+        '''
+        Return the full complex FFT of `arr`, reconstructed from the cached
+        RFFT.
+
+        Parameters
+        ----------
+        arr : `~numpy.ndarray`
+            Real-valued array.
+        norm : {None, "ortho"}, optional
+            Normalization passed to `~numpy.fft.rfftn`.
+
+        Returns
+        -------
+        fft : `~numpy.ndarray`
+            Complex FFT of `arr`.
+        '''
+        return rfft_to_complex_fft(self.rfftn(arr, norm=norm), arr.shape[-1])
+
+    def clear(self):
+        '''
+        Remove all entries.
+        '''
+        with self._lock:
+            self._entries.clear()
+            self._refs.clear()
+            self._nbytes = 0
+
+    def _track(self, key, arr):
+        '''
+        Keep a weak reference to `arr` so the entry is removed once all of
+        the arrays it was created from no longer exist.
+        '''
+
+        refs = self._refs.setdefault(key, [])
+
+        # Views share the base array's lifetime
+        base = arr if arr.base is None else arr.base
+
+        if any(ref() is base for ref in refs):
+            return
+
+        try:
+            refs.append(weakref.ref(base, self._make_callback(key)))
+        except TypeError:
+            # Objects without weak reference support are only removed
+            # by the size bound.
+            pass
+
+    def _make_callback(self, key):
+
+        cache_ref = weakref.ref(self)
+
+        def _callback(ref):
+            cache = cache_ref()
+            if cache is None:
+                return
+
+            with cache._lock:
+                refs = cache._refs.get(key)
+                if refs is None:
+                    return
+
+                refs[:] = [r for r in refs if r is not ref and
+                           r() is not None]
+
+                if len(refs) == 0:
+                    cache._remove(key)
+
+        return _callback
+
+    def _remove(self, key):
+        rfft = self._entries.pop(key, None)
+        if rfft is not None:
+            self._nbytes -= rfft.nbytes
+        self._refs.pop(key, None)
+
+    def _evict(self):
+        while self._nbytes > self.max_bytes and len(self._entries) > 0:
+            key = next(iter(self._entries))
+            self._remove(key)
+
+
+def rfft_to_complex_fft(rfft, last_dim, axes=None):
+    '''
+    Reconstruct the full complex FFT from the output of `~numpy.fft.rfftn`
+    using the Hermitian symmetry of the transform of a real array.
+
+    Parameters
+    ----------
+    rfft : `~numpy.ndarray`
+        Output from `~numpy.fft.rfftn`.
+    last_dim : int
+        Size of the last dimension in the original array.
+    axes : sequence of ints, optional
+        Axes that were transformed. The last axis must be included. Defaults
+        to all axes.
+
+    Returns
+    -------
+    fft : `~numpy.ndarray`
+        Equivalent to the output of `~numpy.fft.fftn`.
+    '''
+
+    if last_dim % 2 == 0:
+        fftstar = rfft[..., -2:0:-1]
+    else:
+        fftstar = rfft[..., -1:0:-1]
+
+    fftstar = np.conj(fftstar)
+
+    if axes is None:
+        axes = range(rfft.ndim)
+
+    # Negative frequencies on the remaining axes map to -k mod n.
+    for axis in [axis % rfft.ndim for axis in axes][:-1]:
+        fftstar = np.roll(np.flip(fftstar, axis), 1, axis=axis)
+
+    return np.concatenate((rfft, fftstar), axis=-1)
+
+
+# Default cache shared by all statistics.
+fft_cache = FFTCache()
+
+
+def cached_rfftn(arr, norm=None, cache=None):
+    '''
+    RFFT of `arr` using the shared cache (or the `cache` given).
+    '''
+    if cache is None:
+        cache = fft_cache
+    return cache.rfftn(arr, norm=norm)
+
+
+def cached_fftn(arr, norm=None, cache=None):
+    '''
+    Full complex FFT of `arr` using the shared cache (or the `cache` given).
+    '''
+    if cache is None:
+        cache = fft_cache
+    return cache.fftn(arr, norm=norm)
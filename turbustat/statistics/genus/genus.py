@@ -8,7 +8,8 @@ from astropy.convolution import Gaussian2DKernel, convolve_fft
 from astropy.wcs import WCS
 import astropy.units as u
 
-from ..stats_utils import standardize, common_scale
+from ..stats_utils import standardize, common_scale, FourierGaussianSmoother
+from ..precision import as_working, convolve_fft_kwargs
 from ..base_statistic import BaseStatisticMixIn
 from ...io import common_types, twod_types, input_data, find_beam_properties
 
@@ -164,30 +165,64 @@ class Genus(BaseStatisticMixIn):
         self._smoothing_radii = values
 
 
-    def make_smooth_arrays(self, **kwargs):
+    def make_smooth_arrays(self, method='convolve', truncate=4.0, **kwargs):
         '''
         Smooth data using a Gaussian kernel. NaN interpolation during
         convolution is automatically used when the data contains any NaNs.
 
         Parameters
         ----------
-        kwargs: Passed to `~astropy.convolve.convolve_fft`.
+        method : {'convolve', 'fourier'}, optional
+            'convolve' uses `~astropy.convolve.convolve_fft` with an
+            image-sized `~astropy.convolution.Gaussian2DKernel` for each
+            radius. 'fourier' transforms the image once and multiplies by
+            the Gaussian transfer function for each radius (see
+            `~turbustat.statistics.stats_utils.FourierGaussianSmoother`).
+        truncate : float, optional
+            Used with 'fourier'. See
+            `~turbustat.statistics.stats_utils.FourierGaussianSmoother`.
+        kwargs: Passed to `~astropy.convolve.convolve_fft`. Only used with
+            'convolve'.
         '''
 
+        if method not in ['convolve', 'fourier']:
+            raise ValueError("method must be 'convolve' or 'fourier'. Given "
+                             "{}".format(method))
+
+        if method == 'fourier' and len(kwargs) > 0:
+            raise ValueError("Keyword arguments are passed to convolve_fft "
+                             "and cannot be used with method='fourier'. "
+                             "Given {}".format(list(kwargs.keys())))
+
         self._smoothed_images = []
 
+        data = as_working(self.data)
+
+        if method == 'fourier':
+            smoother = FourierGaussianSmoother(data,
+                                               np.max(self.smoothing_radii),
+                                               truncate=truncate)
+
+            for width in self.smoothing_radii:
+                self._smoothed_images.append(smoother.smooth(width))
+
+            return
+
+        conv_kwargs = convolve_fft_kwargs()
+        conv_kwargs.update(kwargs)
+
         for i, width in enumerate(self.smoothing_radii):
             kernel = Gaussian2DKernel(width, x_size=self.data.shape[0],
                                       y_size=self.data.shape[1])
             if self.nanflag:
-                self._smoothed_images.append(
-                    convolve_fft(self.data, kernel,
-                                 normalize_kernel=True,
-                                 interpolate_nan=True,
-                                 **kwargs))
+                smooth_img = convolve_fft(data, kernel,
+                                          normalize_kernel=True,
+                                          interpolate_nan=True,
+                                          **conv_kwargs)
             else:
-                self._smoothed_images.append(
-                    convolve_fft(self.data, kernel, **kwargs))
+                smooth_img = convolve_fft(data, kernel, **conv_kwargs)
+
+            self._smoothed_images.append(as_working(smooth_img))
 
     @property
     def smoothed_images(self):
@@ -28,7 +28,7 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 '''
 
-import statsmodels.api as sm
+
 import numpy as np
 import warnings
 from copy import copy
@@ -36,7 +36,21 @@ from copy import copy
 
 class Lm_Seg(object):
     """
-
+    Segmented linear model with a single break point. The break point is
+    found iteratively following Muggeo (2003).
+
+    Each iteration solves the normal equations directly on a re-used design
+    matrix. A statsmodels model is only created when the summary of a fit
+    is requested (see `OLSResults`).
+
+    Parameters
+    ----------
+    x : `~numpy.ndarray`
+        x values.
+    y : `~numpy.ndarray`
+        y values.
+    brk : float
+        Initial guess for the break point.
     """
 
     def __init__(self, x, y, brk):
@@ -67,14 +81,36 @@ class Lm_Seg(object):
     def fit_model(self, tol=1e-3, iter_max=100, h_step=2.0, epsil_0=10,
                   constant=True, verbose=True):
         '''
+        Fit the segmented model.
+
+        Parameters
+        ----------
+        tol : float, optional
+            Convergence tolerance on the relative change in the sum of
+            squared residuals.
+        iter_max : int, optional
+            Maximum number of iterations.
+        h_step : float, optional
+            Initial step size when updating the break point.
+        epsil_0 : float, optional
+            Initial relative change in the residuals.
+        constant : bool, optional
+            Include a constant in the initial model without a break.
+        verbose : bool, optional
+            Print the fit summary at each iteration.
         '''
+
+        # Design matrix [const, x, U, V]. Only the U and V columns change
+        # between iterations, so they are overwritten in place.
+        X_all = np.empty((self.x.size, 4))
+        X_all[:, 0] = 1.
+        X_all[:, 1] = self.x
+
         # Fit a normal linear model to the data
         if constant:
-            x_const = sm.add_constant(self.x)
-            model = sm.OLS(self.y, x_const)
+            init_lm = ols_fit(X_all[:, :2], self.y)
         else:
-            model = sm.OLS(self.y, self.x)
-        init_lm = model.fit()
+            init_lm = ols_fit(X_all[:, 1:2], self.y)
 
         if verbose:
             print(init_lm.summary())
@@ -83,12 +119,12 @@ class Lm_Seg(object):
 
         # Before we get into the loop, make sure that this was a bad fit
         if epsil_0 < tol:
-            warnings.warning('Initial epsilon is smaller than tolerance. \
-                             The tolerance should be set smaller.')
+            warnings.warn('Initial epsilon is smaller than tolerance. \
+                          The tolerance should be set smaller.')
             return init_lm
 
         # Sum of residuals
-        dev_0 = np.sum(init_lm.resid**2.)
+        dev_0 = init_lm.ssr
 
         # Catch cases where a break isn't necessary
         self.break_fail_flag = False
@@ -99,15 +135,9 @@ class Lm_Seg(object):
         # Now loop through and minimize the residuals by changing where the
         # breaking point is.
         while np.abs(epsil) > tol:
-            U = (self.x - self.brk) * (self.x > self.brk)
-            V = deriv_max(self.x, self.brk)
+            X_all[:, 2], X_all[:, 3] = break_columns(self.x, self.brk)
 
-            X_all = np.vstack([self.x, U, V]).T
-            if constant:
-                X_all = sm.add_constant(X_all)
-
-            model = sm.OLS(self.y, X_all)
-            fit = model.fit()
+            fit = ols_fit(X_all, self.y)
 
             beta = fit.params[2]  # Get coef
             gamma = fit.params[3]  # Get coef
@@ -139,7 +169,7 @@ class Lm_Seg(object):
             else:
                 self.brk = new_brk
 
-            dev_1 = np.sum(fit.resid**2.)
+            dev_1 = fit.ssr
 
             epsil = (dev_1 - dev_0) / (dev_0 + 1e-3)
 
@@ -159,20 +189,17 @@ class Lm_Seg(object):
                 break
 
         # Is the initial model without a break better?
-        if self.break_fail_flag or np.sum(init_lm.resid**2) <= np.sum(fit.resid**2):
+        if self.break_fail_flag or init_lm.ssr <= fit.ssr:
+            self.break_fail_flag = True
             self.brk = self.x.max()
 
-            X_all = sm.add_constant(self.x)
+            self.fit = ols_fit(X_all[:, :2], self.y)
         else:
             # With the break point hopefully found, do a final good fit
-            U = (self.x - self.brk) * (self.x > self.brk)
-            V = deriv_max(self.x, self.brk)
+            X_all[:, 2], X_all[:, 3] = break_columns(self.x, self.brk)
 
-            X_all = np.vstack([self.x, U, V]).T
-            X_all = sm.add_constant(X_all)
+            self.fit = ols_fit(X_all, self.y)
 
-        model = sm.OLS(self.y, X_all)
-        self.fit = model.fit()
         self._params = self.fit.params
         self._errs = self.fit.bse
 
@@ -215,10 +242,10 @@ class Lm_Seg(object):
                 self._slopes[s] = self.params[s + 1]
                 self._slope_errs[s] = self.param_errs[s + 1]
             else:
-                self._slopes[s] = self.params[s + 1] + self._slopes[:s]
+                self._slopes[s] = self.params[s + 1] + self._slopes[s - 1]
                 self._slope_errs[s] = \
                     np.sqrt(self.param_errs[s + 1] **
-                            2 + self._slope_errs[:s]**2)
+                            2 + self._slope_errs[s - 1]**2)
 
     @property
     def slopes(self):
@@ -251,10 +278,336 @@ class Lm_Seg(object):
         p.show()
 
 
+class OLSResults(object):
+    """
+    Results of an ordinary least squares fit. This provides the parts of
+    the statsmodels `RegressionResults` used in the package; the statsmodels
+    model is only built when `summary` is called.
+
+    Parameters
+    ----------
+    exog : `~numpy.ndarray`
+        Design matrix (n_points, n_params).
+    endog : `~numpy.ndarray`
+        Dependent variable.
+    params : `~numpy.ndarray`
+        Fitted parameters.
+    normalized_cov_params : `~numpy.ndarray`
+        :math:`(X^T X)^{-1}`.
+    """
+
+    def __init__(self, exog, endog, params, normalized_cov_params):
+        super(OLSResults, self).__init__()
+
+        self.exog = exog
+        self.endog = endog
+        self.params = params
+        self.normalized_cov_params = normalized_cov_params
+
+        self.fittedvalues = np.dot(exog, params)
+        self.resid = endog - self.fittedvalues
+        self.ssr = np.sum(self.resid**2)
+
+        self.nobs = float(endog.size)
+        self.df_resid = self.nobs - np.linalg.matrix_rank(exog)
+        self.scale = self.ssr / self.df_resid
+
+    def cov_params(self):
+        '''
+        Covariance matrix of the parameters.
+        '''
+        return self.normalized_cov_params * self.scale
+
+    @property
+    def bse(self):
+        '''
+        Standard errors of the parameters.
+        '''
+        return np.sqrt(np.diag(self.cov_params()))
+
+    def summary(self):
+        '''
+        Return the statsmodels summary table of the fit.
+        '''
+        import statsmodels.api as sm
+
+        return sm.OLS(self.endog, self.exog).fit().summary()
+
+
+def ols_fit(X, y):
+    '''
+    Ordinary least squares fit from the normal equations. Rows with
+    non-finite values are dropped (like `missing='drop'` in statsmodels).
+
+    Parameters
+    ----------
+    X : `~numpy.ndarray`
+        Design matrix (n_points, n_params).
+    y : `~numpy.ndarray`
+        Dependent variable.
+
+    Returns
+    -------
+    results : `OLSResults`
+        Fit results.
+    '''
+
+    if X.ndim == 1:
+        X = X[:, np.newaxis]
+
+    good_pts = np.isfinite(y) & np.isfinite(X).all(axis=1)
+    if good_pts.all():
+        # Copy so the results do not change if the buffer is re-used.
+        X = X.copy()
+    else:
+        X = X[good_pts]
+        y = y[good_pts]
+
+    normalized_cov = np.linalg.pinv(np.dot(X.T, X))
+    params = np.dot(normalized_cov, np.dot(X.T, y))
+
+    return OLSResults(X, y, params, normalized_cov)
+
+
+def fit_segmented_batch(x, ys, brks, tol=1e-3, iter_max=100, h_step=2.0,
+                        epsil_0=10):
+    '''
+    Fit segmented linear models to many sets of y values that share the
+    same x values. This follows `Lm_Seg.fit_model`, but the normal equations
+    of all models are solved together at each iteration. Non-finite y values
+    are excluded from the fit of that model only.
+
+    Parameters
+    ----------
+    x : `~numpy.ndarray`
+        Shared x values (n_points).
+    ys : `~numpy.ndarray`
+        y values of each model (n_models, n_points).
+    brks : float or `~numpy.ndarray`
+        Initial guess for the break point of each model.
+    tol : float, optional
+        See `Lm_Seg.fit_model`.
+    iter_max : int, optional
+        See `Lm_Seg.fit_model`.
+    h_step : float, optional
+        See `Lm_Seg.fit_model`.
+    epsil_0 : float, optional
+        See `Lm_Seg.fit_model`.
+
+    Returns
+    -------
+    results : dict
+        `params` and `bse` (n_models, 4), where the break terms are NaN when
+        no break is used; `brk` and `brk_err` (n_models); `slopes` and
+        `slope_errs` (n_models, 2), where the second slope is NaN when no
+        break is used; and `break_flag`, which is True where a break was
+        fit.
+    '''
+
+    x = np.asarray(x, dtype=float)
+    ys = np.atleast_2d(np.asarray(ys, dtype=float))
+
+    nmod, npts = ys.shape
+
+    if x.size != npts:
+        raise ValueError("ys must have shape (n_models, x.size).")
+
+    weights = np.isfinite(ys) & np.isfinite(x)
+    y0 = np.where(weights, ys, 0.)
+    x0 = np.where(np.isfinite(x), x, 0.)
+
+    if (weights.sum(1) <= 3).any():
+        raise Warning("Not enough finite points to fit.")
+
+    brk = np.empty(nmod)
+    brk[:] = brks
+
+    if not np.isfinite(brk).all():
+        raise ValueError("brk must be a finite value.")
+
+    x_min = np.where(weights, x0, np.inf).min(1)
+    x_max = np.where(weights, x0, -np.inf).max(1)
+
+    if (x_max < brk).any() or (x_min > brk).any():
+        raise ValueError("brk is outside the range in x.")
+
+    X_all = np.empty((nmod, npts, 4))
+    X_all[..., 0] = 1.
+    X_all[..., 1] = x0
+
+    init_params, init_cov, init_ssr, init_dof = \
+        ols_fit_batch(X_all[..., :2], y0, weights)
+
+    h_steps = np.empty(nmod)
+    h_steps[:] = h_step
+
+    dev_0 = init_ssr.copy()
+    fail = np.zeros(nmod, dtype=bool)
+    last_cov = np.full((nmod, 4, 4), np.nan)
+    last_ssr = np.full(nmod, np.inf)
+
+    if epsil_0 < tol:
+        warnings.warn('Initial epsilon is smaller than tolerance. \
+                      The tolerance should be set smaller.')
+        active = np.zeros(nmod, dtype=bool)
+    else:
+        active = np.ones(nmod, dtype=bool)
+
+    it = 0
+    while active.any():
+        idx = np.where(active)[0]
+
+        X_all[idx, :, 2], X_all[idx, :, 3] = \
+            break_columns(x0, brk[idx, np.newaxis])
+
+        params, cov, ssr, dof = ols_fit_batch(X_all[idx], y0[idx],
+                                              weights[idx])
+
+        last_cov[idx] = cov
+        last_ssr[idx] = ssr
+
+        step = params[:, 3] / params[:, 2]
+
+        # Halve the step size (up to 5 times) where the new break has no
+        # points on one side.
+        h_new = h_steps[idx]
+        new_brk = brk[idx] + h_new * step
+        valid = _brk_in_range(new_brk, x_min[idx], x_max[idx])
+
+        for h_it in range(5):
+            if valid.all():
+                break
+            h_new = np.where(valid, h_new, h_new / 2.)
+            new_brk = np.where(valid, new_brk, brk[idx] + h_new * step)
+            valid = _brk_in_range(new_brk, x_min[idx], x_max[idx])
+
+        h_steps[idx] = h_new
+        fail[idx] = ~valid
+        brk[idx] = np.where(valid, new_brk, brk[idx])
+
+        epsil = (ssr - dev_0[idx]) / (dev_0[idx] + 1e-3)
+        dev_0[idx] = ssr
+
+        it += 1
+
+        still_going = (np.abs(epsil) > tol) & valid
+
+        if it > iter_max:
+            if still_going.any():
+                warnings.warn("Max iterations reached. \
+                               Result may not be minimized.")
+            still_going[:] = False
+
+        active[idx] = still_going
+
+    # Is the initial model without a break better?
+    use_brk = ~fail & (init_ssr > last_ssr)
+
+    out_params = np.full((nmod, 4), np.nan)
+    out_bse = np.full((nmod, 4), np.nan)
+    brk_err = np.zeros(nmod)
+
+    out_params[:, :2] = init_params
+    out_bse[:, :2] = np.sqrt(np.diagonal(init_cov, axis1=1, axis2=2) *
+                             (init_ssr / init_dof)[:, np.newaxis])
+
+    if use_brk.any():
+        # Final fit with the break
+        idx = np.where(use_brk)[0]
+
+        X_all[idx, :, 2], X_all[idx, :, 3] = \
+            break_columns(x0, brk[idx, np.newaxis])
+
+        params, cov, ssr, dof = ols_fit_batch(X_all[idx], y0[idx],
+                                              weights[idx])
+
+        out_params[idx] = params
+        out_bse[idx] = np.sqrt(np.diagonal(cov, axis1=1, axis2=2) *
+                               (ssr / dof)[:, np.newaxis])
+
+        # As in Lm_Seg, the break error uses the covariance from the last
+        # iteration.
+        last_cov = last_cov[idx] * \
+            (last_ssr[idx] / dof)[:, np.newaxis, np.newaxis]
+        for i, j in enumerate(idx):
+            brk_err[j] = brk_errs(params[i], last_cov[i])
+
+    brk = np.where(use_brk, brk, x_max)
+
+    slopes = np.empty((nmod, 2))
+    slope_errs = np.empty((nmod, 2))
+    slopes[:, 0] = out_params[:, 1]
+    slope_errs[:, 0] = out_bse[:, 1]
+    slopes[:, 1] = out_params[:, 1] + out_params[:, 2]
+    slope_errs[:, 1] = np.sqrt(out_bse[:, 1]**2 + out_bse[:, 2]**2)
+
+    return {"params": out_params, "bse": out_bse, "brk": brk,
+            "brk_err": brk_err, "slopes": slopes, "slope_errs": slope_errs,
+            "break_flag": use_brk}
+
+
+def ols_fit_batch(X, y, weights):
+    '''
+    Solve stacked least squares problems from the normal equations.
+
+    Parameters
+    ----------
+    X : `~numpy.ndarray`
+        Design matrices (n_models, n_points, n_params).
+    y : `~numpy.ndarray`
+        Dependent variables (n_models, n_points).
+    weights : `~numpy.ndarray`
+        Boolean array (n_models, n_points). Points with zero weight are
+        excluded and must have finite values in `X` and `y`.
+
+    Returns
+    -------
+    params : `~numpy.ndarray`
+        Fitted parameters (n_models, n_params).
+    normalized_cov : `~numpy.ndarray`
+        :math:`(X^T X)^{-1}` of each model.
+    ssr : `~numpy.ndarray`
+        Sum of squared residuals.
+    dof : `~numpy.ndarray`
+        Residual degrees of freedom.
+    '''
+    Xw = X * weights[..., np.newaxis]
+
+    XtX = np.einsum('nij,nik->njk', Xw, X)
+    Xty = np.einsum('nij,ni->nj', Xw, y)
+
+    normalized_cov = np.linalg.pinv(XtX)
+    params = np.einsum('njk,nk->nj', normalized_cov, Xty)
+
+    resid = (y - np.einsum('nij,nj->ni', X, params)) * weights
+    ssr = np.sum(resid**2, axis=1)
+
+    dof = weights.sum(1) - np.linalg.matrix_rank(XtX)
+
+    return params, normalized_cov, ssr, dof
+
+
+def _brk_in_range(brk, x_min, x_max):
+    '''
+    A valid break point must have points on both sides.
+    '''
+    return (brk < x_max) & (brk >= x_min)
+
+
+def break_columns(x, brk):
+    '''
+    The U and V terms of the segmented model design matrix.
+    '''
+    U = (x - brk) * (x > brk)
+    V = deriv_max(x, brk)
+
+    return U, V
+
+
 def deriv_max(a, b, pow=1):
     if pow == 1:
-        dum = -1 * np.ones(a.shape)
-        dum[a < b] = 0
+        dum = -1 * np.ones(np.broadcast(a, b).shape)
+        dum[np.broadcast_to(a < b, dum.shape)] = 0
         return dum
     else:
         return -pow * np.max(a - b, axis=0) ** (pow - 1)
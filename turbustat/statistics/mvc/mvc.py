@@ -2,7 +2,7 @@
 from __future__ import print_function, absolute_import, division
 
 import numpy as np
-from numpy.fft import fft2, fftshift
+from numpy.fft import fftshift
 import astropy.units as u
 from warnings import warn
 
@@ -10,6 +10,9 @@ from ..base_pspec2 import StatisticBase_PSpec2D
 from ..base_statistic import BaseStatisticMixIn
 from ...io import input_data, common_types, twod_types
 from ..fitting_utils import check_fit_limits
+from ..fft_cache import rfft_to_complex_fft
+from ..precision import rfftn, as_working
+from ..apodizing_kernels import apodize_and_pad
 
 
 class MVC(BaseStatisticMixIn, StatisticBase_PSpec2D):
@@ -96,7 +99,8 @@ class MVC(BaseStatisticMixIn, StatisticBase_PSpec2D):
         '''
         return self._linewidth
 
-    def compute_pspec(self):
+    def compute_pspec(self, apodize_kernel=None, alpha=0.3, beta=0.0,
+                      pad_to_fast_len=False):
         '''
         Compute the 2D power spectrum.
 
@@ -108,24 +112,34 @@ class MVC(BaseStatisticMixIn, StatisticBase_PSpec2D):
         An unnormalized centroid can be constructed by multiplying the centroid
         array by the moment0. Velocity dispersion is the square of the
         linewidth subtracted by the square of the normalized centroid.
-        '''
-
-        term1 = fft2(self.centroid * self.moment0)
-
-        # Account for normalization in the line width.
-        term2 = np.nanmean(self.linewidth**2 + self.centroid**2)
-
-        mvc_fft = term1 - term2 * fft2(self.moment0)
 
-        # Shift to the center
-        mvc_fft = fftshift(mvc_fft)
+        Parameters
+        ----------
+        apodize_kernel : {None, 'tukey', 'hanning', 'splitcosinebell'}, optional
+            Apodizing window applied to the arrays before the FFT. See
+            `~turbustat.statistics.apodizing_kernels.apodizing_window`.
+            The window is divided by the square root of its mean squared
+            value so the spectrum amplitude does not depend on the window.
+        alpha : float, optional
+            Taper fraction of the 'tukey' and 'splitcosinebell' windows.
+        beta : float, optional
+            Fraction of the 'splitcosinebell' window that is not tapered.
+        pad_to_fast_len : bool, optional
+            Zero-pad the arrays to the next size with a fast FFT.
+        '''
 
-        self._ps2D = np.abs(mvc_fft) ** 2.
+        self._ps2D = mvc_pspec_batch(self.centroid[np.newaxis],
+                                     self.moment0[np.newaxis],
+                                     self.linewidth[np.newaxis],
+                                     apodize_kernel=apodize_kernel,
+                                     alpha=alpha, beta=beta,
+                                     pad_to_fast_len=pad_to_fast_len)[0]
 
     def run(self, verbose=False, save_name=None, logspacing=False,
             return_stddev=True, low_cut=None, high_cut=None,
             fit_2D=True, fit_2D_kwargs={},
-            xunit=u.pix**-1, use_wavenumber=False, **fit_kwargs):
+            xunit=u.pix**-1, use_wavenumber=False, apodize_kernel=None,
+            alpha=0.3, beta=0.0, pad_to_fast_len=False, **fit_kwargs):
         '''
         Full computation of MVC. For fitting parameters and radial binning
         options, see `~turbustat.statistics.base_pspec2.StatisticBase_PSpec2D`.
@@ -153,10 +167,19 @@ class MVC(BaseStatisticMixIn, StatisticBase_PSpec2D):
             Choose the angular unit to convert to when ang_units is enabled.
         use_wavenumber : bool, optional
             Plot the x-axis as the wavenumber rather than spatial frequency.
+        apodize_kernel : {None, 'tukey', 'hanning', 'splitcosinebell'}, optional
+            Passed to `~MVC.compute_pspec`.
+        alpha : float, optional
+            Passed to `~MVC.compute_pspec`.
+        beta : float, optional
+            Passed to `~MVC.compute_pspec`.
+        pad_to_fast_len : bool, optional
+            Passed to `~MVC.compute_pspec`.
         fit_kwargs : Passed to `~MVC.fit_pspec`.
         '''
 
-        self.compute_pspec()
+        self.compute_pspec(apodize_kernel=apodize_kernel, alpha=alpha,
+                           beta=beta, pad_to_fast_len=pad_to_fast_len)
         self.compute_radial_pspec(logspacing=logspacing,
                                   return_stddev=return_stddev)
         self.fit_pspec(low_cut=low_cut, high_cut=high_cut, **fit_kwargs)
@@ -178,6 +201,81 @@ class MVC(BaseStatisticMixIn, StatisticBase_PSpec2D):
         return self
 
 
+def mvc_pspec_batch(centroids, moment0s, linewidths, apodize_kernel=None,
+                    alpha=0.3, beta=0.0, pad_to_fast_len=False):
+    r'''
+    Compute the 2D MVC power spectra of many sets of centroid, zeroth moment
+    and line width arrays with one stacked FFT (e.g., all time steps of a
+    simulation). See `~MVC.compute_pspec` for a description of the quantity.
+
+    The MVC transform, :math:`\mathcal{F}(C M_0) - \langle L^2 + C^2
+    \rangle \mathcal{F}(M_0)`, is equal to the transform of
+    :math:`C M_0 - \langle L^2 + C^2 \rangle M_0` since the FFT is linear.
+    Only this real array is transformed, with a real FFT.
+
+    Parameters
+    ----------
+    centroids : `~numpy.ndarray`
+        Normalized centroid arrays stacked along the first axis.
+    moment0s : `~numpy.ndarray`
+        Zeroth moment arrays with the same shape as `centroids`.
+    linewidths : `~numpy.ndarray`
+        Line width arrays with the same shape as `centroids`.
+    apodize_kernel : {None, 'tukey', 'hanning', 'splitcosinebell'}, optional
+        See `~MVC.compute_pspec`.
+    alpha : float, optional
+        See `~MVC.compute_pspec`.
+    beta : float, optional
+        See `~MVC.compute_pspec`.
+    pad_to_fast_len : bool, optional
+        See `~MVC.compute_pspec`.
+
+    Returns
+    -------
+    ps2Ds : `~numpy.ndarray`
+        2D power spectra, shifted to the center, stacked along the first
+        axis.
+    '''
+
+    arrays = []
+    for arr in (centroids, moment0s, linewidths):
+        arr = np.asarray(arr, dtype=np.float64)
+
+        if arr.ndim != 3:
+            raise ValueError("The arrays must be 3D, with the images stacked "
+                             "along the first axis.")
+
+        # Replace NaNs with the minimum of each image, as in MVC.
+        if np.isnan(arr).any():
+            arr = np.where(np.isnan(arr),
+                           np.nanmin(arr, axis=(1, 2), keepdims=True), arr)
+
+        arrays.append(arr)
+
+    centroids, moment0s, linewidths = arrays
+
+    if centroids.shape != moment0s.shape or \
+            centroids.shape != linewidths.shape:
+        raise IndexError("The centroid, moment0, and linewidth arrays must"
+                         "have the same shape.")
+
+    # Account for normalization in the line width.
+    term2 = np.nanmean(linewidths**2 + centroids**2, axis=(1, 2),
+                       keepdims=True)
+
+    mvc_arr = apodize_and_pad((centroids - term2) * moment0s,
+                              apodize_kernel=apodize_kernel, alpha=alpha,
+                              beta=beta, pad_to_fast_len=pad_to_fast_len)
+
+    mvc_rfft = rfftn(as_working(mvc_arr), axes=(1, 2))
+
+    ps2Ds = rfft_to_complex_fft(np.square(np.abs(mvc_rfft), dtype=np.float64),
+                                mvc_arr.shape[-1], axes=(1, 2))
+
+    # Shift to the center
+    return fftshift(ps2Ds, axes=(1, 2))
+
+
 class MVC_Distance(object):
     """
     Distance metric for MVC.
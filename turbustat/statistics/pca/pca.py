@@ -4,6 +4,8 @@ from __future__ import print_function, absolute_import, division
 import numpy as np
 import astropy.units as u
 from warnings import warn
+from scipy.linalg import eigh
+from scipy.sparse.linalg import eigsh, ArpackNoConvergence
 
 from ..base_statistic import BaseStatisticMixIn
 from ...io import common_types, threed_types, input_data, find_beam_width
@@ -15,6 +17,10 @@ from .width_estimate import WidthEstimate1D, WidthEstimate2D
 # Fitting utilities
 from ..fitting_utils import bayes_linear, leastsq_linear
 
+# With eigen_solver='auto', only the leading eigenvalues are computed when the
+# covariance matrix has at least this many channels.
+PARTIAL_EIGEN_MIN_SIZE = 256
+
 
 class PCA(BaseStatisticMixIn):
 
@@ -77,7 +83,7 @@ class PCA(BaseStatisticMixIn):
         self._n_eigs = value
 
     def compute_pca(self, mean_sub=False, n_eigs='auto', min_eigval=None,
-                    eigen_cut_method='value'):
+                    eigen_cut_method='value', eigen_solver='auto'):
         '''
         Create the covariance matrix and its eigenvalues.
 
@@ -105,6 +111,13 @@ class PCA(BaseStatisticMixIn):
             Set whether `min_eigval` is the proportion of variance determined
             up to the Nth eigenvalue (`proportion`) or the minimum value of
             variance (`value`).
+        eigen_solver : {'auto', 'full', 'partial'}, optional
+            'full' computes all eigenvalues and eigenvectors. 'partial' only
+            computes the leading eigenvalues needed for `n_eigs`, and the
+            total variance is found from the trace of the covariance matrix.
+            The eigenvectors used in `~PCA.noise_ACF` are then computed when
+            needed. 'auto' uses 'partial' when there are at least
+            `PARTIAL_EIGEN_MIN_SIZE` channels.
 
         '''
 
@@ -112,36 +125,85 @@ class PCA(BaseStatisticMixIn):
             raise ValueError("min_eigval must be given when using "
                              "n_eigs='auto'.")
 
+        if n_eigs != 'auto' and n_eigs != -1:
+            if n_eigs < -1 or n_eigs > self.spectral_shape or n_eigs == 0:
+                raise Warning("n_eigs must be less than the number of velocity"
+                              " channels ({}) or -1 for"
+                              " all".format(self.spectral_shape))
+
+        if eigen_solver not in ['auto', 'full', 'partial']:
+            raise ValueError("eigen_solver must be 'auto', 'full' or "
+                             "'partial'. Given {}".format(eigen_solver))
+
         self.cov_matrix = var_cov_cube(self.data, mean_sub=mean_sub)
 
-        all_eigsvals, eigvecs = np.linalg.eigh(self.cov_matrix)
-        all_eigsvals = np.real_if_close(all_eigsvals)
-        eigvecs = eigvecs[:, np.argsort(all_eigsvals)[::-1]]
-        all_eigsvals = np.sort(all_eigsvals)[::-1]  # Sort by maximum
+        if eigen_solver == 'auto':
+            if self.spectral_shape >= PARTIAL_EIGEN_MIN_SIZE:
+                eigen_solver = 'partial'
+            else:
+                eigen_solver = 'full'
+
+        # All eigenvalues are needed in this case.
+        if n_eigs == -1:
+            eigen_solver = 'full'
+
+        all_eigsvals = None
+
+        if eigen_solver == 'partial':
+            trace = np.trace(self.cov_matrix)
+
+            if n_eigs == 'auto':
+                # Increase the number of eigenvalues until the cut-off is
+                # reached. Beyond a quarter of the channels, the full solve
+                # is as fast.
+                num = min(16, self.spectral_shape)
+                while True:
+                    eigsvals, eigvecs = _leading_eigh(self.cov_matrix, num)
+                    n_above = set_n_eigs(eigsvals, min_eigval,
+                                         method=eigen_cut_method,
+                                         total=trace)
+                    if n_above < num:
+                        break
+                    num *= 2
+                    if num > self.spectral_shape // 4:
+                        eigen_solver = 'full'
+                        break
+            else:
+                eigsvals, eigvecs = _leading_eigh(self.cov_matrix, n_eigs)
+
+        if eigen_solver == 'full':
+            all_eigsvals, eigvecs = np.linalg.eigh(self.cov_matrix)
+            all_eigsvals = np.real_if_close(all_eigsvals)
+            eigvecs = eigvecs[:, np.argsort(all_eigsvals)[::-1]]
+            all_eigsvals = np.sort(all_eigsvals)[::-1]  # Sort by maximum
+
+            eigsvals = all_eigsvals
+            trace = np.sum(all_eigsvals)
 
         if n_eigs == 'auto':
-            self.n_eigs = set_n_eigs(all_eigsvals, min_eigval,
-                                     method=eigen_cut_method)
+            self.n_eigs = set_n_eigs(eigsvals, min_eigval,
+                                     method=eigen_cut_method,
+                                     total=trace)
         elif n_eigs == -1:
             self.n_eigs = self.spectral_shape
-        elif n_eigs < -1 or n_eigs > self.spectral_shape or n_eigs == 0:
-            raise Warning("n_eigs must be less than the number of velocity"
-                          " channels ({}) or -1 for"
-                          " all".format(self.spectral_shape))
         else:
             self.n_eigs = n_eigs
 
         if mean_sub:
-            self._total_variance = np.sum(all_eigsvals)
-            self._var_prop = np.sum(all_eigsvals[:self.n_eigs]) / \
+            self._total_variance = trace
+            self._var_prop = np.sum(eigsvals[:self.n_eigs]) / \
                 self.total_variance
         else:
-            self._total_variance = np.sum(all_eigsvals[1:])
-            self._var_prop = np.sum(all_eigsvals[1:self.n_eigs]) / \
+            if all_eigsvals is not None:
+                self._total_variance = np.sum(all_eigsvals[1:])
+            else:
+                self._total_variance = trace - eigsvals[0]
+            self._var_prop = np.sum(eigsvals[1:self.n_eigs]) / \
                 self.total_variance
 
-        self._eigvals = all_eigsvals
+        self._eigvals = eigsvals
         self._eigvecs = eigvecs
+        self._partial_eigen = all_eigsvals is None
 
         self._mean_sub = mean_sub
 
@@ -163,14 +225,16 @@ class PCA(BaseStatisticMixIn):
     @property
     def eigvals(self):
         '''
-        All eigenvalues.
+        All eigenvalues. Only the leading eigenvalues when computed with
+        `eigen_solver='partial'` in `~PCA.compute_pca`.
         '''
         return self._eigvals
 
     @property
     def eigvecs(self):
         '''
-        All eigenvectors.
+        All eigenvectors. Only the leading eigenvectors when computed with
+        `eigen_solver='partial'` in `~PCA.compute_pca`.
         '''
         return self._eigvecs
 
@@ -184,6 +248,35 @@ class PCA(BaseStatisticMixIn):
 
         return np.where(self.eigvals >= np.finfo(self.data.dtype).eps)[0]
 
+    def _trailing_eigvecs(self, num):
+        '''
+        The last `num` eigenvectors whose eigenvalues are above the machine
+        precision limit. These are computed from the covariance matrix when
+        only the leading eigenvectors are kept.
+        '''
+
+        if not self._partial_eigen:
+            return self.eigvecs[:, self._valid_eigenvectors()[-num:]]
+
+        eps = np.finfo(self.data.dtype).eps
+
+        # Include more of the smallest eigenvalues until enough are above
+        # the precision limit.
+        num_solve = num
+        while True:
+            num_solve = min(num_solve, self.spectral_shape)
+            eigsvals, eigvecs = \
+                _eigh_subset(self.cov_matrix, 0, num_solve - 1)
+            eigsvals = np.real_if_close(eigsvals)[::-1]
+            eigvecs = eigvecs[:, ::-1]
+
+            valid = np.where(eigsvals >= eps)[0]
+
+            if valid.size >= num or num_solve == self.spectral_shape:
+                return eigvecs[:, valid[-num:]]
+
+            num_solve *= 2
+
     def eigimages(self, n_eigs=None):
         '''
         Create eigenimages up to the n_eigs.
@@ -205,25 +298,25 @@ class PCA(BaseStatisticMixIn):
             n_eigs = self.n_eigs
 
         if n_eigs > 0:
-            iterat = range(n_eigs)
+            eigvecs = self.eigvecs[:, :n_eigs]
         elif n_eigs < 0:
             # We're looking for the noisy components whenever n_eigs < 0
             # Find where we have valid eigenvalues, and use the last
             # n_eigs of those.
-            iterat = self._valid_eigenvectors()[n_eigs:]
+            eigvecs = self._trailing_eigvecs(-n_eigs)
 
-        for ct, idx in enumerate(iterat):
+        for ct in range(eigvecs.shape[1]):
             eigimg = np.zeros(self.data.shape[1:], dtype=float)
             for channel in range(self.data.shape[0]):
                 if self._mean_sub:
                     mean_value = np.nanmean(self.data[channel])
                     eigimg += np.nan_to_num((self.data[channel] - mean_value) *
                                             np.real_if_close(
-                                                self.eigvecs[channel, idx]))
+                                                eigvecs[channel, ct]))
                 else:
                     eigimg += np.nan_to_num(self.data[channel] *
                                             np.real_if_close(
-                                                self.eigvecs[channel, idx]))
+                                                eigvecs[channel, ct]))
             if ct == 0:
                 eigimgs = eigimg
             else:
@@ -287,21 +380,26 @@ class PCA(BaseStatisticMixIn):
         Returns
         -------
         acors : np.ndarray
-            2D array, where the first dimension if the number of eigenvalues.
+            2D array, where the second dimension is the number of
+            eigenvalues.
         '''
         if n_eigs is None:
             n_eigs = self.n_eigs
 
-        for idx in range(n_eigs):
-            fftx = np.fft.fft(self.eigvecs[:, idx])
-            fftxs = np.conjugate(fftx)
-            acor = np.fft.ifft((fftx - fftx.mean()) * (fftxs - fftxs.mean()))
-            if idx == 0:
-                acors = acor.real
-            else:
-                acors = np.dstack((acors, acor.real))
+        if n_eigs > 0:
+            eigvecs = self.eigvecs[:, :n_eigs]
+        elif n_eigs < 0:
+            eigvecs = self._trailing_eigvecs(-n_eigs)
+        else:
+            raise ValueError("n_eigs cannot be 0.")
 
-        return acors.swapaxes(0, 1).squeeze()
+        # Transform all of the eigenvectors at once along the spectral axis.
+        fftx = np.fft.fft(eigvecs, axis=0)
+        fftxs = np.conjugate(fftx)
+        acors = np.fft.ifft((fftx - fftx.mean(axis=0)) *
+                            (fftxs - fftxs.mean(axis=0)), axis=0).real
+
+        return acors.squeeze()
 
     def noise_ACF(self, n_eigs=-10):
         '''
@@ -329,7 +427,7 @@ class PCA(BaseStatisticMixIn):
     def find_spatial_widths(self, method='contour',
                             brunt_beamcorrect=True, beam_fwhm=None,
                             output_unit=u.pix, distance=None,
-                            diagnosticplots=False, **fit_kwargs):
+                            diagnosticplots=False, n_jobs=1, **fit_kwargs):
         '''
         Derive the spatial widths using the autocorrelation of the
         eigenimages.
@@ -360,6 +458,9 @@ class PCA(BaseStatisticMixIn):
         diagnosticplots : bool, optional
             Plot the first 9 autocorrelation images with the contour fits.
             *Only implemented for* `method='contour'`.
+        n_jobs : int, optional
+            Number of processes to run the ellipse fits in when method is
+            'contour'.
         fit_kwargs : dict, optional
             Used when method is 'contour'. Passed to
             `turbustat.statistics.stats_utils.EllipseModel.estimate_stderrs`.
@@ -379,7 +480,7 @@ class PCA(BaseStatisticMixIn):
                             beam_fwhm=beam_fwhm,
                             spatial_cdelt=self.header['CDELT2'] * u.deg,
                             diagnosticplots=diagnosticplots,
-                            **fit_kwargs)
+                            n_jobs=n_jobs, **fit_kwargs)
 
         self._spatial_width = self._spatial_width * u.pix
         self._spatial_width_error = self._spatial_width_error * u.pix
@@ -663,7 +764,8 @@ class PCA(BaseStatisticMixIn):
 
     def run(self, verbose=False, save_name=None, mean_sub=False,
             decomp_only=False, n_eigs='auto', min_eigval=None,
-            eigen_cut_method='value', spatial_method='contour',
+            eigen_cut_method='value', eigen_solver='auto',
+            spatial_method='contour',
             spectral_method='walk-down', fit_method='odr',
             beam_fwhm=None, brunt_beamcorrect=True,
             spatial_output_unit=u.pix, spectral_output_unit=u.pix):
@@ -688,6 +790,8 @@ class PCA(BaseStatisticMixIn):
             See `~PCA.compute_pca`
         eigen_cut_method : {'proportion', 'value'}, optional
             See `~PCA.compute_pca`
+        eigen_solver : {'auto', 'full', 'partial'}, optional
+            See `~PCA.compute_pca`
         spatial_method : str, optional
             See `~PCA.fit_spatial_widths`.
         spectral_method : str, optional
@@ -710,7 +814,8 @@ class PCA(BaseStatisticMixIn):
 
         self.compute_pca(mean_sub=mean_sub, n_eigs=n_eigs,
                          min_eigval=min_eigval,
-                         eigen_cut_method=eigen_cut_method)
+                         eigen_cut_method=eigen_cut_method,
+                         eigen_solver=eigen_solver)
 
         # Run rest of the analysis
         if not decomp_only:
@@ -923,7 +1028,7 @@ def brunt_index_correct(value):
         return (value - 0.03) / 1.07
 
 
-def set_n_eigs(eigenvalues, min_eigval, method='value'):
+def set_n_eigs(eigenvalues, min_eigval, method='value', total=None):
     '''
     Based on a minimum eigenvalue, find the number of components to consider.
     The cut-off may be the proportion of variance (method='proportion') or a
@@ -939,6 +1044,10 @@ def set_n_eigs(eigenvalues, min_eigval, method='value'):
         If `value`, `min_eigval` is the smallest eigenvalue to consider
         important. If `proportion`, `min_eigval` is the proportion of
         variance at which to cut at (i.e., 0.99 for 99%).
+    total : float, optional
+        Total variance used with `method='proportion'`. Defaults to the sum
+        of `eigenvalues`. Must be given when only the leading eigenvalues are
+        passed.
 
     Returns
     -------
@@ -953,7 +1062,10 @@ def set_n_eigs(eigenvalues, min_eigval, method='value'):
 
     elif method == "proportion":
 
-        cumulative = np.cumsum(eigenvalues / eigenvalues.sum())
+        if total is None:
+            total = eigenvalues.sum()
+
+        cumulative = np.cumsum(eigenvalues / total)
 
         above = np.where(cumulative <= min_eigval)[0]
 
@@ -963,6 +1075,47 @@ def set_n_eigs(eigenvalues, min_eigval, method='value'):
         raise ValueError("method must be 'value' or 'proportion'.")
 
 
+def _eigh_subset(matrix, lo, hi):
+    '''
+    Eigenvalues and eigenvectors of a symmetric matrix with indices `lo` to
+    `hi` (inclusive) in ascending order.
+    '''
+
+    # subset_by_index was added in scipy 1.5 and replaces the eigvals
+    # keyword, which is removed in newer versions.
+    try:
+        return eigh(matrix, subset_by_index=[lo, hi])
+    except TypeError:
+        return eigh(matrix, eigvals=(lo, hi))
+
+
+def _leading_eigh(cov_matrix, num):
+    '''
+    Largest `num` eigenvalues and their eigenvectors of a symmetric matrix,
+    sorted by decreasing eigenvalue.
+    '''
+
+    size = cov_matrix.shape[0]
+
+    eigsvals = None
+
+    # Lanczos iterations are much faster when few eigenvalues are needed.
+    if num <= size // 10:
+        v0 = np.random.RandomState(0).uniform(size=size)
+        try:
+            eigsvals, eigvecs = eigsh(cov_matrix, k=num, which='LA', v0=v0)
+        except ArpackNoConvergence:
+            pass
+
+    if eigsvals is None:
+        eigsvals, eigvecs = _eigh_subset(cov_matrix, size - num, size - 1)
+
+    eigsvals = np.real_if_close(eigsvals)
+    order = np.argsort(eigsvals)[::-1]
+
+    return eigsvals[order], eigvecs[:, order]
+
+
 def _enforce_velocity_axis(pca_obj):
     '''
     Enforce spectral_size be in velocity units.
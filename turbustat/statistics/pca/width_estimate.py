@@ -4,18 +4,18 @@ from __future__ import print_function, absolute_import, division
 from warnings import warn
 import numpy as np
 import numpy.fft as fft
-from scipy.interpolate import LSQUnivariateSpline, interp1d
-from astropy.modeling import fitting, models
+from scipy.interpolate import LSQUnivariateSpline
+from astropy.modeling import fitting
 from astropy.modeling import models as astropy_models
-from scipy.signal import argrelmin
 # from ..stats_utils import EllipseModel
-from turbustat.statistics.stats_utils import EllipseModel
+from turbustat.statistics.stats_utils import EllipseModel, parallel_map
 import astropy.units as u
 
 
 def WidthEstimate2D(inList, method='contour', noise_ACF=0,
                     diagnosticplots=False, brunt_beamcorrect=True,
-                    beam_fwhm=None, spatial_cdelt=None, **fit_kwargs):
+                    beam_fwhm=None, spatial_cdelt=None, n_jobs=1,
+                    **fit_kwargs):
     """
     Estimate spatial widths from a set of autocorrelation images.
 
@@ -49,9 +49,13 @@ def WidthEstimate2D(inList, method='contour', noise_ACF=0,
     spatial_cdelt : {None, astropy.units.Quantity}, optional
         The angular scale of a pixel in the given data. Must be given when
         using brunt_beamcorrect.
+    n_jobs : int, optional
+        Number of processes to run the ellipse fits in when method is
+        'contour'.
     fit_kwargs : dict, optional
         Used when method is 'contour'. Passed to
         `turbustat.statistics.stats_utils.EllipseModel.estimate_stderrs`.
+        A `seed` given here sets the bootstrap seeds for all of the images.
 
     Returns
     -------
@@ -82,6 +86,9 @@ def WidthEstimate2D(inList, method='contour', noise_ACF=0,
     ymat = np.fft.fftshift(ymat)
     rmat = (xmat**2 + ymat**2)**0.5
 
+    # Vertices of the 1/e contour for each image with method='contour'
+    contour_pts = [None] * len(inList)
+
     for idx, zraw in enumerate(inList):
         z = zraw - noise_ACF
 
@@ -174,27 +181,44 @@ def WidthEstimate2D(inList, method='contour', noise_ACF=0,
             if len(paths) > 0:
                 pidx = np.where([p.contains_point((0, 0)) for p in paths])[0]
                 if pidx.shape[0] > 0:
-                    good_path = paths[pidx[0]]
-
-                    output = fit_2D_ellipse(good_path.vertices, **fit_kwargs)
-                    (y_scales[idx], x_scales[idx], y_scale_errors[idx],
-                     x_scale_errors[idx], ellip) = output
-
-                else:
-                    y_scales[idx] = np.nan
-                    x_scales[idx] = np.nan
-                    y_scale_errors[idx] = np.nan
-                    x_scale_errors[idx] = np.nan
-                    ellip = None
-            else:
-                y_scales[idx] = np.nan
-                x_scales[idx] = np.nan
-                y_scale_errors[idx] = np.nan
-                x_scale_errors[idx] = np.nan
-                ellip = None
-
-            if diagnosticplots and idx < 9 and ellip is not None:
-                import matplotlib.pyplot as plt
+                    contour_pts[idx] = paths[pidx[0]].vertices
+
+    if method == 'contour':
+        # The ellipse fits are run together once all of the contours are
+        # found so the bootstrapping can be split between processes. Each
+        # image gets its own seed so the results do not depend on n_jobs.
+        rng = np.random.RandomState(fit_kwargs.pop('seed', None))
+        seeds = rng.randint(0, 2**31 - 1, size=len(inList))
+
+        fit_idx = [idx for idx in range(len(inList))
+                   if contour_pts[idx] is not None]
+        fit_args = [(contour_pts[idx], seeds[idx], fit_kwargs)
+                    for idx in fit_idx]
+
+        outputs = parallel_map(_fit_2D_ellipse_args, fit_args,
+                               n_jobs=n_jobs)
+
+        y_scales[:] = np.nan
+        x_scales[:] = np.nan
+        y_scale_errors[:] = np.nan
+        x_scale_errors[:] = np.nan
+
+        ellips = [None] * len(inList)
+
+        for idx, output in zip(fit_idx, outputs):
+            (y_scales[idx], x_scales[idx], y_scale_errors[idx],
+             x_scale_errors[idx], ellips[idx]) = output
+
+        if diagnosticplots:
+            import matplotlib.pyplot as plt
+
+            for idx in range(min(9, len(inList))):
+                ellip = ellips[idx]
+                if ellip is None:
+                    continue
+
+                z = inList[idx] - noise_ACF
+
                 ax = plt.subplot(3, 3, idx + 1)
                 ax.imshow(z, cmap='afmhot')
                 ax.contour(z, levels=np.array([np.exp(-1)]) * z.max(),
@@ -277,7 +301,7 @@ def WidthEstimate1D(inList, method='walk-down'):
     '''
     Find widths from spectral eigenvectors. These eigenvectors should already
     be normalized. Widths are defined by the location where 1/e of the maximum
-    occurs.
+    occurs. All of the eigenvectors are handled at once.
 
     .. note:: If the spectral dimension is small in the given eigenvectors
       (i.e., their length), the 1/e level might not be reached. If this is the
@@ -309,68 +333,211 @@ def WidthEstimate1D(inList, method='walk-down'):
         Uncertainty estimations on the scales.
 
     '''
-    scales = np.zeros((inList.shape[1],))
-    scale_errors = np.zeros((inList.shape[1],))
-    for idx, y in enumerate(inList.T):
-        x = fft.fftfreq(len(y)) * len(y) / 2.0
-        if method == 'interpolate':
-            minima = argrelmin(y)[0]
-            if minima[0] > 1:
-                warn("Error estimation not implemented for interpolation!")
-                interpolator = interp1d(y[0:minima[0] + 1], x[0:minima[0] + 1])
-                try:
-                    scales[idx] = interpolator(np.exp(-1))
-                except ValueError:
-                    warn("Interpolation failed.")
-                    scales[idx] = np.NaN
-                # scale_errors[idx] = ??
-        elif method == 'fit':
-            g = models.Gaussian1D(amplitude=y[0], mean=[0], stddev=[10],
-                                  fixed={'amplitude': True, 'mean': True})
-            fit_g = fitting.LevMarLSQFitter()
-            minima = argrelmin(y)[0]
-            if minima[0] > 1:
-                xtrans = np.abs(x)[0:minima[0]]
-                yfit = y[0:minima[0]]
-            else:
-                xtrans = np.abs(x)
-                yfit = y
-            output = fit_g(g, xtrans, yfit)
-            # Pull out errors from cov matrix. Stddev is the last parameter in
-            # the list
-            # If the fit failed, param_cov will be None. If this occurs, fill
-            # in NaNs.
-            if fit_g.fit_info['param_cov'] is None:
-                warn("Fitting failed.")
-                scales[idx] = np.NaN
-                scale_errors[idx] = np.NaN
-                continue
-
-            errors = np.sqrt(np.abs(fit_g.fit_info['param_cov'].diagonal()))
-            scales[idx] = np.abs(output.stddev.value[0]) * np.sqrt(2)
-            scale_errors[idx] = errors[-1] * np.sqrt(2)
-        elif method == "walk-down":
-            y /= y.max()
-            # Starting from the first point, start walking down the curve until
-            # 1/e is reached
-            for i, val in enumerate(y):
-                if val < np.exp(-1):
-                    diff = val - y[i - 1]
-                    scales[idx] = x[i - 1] + ((np.exp(-1) - y[i - 1]) / diff)
-                    # Following Heyer & Brunt
-                    scale_errors[idx] = 0.5
-                    break
-
-                if i == y.size - 1:
-                    warn("Cannot find width where the 1/e level is"
-                         " reached. Ensure the eigenspectra are "
-                         "normalized!")
-                    scale_errors[idx] = np.NaN
-                    scales[idx] = np.NaN
-
-        else:
-            raise ValueError("method must be 'walk-down', 'interpolate' or"
-                             " 'fit'.")
+
+    if method not in ['walk-down', 'fit', 'interpolate']:
+        raise ValueError("method must be 'walk-down', 'interpolate' or"
+                         " 'fit'.")
+
+    if isinstance(inList, list):
+        acors = np.array(inList, dtype=float).T
+    else:
+        acors = np.asarray(inList, dtype=float)
+
+    if acors.ndim == 1:
+        acors = acors[:, np.newaxis]
+
+    x = fft.fftfreq(acors.shape[0]) * acors.shape[0] / 2.0
+
+    if method == 'walk-down':
+        return _walk_down_widths(acors, x)
+    elif method == 'interpolate':
+        return _interpolate_widths(acors, x)
+
+    return _fit_gaussian_widths(acors, x)
+
+
+def _walk_down_widths(acors, x):
+    '''
+    Starting from the first point, walk down each column until 1/e of the
+    peak is reached and interpolate between the two nearest points.
+    '''
+
+    y = acors / acors.max(axis=0)
+
+    level = np.exp(-1)
+    cols = np.arange(y.shape[1])
+
+    below = y < level
+    found = below.any(axis=0)
+
+    if not found.all():
+        warn("Cannot find width where the 1/e level is"
+             " reached. Ensure the eigenspectra are "
+             "normalized!")
+
+    first = np.argmax(below, axis=0)
+    # The previous point wraps around to the end when the first point is
+    # already below the 1/e level.
+    prev = (first - 1) % y.shape[0]
+
+    diff = y[first, cols] - y[prev, cols]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scales = x[prev] + (level - y[prev, cols]) / diff
+
+    # Following Heyer & Brunt
+    scale_errors = 0.5 * np.ones(y.shape[1])
+
+    scales[~found] = np.NaN
+    scale_errors[~found] = np.NaN
+
+    return scales, scale_errors
+
+
+def _first_local_min(acors):
+    '''
+    Position of the first local minimum in each column, as found by
+    `~scipy.signal.argrelmin`, and whether one exists.
+    '''
+
+    is_min = np.zeros(acors.shape, dtype=bool)
+    is_min[1:-1] = (acors[1:-1] < acors[:-2]) & (acors[1:-1] < acors[2:])
+
+    return np.argmax(is_min, axis=0), is_min.any(axis=0)
+
+
+def _interpolate_widths(acors, x):
+    '''
+    Interpolate the lag where each column reaches 1/e, using the points up to
+    the first local minimum.
+    '''
+
+    npts, ncols = acors.shape
+    cols = np.arange(ncols)
+
+    scales = np.zeros(ncols)
+    scale_errors = np.zeros(ncols)
+
+    first_min, has_min = _first_local_min(acors)
+
+    if not has_min.all():
+        warn("No local minimum found. Cannot interpolate the width.")
+        scales[~has_min] = np.NaN
+        scale_errors[~has_min] = np.NaN
+
+    use = has_min & (first_min > 1)
+
+    if not use.any():
+        return scales, scale_errors
+
+    warn("Error estimation not implemented for interpolation!")
+
+    # Sort the values up to the first minimum, as done by interp1d, and
+    # push the remaining points to the end.
+    seg = np.arange(npts)[:, np.newaxis] <= first_min
+    order = np.argsort(np.where(seg, acors, np.inf), axis=0, kind='mergesort')
+
+    y_sort = acors[order, cols]
+    x_sort = x[order]
+
+    level = np.exp(-1)
+    last = first_min
+
+    inside = (level >= y_sort[0]) & (level <= y_sort[last, cols])
+
+    hi = np.clip(np.sum((y_sort < level) & seg, axis=0), 1, last)
+    lo = hi - 1
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (x_sort[hi, cols] - x_sort[lo, cols]) / \
+            (y_sort[hi, cols] - y_sort[lo, cols])
+        values = slope * (level - y_sort[lo, cols]) + x_sort[lo, cols]
+
+    if (use & ~inside).any():
+        warn("Interpolation failed.")
+
+    scales[use] = np.where(inside, values, np.NaN)[use]
+
+    return scales, scale_errors
+
+
+def _fit_gaussian_widths(acors, x, init_stddev=10., maxiter=200,
+                         tol=1e-10):
+    '''
+    Fit a Gaussian with a fixed peak to the points in each column before the
+    first local minimum. All columns are fit together with Levenberg-Marquardt
+    iterations for the single free parameter (the standard deviation). The
+    errors are scaled by the residual variance, as in
+    `~astropy.modeling.fitting.LevMarLSQFitter`.
+    '''
+
+    npts, ncols = acors.shape
+
+    first_min, has_min = _first_local_min(acors)
+
+    # Use all points when the first minimum is at the start.
+    ends = np.where(has_min & (first_min > 1), first_min, npts)
+    weights = (np.arange(npts)[:, np.newaxis] < ends).astype(float)
+    num_pts = weights.sum(axis=0)
+
+    amps = acors[0]
+    xsq = (x**2)[:, np.newaxis]
+
+    def resid_jac(stddev):
+        gauss = np.exp(-xsq / (2 * stddev**2))
+        resid = (acors - amps * gauss) * weights
+        jac = amps * gauss * xsq / stddev**3 * weights
+        return resid, jac
+
+    stddev = init_stddev * np.ones(ncols)
+    damping = 1e-3 * np.ones(ncols)
+
+    resid, jac = resid_jac(stddev)
+    ssr = np.sum(resid**2, axis=0)
+
+    active = np.ones(ncols, dtype=bool)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for _ in range(maxiter):
+            jtj = np.sum(jac**2, axis=0)
+            step = np.sum(jac * resid, axis=0) / (jtj * (1 + damping))
+            step[~active] = 0.
+
+            new_stddev = stddev + step
+            new_resid, new_jac = resid_jac(new_stddev)
+            new_ssr = np.sum(new_resid**2, axis=0)
+
+            better = active & (new_ssr <= ssr)
+
+            converged = better & \
+                ((np.abs(step) <= tol * (np.abs(stddev) + tol)) |
+                 (ssr - new_ssr <= tol * ssr))
+
+            stddev = np.where(better, new_stddev, stddev)
+            resid = np.where(better, new_resid, resid)
+            jac = np.where(better, new_jac, jac)
+            ssr = np.where(better, new_ssr, ssr)
+
+            damping = np.where(better, damping / 10., damping * 10.)
+
+            active &= ~converged & (damping < 1e10)
+
+            if not active.any():
+                break
+
+        jtj = np.sum(jac**2, axis=0)
+        variance = ssr / (num_pts - 1) / jtj
+
+    failed = ~np.isfinite(variance) | (jtj == 0) | (num_pts < 2)
+
+    if failed.any():
+        warn("Fitting failed.")
+
+    scales = np.abs(stddev) * np.sqrt(2)
+    scale_errors = np.sqrt(np.abs(variance)) * np.sqrt(2)
+
+    scales[failed] = np.NaN
+    scale_errors[failed] = np.NaN
 
     return scales, scale_errors
 
@@ -393,6 +560,14 @@ def fit_2D_ellipse(pts, **bootstrap_kwargs):
     return ywidth, xwidth, ywidth_err, xwidth_err, ellip
 
 
+def _fit_2D_ellipse_args(args):
+    '''
+    Unpack the arguments to `fit_2D_ellipse` for `parallel_map`.
+    '''
+    pts, seed, bootstrap_kwargs = args
+    return fit_2D_ellipse(pts, seed=seed, **bootstrap_kwargs)
+
+
 def fit_2D_gaussian(xmat, ymat, z):
     '''
     Return fitted model parameters
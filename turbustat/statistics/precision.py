@@ -0,0 +1,141 @@
+# Licensed under an MIT open source license - see LICENSE
+from __future__ import print_function, absolute_import, division
+
+import numpy as np
+from contextlib import contextmanager
+
+try:
+    # scipy.fft keeps single precision inputs in single precision
+    import scipy.fft as _fft_module
+except ImportError:
+    _fft_module = np.fft
+
+'''
+Working precision of the FFT-based statistics.
+
+In single precision, the data, weights and FFT buffers of PowerSpectrum, VCA,
+MVC, DeltaVariance, Wavelet and Genus are kept as float32/complex64. Sums
+over these arrays (e.g., averages over channels or over the image) are still
+accumulated in float64. Compared to double precision, the outputs agree
+within the tolerances in `SINGLE_PRECISION_TOLERANCES`, which are tested in
+`turbustat/tests/test_precision.py`.
+'''
+
+_PRECISIONS = {'double': (np.float64, np.complex128),
+               'single': (np.float32, np.complex64)}
+
+# Agreement of single precision outputs with double precision. 'spectrum' is
+# the relative tolerance of the 1D outputs (power spectra, delta-variance,
+# wavelet values) and 'slope' is the absolute tolerance of the fitted slopes.
+SINGLE_PRECISION_TOLERANCES = {'spectrum': 5e-4,
+                               'slope': 1e-3}
+
+_state = {'precision': 'double'}
+
+
+def set_precision(precision):
+    '''
+    Set the working precision of the FFT-based statistics.
+
+    Parameters
+    ----------
+    precision : {'double', 'single'}
+        Use float64 ('double') or float32 ('single') arrays.
+    '''
+
+    if precision not in _PRECISIONS:
+        raise ValueError("precision must be 'double' or 'single'. Given {}"
+                         .format(precision))
+
+    _state['precision'] = precision
+
+
+def get_precision():
+    '''
+    Return the current working precision.
+    '''
+    return _state['precision']
+
+
+@contextmanager
+def precision_mode(precision):
+    '''
+    Temporarily change the working precision.
+
+    Example
+    -------
+    >>> from turbustat.statistics import PowerSpectrum
+    >>> from turbustat.statistics.precision import precision_mode
+    >>> with precision_mode('single'):  # doctest: +SKIP
+    ...     pspec = PowerSpectrum(moment0).run()  # doctest: +SKIP
+    '''
+
+    previous = get_precision()
+    set_precision(precision)
+    try:
+        yield
+    finally:
+        set_precision(previous)
+
+
+def float_dtype(precision=None):
+    '''
+    Real dtype of the working precision.
+    '''
+    if precision is None:
+        precision = get_precision()
+    return _PRECISIONS[precision][0]
+
+
+def complex_dtype(precision=None):
+    '''
+    Complex dtype of the working precision.
+    '''
+    if precision is None:
+        precision = get_precision()
+    return _PRECISIONS[precision][1]
+
+
+def as_working(arr, precision=None):
+    '''
+    Cast an array to the working precision. Arrays already in the working
+    precision are not copied.
+    '''
+    return np.asarray(arr, dtype=float_dtype(precision))
+
+
+def rfftn(arr, s=None, axes=None, norm=None):
+    '''
+    `~numpy.fft.rfftn` that preserves single precision inputs.
+    '''
+    return _fft_module.rfftn(arr, s=s, axes=axes, norm=norm)
+
+
+def irfftn(arr, s=None, axes=None, norm=None):
+    '''
+    `~numpy.fft.irfftn` that preserves single precision inputs.
+    '''
+    return _fft_module.irfftn(arr, s=s, axes=axes, norm=norm)
+
+
+def fftn(arr, s=None, axes=None, norm=None):
+    '''
+    `~numpy.fft.fftn` that preserves single precision inputs.
+    '''
+    return _fft_module.fftn(arr, s=s, axes=axes, norm=norm)
+
+
+def ifftn(arr, s=None, axes=None, norm=None):
+    '''
+    `~numpy.fft.ifftn` that preserves single precision inputs.
+    '''
+    return _fft_module.ifftn(arr, s=s, axes=axes, norm=norm)
+
+
+def convolve_fft_kwargs(precision=None):
+    '''
+    Keyword arguments for `~astropy.convolution.convolve_fft` to use the
+    working precision in the FFT buffers.
+    '''
+    return {'complex_dtype': complex_dtype(precision),
+            'fftn': fftn, 'ifftn': ifftn}
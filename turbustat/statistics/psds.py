@@ -116,3 +116,165 @@ def make_radial_freq_arrays(shape):
     yy_freq, xx_freq = np.meshgrid(yfreqs, xfreqs, indexing='ij')
 
     return yy_freq, xx_freq
+
+
+def _radial_bin_numbers(shape, nbins=None, binsize=1.0, logspacing=True,
+                        max_bin=None, min_bin=None, return_freqs=True):
+    '''
+    Bin edges and the bin of each pixel in a shifted 2D array, following
+    `pspec`. Pixels outside of the bins are given -1 or nbins.
+    '''
+
+    yy, xx = make_radial_arrays(shape)
+    dists = np.sqrt(yy**2 + xx**2)
+
+    if nbins is None:
+        nbins = int(np.round(dists.max() / binsize) + 1)
+
+    if return_freqs:
+        yy_freq, xx_freq = make_radial_freq_arrays(shape)
+        dist_arr = np.sqrt(yy_freq**2 + xx_freq**2)
+
+        zero_freq_val = dist_arr[np.nonzero(dist_arr)].min() / 2.
+        dist_arr[dist_arr == 0] = zero_freq_val
+    else:
+        dist_arr = dists
+
+    if max_bin is None:
+        max_bin = 0.5 if return_freqs else dists.max()
+
+    if min_bin is None:
+        min_bin = 1.0 / min(shape) if return_freqs else 0.5
+
+    if logspacing:
+        bins = np.logspace(np.log10(min_bin), np.log10(max_bin), nbins + 1)
+    else:
+        bins = np.linspace(min_bin, max_bin, nbins + 1)
+
+    bin_nums = binned_statistic(dist_arr.ravel(), dist_arr.ravel(),
+                                bins=bins)[2] - 1
+
+    return bins, bin_nums
+
+
+def _bin_matrix(bin_nums, posn, nbins, size):
+    '''
+    Matrix whose product with a flattened array gives the mean within each
+    bin.
+    '''
+
+    in_bins = (bin_nums >= 0) & (bin_nums < nbins)
+
+    bin_matrix = np.zeros((nbins, size))
+    np.add.at(bin_matrix, (bin_nums[in_bins], posn[in_bins]), 1.)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bin_matrix /= bin_matrix.sum(1)[:, np.newaxis]
+
+    return bin_matrix
+
+
+def radial_bins(shape, nbins=None, binsize=1.0, logspacing=True,
+                max_bin=None, min_bin=None, return_freqs=True):
+    '''
+    Radial bins for shifted 2D arrays (e.g., a 2D power spectrum or an SCF
+    surface). The bins follow `pspec`, so binning many arrays only requires
+    a single matrix product.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the 2D arrays.
+    nbins : int, optional
+        See `pspec`.
+    binsize : float, optional
+        See `pspec`.
+    logspacing : bool, optional
+        See `pspec`.
+    max_bin : float, optional
+        See `pspec`.
+    min_bin : float, optional
+        See `pspec`.
+    return_freqs : bool, optional
+        See `pspec`.
+
+    Returns
+    -------
+    bin_cents : np.ndarray
+        Centre of the bins.
+    bin_matrix : np.ndarray
+        Array of shape (nbins, shape[0] * shape[1]). The matrix product with
+        the flattened arrays gives the mean within each bin. Empty bins are
+        NaN.
+    '''
+
+    bins, bin_nums = _radial_bin_numbers(shape, nbins=nbins, binsize=binsize,
+                                         logspacing=logspacing,
+                                         max_bin=max_bin, min_bin=min_bin,
+                                         return_freqs=return_freqs)
+    nbins = bins.size - 1
+
+    bin_matrix = _bin_matrix(bin_nums, np.arange(bin_nums.size), nbins,
+                             bin_nums.size)
+
+    bin_cents = (bins[1:] + bins[:-1]) / 2.
+
+    return bin_cents, bin_matrix
+
+
+def rfft_radial_bins(shape, nbins=None, binsize=1.0, logspacing=True,
+                     max_bin=None, min_bin=None):
+    '''
+    Radial frequency bins for 2D power spectra computed with
+    `~numpy.fft.rfft2`. The bins follow `pspec` (with `return_freqs=True`)
+    applied to the full, shifted power spectrum. Negative frequencies along
+    the last axis are mapped onto their conjugates in the RFFT.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the image.
+    nbins : int, optional
+        See `pspec`.
+    binsize : float, optional
+        See `pspec`.
+    logspacing : bool, optional
+        See `pspec`.
+    max_bin : float, optional
+        See `pspec`.
+    min_bin : float, optional
+        See `pspec`.
+
+    Returns
+    -------
+    bin_cents : np.ndarray
+        Centre of the frequency bins.
+    bin_matrix : np.ndarray
+        Array of shape (nbins, shape[0] * (shape[1] // 2 + 1)). The matrix
+        product with flattened RFFT power spectra gives the mean within each
+        bin. Empty bins are NaN.
+    '''
+
+    ny, nx = shape
+    nx_r = nx // 2 + 1
+
+    bins, bin_nums = _radial_bin_numbers(shape, nbins=nbins, binsize=binsize,
+                                         logspacing=logspacing,
+                                         max_bin=max_bin, min_bin=min_bin)
+    nbins = bins.size - 1
+
+    # Unshifted FFT indices of each pixel in the shifted spectrum
+    iy, ix = np.meshgrid(np.fft.fftshift(np.arange(ny)),
+                         np.fft.fftshift(np.arange(nx)), indexing='ij')
+
+    conj = ix >= nx_r
+    iy = np.where(conj, (-iy) % ny, iy)
+    ix = np.where(conj, nx - ix, ix)
+
+    rfft_posn = (iy * nx_r + ix).ravel()
+
+    bin_matrix = _bin_matrix(bin_nums, rfft_posn, nbins, ny * nx_r)
+
+    bin_cents = (bins[1:] + bins[:-1]) / 2.
+
+    return bin_cents, bin_matrix
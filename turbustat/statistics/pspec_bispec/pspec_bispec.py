@@ -4,13 +4,20 @@ from __future__ import print_function, absolute_import, division
 import numpy as np
 import numpy.random as ra
 from numpy.fft import fftshift
+from numpy.lib.stride_tricks import as_strided
 import astropy.units as u
 
 from ..rfft_to_fft import rfft_to_fft
-from ..base_pspec2 import StatisticBase_PSpec2D
+from ..fft_cache import cached_fftn
+from ..base_pspec2 import StatisticBase_PSpec2D, fit_pspec_batch
+from ..psds import rfft_radial_bins
+from ..apodizing_kernels import (apodizing_window, apodize_and_pad,
+                                 fast_fft_shape)
+from ..precision import rfftn, as_working
 from ..base_statistic import BaseStatisticMixIn
 from ...io import common_types, twod_types, input_data
 from ..fitting_utils import check_fit_limits
+from ..stats_utils import parallel_map
 
 
 class PowerSpectrum(BaseStatisticMixIn, StatisticBase_PSpec2D):
@@ -55,20 +62,202 @@ class PowerSpectrum(BaseStatisticMixIn, StatisticBase_PSpec2D):
         if distance is not None:
             self.distance = distance
 
-    def compute_pspec(self):
+    def compute_pspec(self, use_cache=True, apodize_kernel=None, alpha=0.3,
+                      beta=0.0, pad_to_fast_len=False):
         '''
         Compute the 2D power spectrum.
+
+        Parameters
+        ----------
+        use_cache : bool, optional
+            Re-use the FFT of the image if it has already been computed by
+            another statistic. Not used when the image is apodized or padded.
+        apodize_kernel : {None, 'tukey', 'hanning', 'splitcosinebell'}, optional
+            Apodizing window applied to the image before the FFT. See
+            `~turbustat.statistics.apodizing_kernels.apodizing_window`.
+            The window is divided by the square root of its mean squared
+            value, as in `~PowerSpectrum.compute_local_pspec`, so the
+            spectrum amplitude does not depend on the window.
+        alpha : float, optional
+            Taper fraction of the 'tukey' and 'splitcosinebell' windows.
+        beta : float, optional
+            Fraction of the 'splitcosinebell' window that is not tapered.
+        pad_to_fast_len : bool, optional
+            Zero-pad the image to the next size with a fast FFT.
+        '''
+
+        data = apodize_and_pad(self.weighted_data,
+                               apodize_kernel=apodize_kernel,
+                               alpha=alpha, beta=beta,
+                               pad_to_fast_len=pad_to_fast_len)
+
+        # The cached FFTs are only useful for the unmodified image
+        use_cache = use_cache and data is self.weighted_data
+
+        fft = fftshift(rfft_to_fft(data, use_cache=use_cache))
+
+        self._ps2D = np.square(fft, dtype=np.float64)
+
+    def compute_local_pspec(self, window_size, window_step=None, alpha=0.3,
+                            logspacing=False, low_cut=None, high_cut=None,
+                            chunk_size=256, apodize_kernel='tukey', beta=0.0,
+                            pad_to_fast_len=False):
+        '''
+        Compute power spectra in overlapping windows across the image and fit
+        the slope and amplitude in each window. The windows are transformed
+        in stacked batches and all share the same radial bins.
+
+        Parameters
+        ----------
+        window_size : int
+            Size of the square windows in pixels.
+        window_step : int, optional
+            Spacing between windows in pixels. Defaults to half of
+            `window_size`.
+        alpha : float, optional
+            Taper fraction of the 'tukey' and 'splitcosinebell' windows. Set
+            to 0 with the 'tukey' window to disable the apodization. The power
+            spectra are normalized by the mean of the squared window.
+        logspacing : bool, optional
+            Use logarithmically spaced bins.
+        low_cut : `~astropy.units.Quantity`, optional
+            Lowest frequency to consider in the fits.
+        high_cut : `~astropy.units.Quantity`, optional
+            Highest frequency to consider in the fits.
+        chunk_size : int, optional
+            Number of windows to transform at once.
+        apodize_kernel : {'tukey', 'hanning', 'splitcosinebell'}, optional
+            Apodizing window applied to each window. The window is divided
+            by the square root of its mean squared value.
+        beta : float, optional
+            Fraction of the 'splitcosinebell' window that is not tapered.
+        pad_to_fast_len : bool, optional
+            Zero-pad each window to the next size with a fast FFT.
         '''
 
-        fft = fftshift(rfft_to_fft(self.weighted_data))
+        window_size = int(window_size)
+        if window_step is None:
+            window_step = max(window_size // 2, 1)
+        window_step = int(window_step)
+
+        shape = self.weighted_data.shape
+
+        if window_size > min(shape):
+            raise ValueError("window_size cannot be larger than the image.")
 
-        self._ps2D = np.power(fft, 2.)
+        starts_y = np.arange(0, shape[0] - window_size + 1, window_step)
+        starts_x = np.arange(0, shape[1] - window_size + 1, window_step)
+
+        window = apodizing_window((window_size, window_size),
+                                  apodize_kernel=apodize_kernel,
+                                  alpha=alpha, beta=beta)
+        window = as_working(window / np.sqrt(np.mean(window**2)))
+
+        if pad_to_fast_len:
+            fft_shape = fast_fft_shape(window.shape)
+        else:
+            fft_shape = window.shape
+
+        freqs, bin_matrix = \
+            rfft_radial_bins(fft_shape, logspacing=logspacing)
+
+        # View of every window in the image without copying.
+        data = np.ascontiguousarray(as_working(self.weighted_data))
+        all_windows = \
+            as_strided(data,
+                       shape=(shape[0] - window_size + 1,
+                              shape[1] - window_size + 1,
+                              window_size, window_size),
+                       strides=data.strides * 2)
+
+        posn_y, posn_x = np.meshgrid(starts_y, starts_x, indexing='ij')
+        posn_y = posn_y.ravel()
+        posn_x = posn_x.ravel()
+
+        ps1Ds = np.empty((posn_y.size, freqs.size))
+
+        for start in range(0, posn_y.size, chunk_size):
+            chunk = slice(start, start + chunk_size)
+
+            stack = all_windows[posn_y[chunk], posn_x[chunk]] * window
+
+            ps2Ds = np.square(np.abs(rfftn(stack, s=fft_shape,
+                                           axes=(-2, -1))),
+                              dtype=np.float64)
+            ps1Ds[chunk] = \
+                ps2Ds.reshape(ps2Ds.shape[0], -1).dot(bin_matrix.T)
+
+        freqs = freqs / u.pix
+
+        if low_cut is not None:
+            low_cut = self._to_pixel_freq(low_cut)
+        if high_cut is not None:
+            high_cut = self._to_pixel_freq(high_cut)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slopes, slope_errs, intercepts = \
+                fit_pspec_batch(freqs, ps1Ds, low_cut=low_cut,
+                                high_cut=high_cut, shape=fft_shape,
+                                return_intercepts=True)
+
+        map_shape = (starts_y.size, starts_x.size)
+
+        self._local_freqs = freqs
+        self._local_ps1D = ps1Ds.reshape(map_shape + (freqs.size,))
+        self._local_slope_map = slopes.reshape(map_shape)
+        self._local_slope_err_map = slope_errs.reshape(map_shape)
+        self._local_amplitude_map = 10**intercepts.reshape(map_shape)
+        self._local_window_centers = (starts_y + (window_size - 1) / 2.,
+                                      starts_x + (window_size - 1) / 2.)
+
+    @property
+    def local_freqs(self):
+        '''
+        Spatial frequencies of the local power spectra.
+        '''
+        return self._local_freqs
+
+    @property
+    def local_ps1D(self):
+        '''
+        One-dimensional power spectra in each window.
+        '''
+        return self._local_ps1D
+
+    @property
+    def local_slope_map(self):
+        '''
+        Power spectrum slopes in each window.
+        '''
+        return self._local_slope_map
+
+    @property
+    def local_slope_err_map(self):
+        '''
+        1-sigma errors on the power spectrum slopes in each window.
+        '''
+        return self._local_slope_err_map
+
+    @property
+    def local_amplitude_map(self):
+        '''
+        Fitted power spectrum amplitudes in each window.
+        '''
+        return self._local_amplitude_map
+
+    @property
+    def local_window_centers(self):
+        '''
+        Pixel centres of the windows along each axis.
+        '''
+        return self._local_window_centers
 
     def run(self, verbose=False, logspacing=False,
             return_stddev=True, low_cut=None, high_cut=None,
             fit_2D=True, fit_2D_kwargs={},
             xunit=u.pix**-1, save_name=None,
-            use_wavenumber=False, **fit_kwargs):
+            use_wavenumber=False, apodize_kernel=None, alpha=0.3,
+            beta=0.0, pad_to_fast_len=False, **fit_kwargs):
         '''
         Full computation of the spatial power spectrum.
 
@@ -95,10 +284,19 @@ class PowerSpectrum(BaseStatisticMixIn, StatisticBase_PSpec2D):
             Save the figure when a file name is given.
         use_wavenumber : bool, optional
             Plot the x-axis as the wavenumber rather than spatial frequency.
+        apodize_kernel : {None, 'tukey', 'hanning', 'splitcosinebell'}, optional
+            Passed to `~PowerSpectrum.compute_pspec`.
+        alpha : float, optional
+            Passed to `~PowerSpectrum.compute_pspec`.
+        beta : float, optional
+            Passed to `~PowerSpectrum.compute_pspec`.
+        pad_to_fast_len : bool, optional
+            Passed to `~PowerSpectrum.compute_pspec`.
         fit_kwargs : Passed to `~PowerSpectrum.fit_pspec`.
         '''
 
-        self.compute_pspec()
+        self.compute_pspec(apodize_kernel=apodize_kernel, alpha=alpha,
+                           beta=beta, pad_to_fast_len=pad_to_fast_len)
         self.compute_radial_pspec(logspacing=logspacing,
                                   return_stddev=return_stddev)
 
@@ -281,7 +479,8 @@ class BiSpectrum(BaseStatisticMixIn):
         self.data[np.isnan(self.data)] = np.nanmin(self.data)
 
     def compute_bispectrum(self, nsamples=100, seed=1000,
-                           mean_subtract=False):
+                           mean_subtract=False, use_cache=True,
+                           method='sample', block_size=None, n_jobs=1):
         '''
         Do the computation.
 
@@ -289,21 +488,58 @@ class BiSpectrum(BaseStatisticMixIn):
         ----------
         nsamples : int, optional
             Sets the number of samples to take at each vector
-            magnitude.
+            magnitude. Only used when `method='sample'`.
         seed : int, optional
-            Sets the seed for the distribution draws.
+            Sets the seed for the distribution draws. Only used when
+            `method='sample'`.
         mean_subtract : bool, optional
             Subtract the mean from the data before computing. This removes the
             "zero frequency" (i.e., constant) portion of the power, resulting
             in a loss of phase coherence along the k_1=k_2 line.
+        use_cache : bool, optional
+            Re-use the FFT of the image if it has already been computed by
+            another statistic.
+        method : {'sample', 'exact'}, optional
+            'sample' estimates each (k_1, k_2) bin from `nsamples` random
+            pairs of wavevectors. 'exact' sums over every pair of
+            wavevectors in the two radial shells using shell-filtered
+            images (see `~BiSpectrum._exact_bispectrum`). The exact
+            bispectrum is real, as both k and -k are included in each
+            shell, and `~BiSpectrum.tracker` is not computed.
+        block_size : int, optional
+            Number of shell-filtered images held in memory at once when
+            `method='exact'`. Defaults to blocks of ~128 MB.
+        n_jobs : int, optional
+            Number of threads used to compute the blocks of shell pairs when
+            `method='exact'`.
         '''
 
+        if method not in ['sample', 'exact']:
+            raise ValueError("method must be 'sample' or 'exact'. Given {}"
+                             .format(method))
+
         if mean_subtract:
             norm_data = self.data - self.data.mean()
         else:
             norm_data = self.data
 
-        fftarr = np.fft.fft2(norm_data)
+        if use_cache:
+            fftarr = cached_fftn(norm_data)
+        else:
+            fftarr = np.fft.fft2(norm_data)
+
+        if method == 'exact':
+            self._bispectrum, biconorm = \
+                self._exact_bispectrum(norm_data, fftarr,
+                                       block_size=block_size, n_jobs=n_jobs)
+            self._tracker = None
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self._bicoherence = np.abs(self.bispectrum) / biconorm
+                self._bispectrum_amp = np.log10(np.abs(self.bispectrum))
+
+            return
+
         conjfft = np.conj(fftarr)
         ra.seed(seed)
 
@@ -350,6 +586,137 @@ class BiSpectrum(BaseStatisticMixIn):
         self._bicoherence = (np.abs(self.bispectrum) / biconorm)
         self._bispectrum_amp = np.log10(np.abs(self.bispectrum))
 
+    def _exact_bispectrum(self, norm_data, fftarr, block_size=None,
+                          n_jobs=1):
+        r'''
+        Sum the bispectrum over all wavevector pairs in each pair of radial
+        shells.
+
+        For the shell-filtered images
+        :math:`I_k(x) = \mathcal{F}^{-1}[F(q) S_k(q)]`, where :math:`S_k`
+        selects the wavevectors with :math:`{\rm round}(|q|) = k`,
+
+        .. math::
+            \sum_{q_1 \in S_{k_1}} \sum_{q_2 \in S_{k_2}}
+            F(q_1) F(q_2) F^{*}(q_1 + q_2) = N^2 \sum_x I_{k_1}(x)
+            I_{k_2}(x) I^{*}(x),
+
+        with :math:`I` the image and :math:`N` the number of pixels. Each
+        shell needs one inverse FFT and the sums for a block of shell pairs
+        are a single matrix product. The normalization of the bicoherence,
+        :math:`\sum |F(q_1) F(q_2) F^{*}(q_1 + q_2)|`, is found the same
+        way from :math:`|F|`.
+
+        The shells are split into blocks of `block_size` and only the images
+        for two blocks are held at once, so the memory does not grow with
+        the number of shells. The images for the second block of each pair
+        are recomputed, so larger blocks need fewer FFTs.
+
+        Parameters
+        ----------
+        norm_data : `~numpy.ndarray`
+            The (mean-subtracted) image.
+        fftarr : `~numpy.ndarray`
+            FFT of `norm_data`.
+        block_size : int, optional
+            Number of shells in each block. Defaults to blocks of ~128 MB.
+        n_jobs : int, optional
+            Number of threads used to compute the blocks.
+
+        Returns
+        -------
+        bispectrum : `~numpy.ndarray`
+            Bispectrum summed over each pair of shells.
+        biconorm : `~numpy.ndarray`
+            Sum of the absolute values of the terms in the bispectrum.
+        '''
+
+        bispec_shape = (int(self.shape[0] / 2.), int(self.shape[1] / 2.))
+        nshells = max(bispec_shape)
+        npix = norm_data.size
+
+        # The shells are symmetric about q=0, so only the half-plane from
+        # the real FFT is needed and the filtered images are real.
+        half = fftarr[:, :self.shape[1] // 2 + 1]
+        abs_half = np.abs(half)
+
+        yfreqs = np.fft.fftfreq(self.shape[0]) * self.shape[0]
+        xfreqs = np.fft.fftfreq(self.shape[1]) * self.shape[1]
+        full_shells = np.round(np.sqrt(yfreqs[:, np.newaxis]**2 +
+                                       xfreqs[np.newaxis]**2)).astype(int)
+        shells = full_shells[:, :half.shape[1]]
+
+        norm_flat = norm_data.ravel()
+        abs_img = np.fft.irfft2(abs_half, s=self.shape).ravel()
+
+        if block_size is None:
+            block_size = max(2**24 // npix, 1)
+
+        blocks = [np.arange(start, min(start + block_size, nshells))
+                  for start in range(0, nshells, block_size)]
+
+        def shell_images(ks):
+            imgs = np.empty((ks.size, npix))
+            abs_imgs = np.empty((ks.size, npix))
+
+            for i, k in enumerate(ks):
+                in_shell = shells == k
+                imgs[i] = np.fft.irfft2(np.where(in_shell, half, 0.),
+                                        s=self.shape).ravel()
+                abs_imgs[i] = np.fft.irfft2(np.where(in_shell, abs_half, 0.),
+                                            s=self.shape).ravel()
+
+            return imgs, abs_imgs
+
+        # The sums are symmetric in k_1 and k_2, so only the blocks on and
+        # above the diagonal are computed.
+        def block_row(i):
+            row_imgs, abs_row_imgs = shell_images(blocks[i])
+            row_imgs *= norm_flat
+            abs_row_imgs *= abs_img
+
+            out = []
+            for j in range(i, len(blocks)):
+                col_imgs, abs_col_imgs = shell_images(blocks[j])
+                out.append((j, np.dot(row_imgs, col_imgs.T),
+                            np.dot(abs_row_imgs, abs_col_imgs.T)))
+
+            return out
+
+        rows = parallel_map(block_row, range(len(blocks)), n_jobs=n_jobs,
+                            use_threads=True)
+
+        bispec = np.empty((nshells, nshells))
+        biconorm = np.empty((nshells, nshells))
+
+        for i, row in enumerate(rows):
+            for j, bispec_block, biconorm_block in row:
+                idx = np.ix_(blocks[i], blocks[j])
+                bispec[idx] = bispec_block
+                biconorm[idx] = biconorm_block
+                idx_t = np.ix_(blocks[j], blocks[i])
+                bispec[idx_t] = bispec_block.T
+                biconorm[idx_t] = biconorm_block.T
+
+        bispec *= npix**2
+        biconorm *= npix**2
+
+        # The k=0 shell only holds the mean, where the product above is
+        # dominated by round-off after subtracting the mean. These terms
+        # reduce to F(0) times the power in the other shell.
+        shell_power = np.bincount(full_shells.ravel(),
+                                  weights=np.abs(fftarr.ravel())**2,
+                                  minlength=nshells)[:nshells]
+
+        bispec[0] = bispec[:, 0] = fftarr[0, 0].real * shell_power
+        biconorm[0] = biconorm[:, 0] = np.abs(fftarr[0, 0]) * shell_power
+
+        # Keep k_1 along the first axis and k_2 along the second.
+        bispec = bispec[:bispec_shape[0], :bispec_shape[1]]
+        biconorm = biconorm[:bispec_shape[0], :bispec_shape[1]]
+
+        return bispec.astype(complex), biconorm
+
     @property
     def bispectrum(self):
         '''
@@ -379,7 +746,7 @@ class BiSpectrum(BaseStatisticMixIn):
         return self._tracker
 
     def run(self, nsamples=100, seed=1000, mean_subtract=False, verbose=False,
-            save_name=None):
+            save_name=None, method='sample', block_size=None, n_jobs=1):
         '''
         Compute the bispectrum. Necessary to maintain package standards.
 
@@ -395,10 +762,17 @@ class BiSpectrum(BaseStatisticMixIn):
             Enables plotting.
         save_name : str,optional
             Save the figure when a file name is given.
+        method : {'sample', 'exact'}, optional
+            See `~BiSpectrum.compute_bispectrum`.
+        block_size : int, optional
+            See `~BiSpectrum.compute_bispectrum`.
+        n_jobs : int, optional
+            See `~BiSpectrum.compute_bispectrum`.
         '''
 
         self.compute_bispectrum(nsamples=nsamples, mean_subtract=mean_subtract,
-                                seed=seed)
+                                seed=seed, method=method,
+                                block_size=block_size, n_jobs=n_jobs)
 
         if verbose:
             import matplotlib.pyplot as p
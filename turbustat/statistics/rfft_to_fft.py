@@ -3,6 +3,9 @@ from __future__ import print_function, absolute_import, division
 
 import numpy as np
 
+from .fft_cache import cached_rfftn
+from .precision import rfftn, as_working
+
 '''
 Reconstruct FFT output from RFFT in order to save memory
 Largely follows the solution from:
@@ -10,16 +13,21 @@ http://stackoverflow.com/questions/25147045/full-frequency-array-reconstruction-
 '''
 
 
-def rfft_to_fft(image):
+def rfft_to_fft(image, use_cache=False):
     '''
     Perform a RFFT on the image (2 or 3D) and return the absolute value in
     the same format as you would get with the fft (negative frequencies).
-    This avoids ever having to have the full complex cube in memory.
+    This avoids ever having to have the full complex cube in memory. The
+    transform is computed in the working precision
+    (`~turbustat.statistics.precision`).
 
     Inputs
     ------
     image : numpy.ndarray
         2 or 3D array.
+    use_cache : bool, optional
+        Use the shared FFT cache (`~turbustat.statistics.fft_cache`) so the
+        transform can be re-used by other statistics.
 
     Outputs
     -------
@@ -33,7 +41,10 @@ def rfft_to_fft(image):
 
     last_dim = image.shape[-1]
 
-    fft_abs = np.abs(np.fft.rfftn(image))
+    if use_cache:
+        fft_abs = np.abs(cached_rfftn(image))
+    else:
+        fft_abs = np.abs(rfftn(as_working(image)))
 
     if ndim == 2:
         if last_dim % 2 == 0:
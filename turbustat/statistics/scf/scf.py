@@ -14,11 +14,13 @@ if sys.version_info[0] >= 3:
 else:
     import cPickle as pickle
 
-from ..psds import pspec, make_radial_arrays
+from ..psds import pspec, make_radial_arrays, radial_bins
 from ..base_statistic import BaseStatisticMixIn
 from ...io import common_types, threed_types, input_data
-from ..stats_utils import common_scale, fourier_shift, pixel_shift
+from ..stats_utils import (common_scale, FourierShifter, pixel_shift,
+                           parallel_map)
 from ..fitting_utils import clip_func
+from ..lm_seg import ols_fit_batch
 from ..elliptical_powerlaw import (fit_elliptical_powerlaw,
                                    inverse_interval_transform,
                                    inverse_interval_transform_stderr)
@@ -128,7 +130,7 @@ class SCF(BaseStatisticMixIn):
         '''
         return self._lags
 
-    def compute_surface(self, boundary='continuous'):
+    def compute_surface(self, boundary='continuous', n_jobs=1):
         '''
         Computes the SCF up to the given lag value.
 
@@ -137,74 +139,58 @@ class SCF(BaseStatisticMixIn):
         boundary : {"continuous", "cut"}
             Treat the boundary as continuous (wrap-around) or cut values
             beyond the edge (i.e., for most observational data).
+        n_jobs : int, optional
+            Number of threads to compute the lags in.
         '''
 
         if boundary not in ["continuous", "cut"]:
             raise ValueError("boundary must be 'continuous' or 'cut'.")
 
-        self._scf_surface = np.zeros((self.size, self.size))
-
         # Convert the lags into pixel units.
         pix_lags = self._to_pixel(self.roll_lags).value
 
         dx = pix_lags.copy()
         dy = pix_lags.copy()
 
-        for i, x_shift in enumerate(dx):
-            for j, y_shift in enumerate(dy):
+        # Fractional shifts along each axis reuse the same transforms of the
+        # cube and its NaN mask.
+        def is_frac(shift):
+            return not float(shift).is_integer()
+
+        if any(is_frac(x_shift) for x_shift in dx):
+            x_shifter = FourierShifter(self.data, axis=1)
+
+        y_frac = any(is_frac(y_shift) for y_shift in dy)
 
-                if x_shift == 0 and y_shift == 0:
-                    self._scf_surface[i, j] = 1.
+        def surface_row(x_shift):
+            if x_shift == 0:
+                tmp = self.data
+            elif is_frac(x_shift):
+                tmp = x_shifter.shift(x_shift)
+            else:
+                tmp = pixel_shift(self.data, x_shift, axis=1)
+
+            if y_frac:
+                y_shifter = FourierShifter(tmp, axis=2)
 
-                if x_shift == 0:
-                    tmp = self.data
+            row = np.empty(dy.size)
+
+            for j, y_shift in enumerate(dy):
+                if y_shift == 0:
+                    tmp2 = tmp
+                elif is_frac(y_shift):
+                    tmp2 = y_shifter.shift(y_shift)
                 else:
-                    if float(x_shift).is_integer():
-                        shift_func = pixel_shift
-                    else:
-                        shift_func = fourier_shift
-                    tmp = shift_func(self.data, x_shift, axis=1)
-
-                if y_shift != 0:
-                    if float(y_shift).is_integer():
-                        shift_func = pixel_shift
-                    else:
-                        shift_func = fourier_shift
-                    tmp = shift_func(tmp, y_shift, axis=2)
-
-                if boundary is "cut":
-                    # Always round up to the nearest integer.
-                    x_shift = np.ceil(x_shift).astype(int)
-                    y_shift = np.ceil(y_shift).astype(int)
-                    if x_shift < 0:
-                        x_slice_data = slice(None, tmp.shape[1] + x_shift)
-                        x_slice_tmp = slice(-x_shift, None)
-                    else:
-                        x_slice_data = slice(x_shift, None)
-                        x_slice_tmp = slice(None, tmp.shape[1] - x_shift)
-
-                    if y_shift < 0:
-                        y_slice_data = slice(None, tmp.shape[2] + y_shift)
-                        y_slice_tmp = slice(-y_shift, None)
-                    else:
-                        y_slice_data = slice(y_shift, None)
-                        y_slice_tmp = slice(None, tmp.shape[2] - y_shift)
-
-                    data_slice = (slice(None), x_slice_data, y_slice_data)
-                    tmp_slice = (slice(None), x_slice_tmp, y_slice_tmp)
-                elif boundary is "continuous":
-                    data_slice = (slice(None),) * 3
-                    tmp_slice = (slice(None),) * 3
-
-                values = \
-                    np.nansum(((self.data[data_slice] - tmp[tmp_slice]) ** 2),
-                              axis=0) / \
-                    (np.nansum(self.data[data_slice] ** 2, axis=0) +
-                     np.nansum(tmp[tmp_slice] ** 2, axis=0))
-
-                scf_value = 1. - \
-                    np.sqrt(np.nansum(values) / np.sum(np.isfinite(values)))
-                self._scf_surface[i, j] = scf_value
+                    tmp2 = pixel_shift(tmp, y_shift, axis=2)
+
+                row[j] = _scf_value(self.data, tmp2, x_shift, y_shift,
+                                    boundary)
+
+            return row
+
+        rows = parallel_map(surface_row, dx, n_jobs=n_jobs, use_threads=True)
+
+        self._scf_surface = np.array(rows)
 
     def compute_spectrum(self, return_stddev=True,
                          **kwargs):
@@ -376,15 +362,17 @@ class SCF(BaseStatisticMixIn):
         return 10**model_values
 
     def fit_2Dplaw(self, fit_method='LevMarq', p0=(), xlow=None,
-                   xhigh=None, bootstrap=True, niters=100):
+                   xhigh=None, bootstrap=True, niters=100, seed=None,
+                   n_jobs=1):
         '''
         Model the 2D power-spectrum surface with an elliptical power-law model.
 
         Parameters
         ----------
-        fit_method : str, optional
-            The algorithm fitting to use. Only 'LevMarq' is currently
-            available.
+        fit_method : {'LevMarq', 'LeastSq'}, optional
+            The fitting algorithm to use. 'LeastSq' uses the analytic Jacobian
+            of the model and is faster. See
+            `~turbustat.statistics.elliptical_powerlaw.fit_elliptical_powerlaw`.
         p0 : tuple, optional
             Initial parameters for fitting. If no values are given, the initial
             parameters start from the 1D fit parameters.
@@ -398,6 +386,10 @@ class SCF(BaseStatisticMixIn):
             the covariance matrix.
         niters : int, optional
             Number of bootstrap iterations.
+        seed : int, optional
+            Seed for the bootstrap resampling.
+        n_jobs : int, optional
+            Number of processes to run the bootstrap fits in.
         '''
 
         # Adjust the distance based on the separation of the lags
@@ -451,7 +443,8 @@ class SCF(BaseStatisticMixIn):
                                     yy[mask], p0,
                                     fit_method=fit_method,
                                     bootstrap=bootstrap,
-                                    niters=niters)
+                                    niters=niters, seed=seed,
+                                    n_jobs=n_jobs)
 
         self.fit2D = fit_2Dmodel
         self._fitter = fitter
@@ -509,6 +502,169 @@ class SCF(BaseStatisticMixIn):
         '''
         return self._ellip2D_err
 
+    def compute_slope_map(self, tile_size, tile_step=None,
+                          boundary='continuous', return_stddev=True,
+                          xlow=None, xhigh=None, n_jobs=1):
+        '''
+        Compute the SCF spectrum slope in overlapping spatial tiles.
+
+        The per-pixel SCF terms are computed once for each lag over the whole
+        cube. The SCF of every tile then follows from summed-area tables of
+        those terms, so overlapping tiles share all of the spectral sums.
+        Pixels near the edge of a tile are paired with their neighbours in
+        the full cube, rather than only with pixels inside the tile.
+
+        Parameters
+        ----------
+        tile_size : int
+            Size of the square tiles in pixels.
+        tile_step : int, optional
+            Spacing between tiles in pixels. Defaults to half of
+            `tile_size`.
+        boundary : {"continuous", "cut"}
+            Treat the boundary of the cube as continuous (wrap-around) or
+            exclude pairs beyond the edge. The pixels are paired as in
+            `~SCF.compute_surface`, so a single tile covering the cube
+            gives `~SCF.scf_surface` for either boundary.
+        return_stddev : bool, optional
+            Weight the fits by the standard deviation in the 1D bins.
+        xlow : `~astropy.units.Quantity`, optional
+            Lower lag value limit to consider in the fits.
+        xhigh : `~astropy.units.Quantity`, optional
+            Upper lag value limit to consider in the fits.
+        n_jobs : int, optional
+            Number of processes to compute the lags in.
+        '''
+
+        if boundary not in ["continuous", "cut"]:
+            raise ValueError("boundary must be 'continuous' or 'cut'.")
+
+        tile_size = int(tile_size)
+        if tile_step is None:
+            tile_step = max(tile_size // 2, 1)
+        tile_step = int(tile_step)
+
+        if tile_size > min(self.data.shape[1:]):
+            raise ValueError("tile_size cannot be larger than the spatial "
+                             "dimensions of the data.")
+
+        starts1 = np.arange(0, self.data.shape[1] - tile_size + 1, tile_step)
+        starts2 = np.arange(0, self.data.shape[2] - tile_size + 1, tile_step)
+
+        pix_lags = self._to_pixel(self.roll_lags).value
+
+        args = [(self.data, x_shift, pix_lags, boundary, starts1, starts2,
+                 tile_size) for x_shift in pix_lags]
+
+        rows = parallel_map(_scf_tile_row, args, n_jobs=n_jobs)
+
+        # (tiles1, tiles2, lags, lags)
+        surfaces = np.array(rows).transpose((2, 3, 0, 1))
+
+        self._tile_surfaces = surfaces
+        self._tile_centers = (starts1 + (tile_size - 1) / 2.,
+                              starts2 + (tile_size - 1) / 2.)
+
+        # Azimuthally average all of the tile surfaces with the same bins
+        # used in `~SCF.compute_spectrum`, skipping NaNs as in `pspec`.
+        bin_cents, bin_matrix = radial_bins((self.size, self.size),
+                                            logspacing=False,
+                                            return_freqs=False)
+        in_bin = (bin_matrix > 0).astype(float)
+
+        flat_surfs = surfaces.reshape(-1, self.size**2)
+        valid_surfs = np.isfinite(flat_surfs)
+        filled_surfs = np.where(valid_surfs, flat_surfs, 0.)
+
+        counts = valid_surfs.astype(float).dot(in_bin.T)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            spectra = filled_surfs.dot(in_bin.T) / counts
+
+            # Deviations from the mean of the bin each pixel falls in.
+            devs = np.where(valid_surfs,
+                            flat_surfs - np.nan_to_num(spectra).dot(in_bin),
+                            0.)
+            stddevs = np.sqrt((devs**2).dot(in_bin.T) / counts)
+
+        roll_lag_diff = np.abs(self.roll_lags[1] - self.roll_lags[0])
+        lags = self._to_pixel(bin_cents * roll_lag_diff).value
+
+        within_limits = np.ones_like(lags, dtype=bool)
+        if xlow is not None:
+            if not isinstance(xlow, u.Quantity):
+                raise TypeError("xlow must be an astropy.units.Quantity.")
+            within_limits &= lags >= self._to_pixel(xlow).value
+        if xhigh is not None:
+            if not isinstance(xhigh, u.Quantity):
+                raise TypeError("xhigh must be an astropy.units.Quantity.")
+            within_limits &= lags <= self._to_pixel(xhigh).value
+
+        if not within_limits.any():
+            raise ValueError("Limits have removed all lag values. Make xlow"
+                             " and xhigh less restrictive.")
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y = np.log10(spectra[:, within_limits])
+
+            if return_stddev:
+                weights = stddevs[:, within_limits] ** -2
+            else:
+                weights = np.ones_like(y)
+
+        x = np.log10(lags[within_limits])
+        X = np.empty(y.shape + (2,))
+        X[..., 0] = 1.
+        X[..., 1] = x
+
+        # Weighted fits are ordinary fits to the rescaled data. Matches
+        # `sm.WLS(..., missing='drop')` for each tile.
+        valid = np.isfinite(y) & np.isfinite(weights)
+        sqrt_w = np.sqrt(np.where(valid, weights, 0.))
+        X = X * sqrt_w[..., np.newaxis]
+        y = np.where(valid, y, 0.) * sqrt_w
+
+        params, normalized_cov, ssr, dof = ols_fit_batch(X, y, valid)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope_err = np.sqrt(normalized_cov[:, 1, 1] * ssr / dof)
+
+        # Need at least 3 points for a slope and its uncertainty
+        bad_fit = dof < 1
+        slopes = np.where(bad_fit, np.nan, params[:, 1])
+        slope_err[bad_fit] = np.nan
+
+        self._slope_map = slopes.reshape(surfaces.shape[:2])
+        self._slope_map_err = slope_err.reshape(surfaces.shape[:2])
+
+    @property
+    def slope_map(self):
+        '''
+        SCF spectrum slopes in each tile from `~SCF.compute_slope_map`.
+        '''
+        return self._slope_map
+
+    @property
+    def slope_map_err(self):
+        '''
+        1-sigma errors on the SCF spectrum slopes in each tile.
+        '''
+        return self._slope_map_err
+
+    @property
+    def tile_surfaces(self):
+        '''
+        SCF surfaces in each tile from `~SCF.compute_slope_map`.
+        '''
+        return self._tile_surfaces
+
+    @property
+    def tile_centers(self):
+        '''
+        Pixel centres of the tiles along the two spatial axes.
+        '''
+        return self._tile_centers
+
     def save_results(self, output_name=None, keep_data=False):
         '''
         Save the results of the SCF to avoid re-computing.
@@ -567,7 +723,7 @@ class SCF(BaseStatisticMixIn):
     def run(self, return_stddev=True, boundary='continuous',
             xlow=None, xhigh=None, save_results=False, output_name=None,
             fit_2D=True, fit_2D_kwargs={},
-            verbose=False, xunit=u.pix, save_name=None):
+            verbose=False, xunit=u.pix, save_name=None, n_jobs=1):
         '''
         Computes all SCF outputs.
 
@@ -592,9 +748,11 @@ class SCF(BaseStatisticMixIn):
             Choose the angular unit to convert to when ang_units is enabled.
         save_name : str,optional
             Save the figure when a file name is given.
+        n_jobs : int, optional
+            See `~SCF.compute_surface`.
         '''
 
-        self.compute_surface(boundary=boundary)
+        self.compute_surface(boundary=boundary, n_jobs=n_jobs)
         self.compute_spectrum(return_stddev=return_stddev)
         self.fit_plaw(verbose=verbose, xlow=xlow, xhigh=xhigh)
 
@@ -677,6 +835,128 @@ class SCF(BaseStatisticMixIn):
         return self
 
 
+def _scf_value(data, tmp, x_shift, y_shift, boundary):
+    '''
+    SCF value between the cube and its shifted version.
+    '''
+
+    if boundary == "cut":
+        # Always round up to the nearest integer.
+        x_shift = np.ceil(x_shift).astype(int)
+        y_shift = np.ceil(y_shift).astype(int)
+        if x_shift < 0:
+            x_slice_data = slice(None, tmp.shape[1] + x_shift)
+            x_slice_tmp = slice(-x_shift, None)
+        else:
+            x_slice_data = slice(x_shift, None)
+            x_slice_tmp = slice(None, tmp.shape[1] - x_shift)
+
+        if y_shift < 0:
+            y_slice_data = slice(None, tmp.shape[2] + y_shift)
+            y_slice_tmp = slice(-y_shift, None)
+        else:
+            y_slice_data = slice(y_shift, None)
+            y_slice_tmp = slice(None, tmp.shape[2] - y_shift)
+
+        data_slice = (slice(None), x_slice_data, y_slice_data)
+        tmp_slice = (slice(None), x_slice_tmp, y_slice_tmp)
+    else:
+        data_slice = (slice(None),) * 3
+        tmp_slice = (slice(None),) * 3
+
+    values = \
+        np.nansum(((data[data_slice] - tmp[tmp_slice]) ** 2),
+                  axis=0) / \
+        (np.nansum(data[data_slice] ** 2, axis=0) +
+         np.nansum(tmp[tmp_slice] ** 2, axis=0))
+
+    return 1. - np.sqrt(np.nansum(values) / np.sum(np.isfinite(values)))
+
+
+def _tile_sums(arr, starts1, starts2, tile_size):
+    '''
+    Sum `arr` within square tiles using a summed-area table.
+    '''
+
+    sat = np.zeros((arr.shape[0] + 1, arr.shape[1] + 1))
+    sat[1:, 1:] = arr.cumsum(0).cumsum(1)
+
+    i0 = starts1[:, np.newaxis]
+    j0 = starts2[np.newaxis]
+    i1 = i0 + tile_size
+    j1 = j0 + tile_size
+
+    return sat[i1, j1] - sat[i0, j1] - sat[i1, j0] + sat[i0, j0]
+
+
+def _scf_tile_row(args):
+    '''
+    SCF values in each tile for one shift along the first spatial axis and
+    all shifts along the second.
+    '''
+
+    data, x_shift, dy, boundary, starts1, starts2, tile_size = args
+
+    def is_frac(shift):
+        return not float(shift).is_integer()
+
+    def valid_pairs(shift, size):
+        # Pixels whose partner lies within the cube
+        posn = np.arange(size) - shift
+        return (posn >= 0) & (posn <= size - 1)
+
+    if x_shift == 0:
+        tmp = data
+    elif is_frac(x_shift):
+        tmp = FourierShifter(data, axis=1).shift(x_shift)
+    else:
+        tmp = pixel_shift(data, x_shift, axis=1)
+
+    if any(is_frac(y_shift) for y_shift in dy):
+        y_shifter = FourierShifter(tmp, axis=2)
+
+    data_sq = np.nansum(data ** 2, axis=0)
+
+    row = np.empty((len(dy), starts1.size, starts2.size))
+
+    for j, y_shift in enumerate(dy):
+        if y_shift == 0:
+            tmp2 = tmp
+        elif is_frac(y_shift):
+            tmp2 = y_shifter.shift(y_shift)
+        else:
+            tmp2 = pixel_shift(tmp, y_shift, axis=2)
+
+        if boundary == "cut":
+            # Pair the pixels as in `_scf_value`: each pixel is compared to
+            # the shifted cube offset by the shift, rounded up, and pairs
+            # beyond the edge are dropped.
+            x_cut = int(np.ceil(x_shift))
+            y_cut = int(np.ceil(y_shift))
+            tmp2 = np.roll(tmp2, (x_cut, y_cut), axis=(1, 2))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = np.nansum((data - tmp2) ** 2, axis=0) / \
+                (data_sq + np.nansum(tmp2 ** 2, axis=0))
+
+        if boundary == "cut":
+            valid = valid_pairs(x_cut, data.shape[1])[:, np.newaxis] & \
+                valid_pairs(y_cut, data.shape[2])
+            values[~valid] = np.nan
+
+        finite = np.isfinite(values)
+
+        sums = _tile_sums(np.where(finite, values, 0.), starts1, starts2,
+                          tile_size)
+        counts = _tile_sums(finite.astype(float), starts1, starts2,
+                            tile_size)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            row[j] = 1. - np.sqrt(sums / counts)
+
+    return row
+
+
 class SCF_Distance(object):
 
     '''
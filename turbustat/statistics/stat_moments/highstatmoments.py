@@ -2,6 +2,7 @@
 from __future__ import print_function, absolute_import, division
 
 import numpy as np
+import scipy.ndimage as nd
 from astropy.wcs import WCS
 import astropy.units as u
 
@@ -45,8 +46,9 @@ class StatMoments(BaseStatisticMixIn):
 
         self.input_data_header(img, header)
 
+        # Uniform weights are used without creating an array of ones
         if weights is None:
-            self.weights = np.ones_like(self.data)
+            self.weights = None
         else:
             self.weights = input_data(weights, no_header=True)
 
@@ -115,24 +117,45 @@ class StatMoments(BaseStatisticMixIn):
         # the nearest integer values
         pix_rad = np.ceil(self._to_pixel(self.radius).value).astype(int)
 
+        circle_mask = circular_region(pix_rad)
+
         if periodic:
             pad_img = np.pad(self.data, pix_rad, mode="wrap")
-            pad_weights = np.pad(self.weights, pix_rad, mode="wrap")
         else:
             pad_img = np.pad(self.data, pix_rad, padwithnans)
-            pad_weights = np.pad(self.weights, pix_rad, padwithnans)
 
-        circle_mask = circular_region(pix_rad)
+        if self.weights is None:
+            pad_weights = None
+
+            # Sum of the uniform weights in each region. Regions extending
+            # past the edge are smaller when the boundary is not periodic.
+            in_circle = np.isfinite(circle_mask).astype(float)
+            if periodic:
+                norms = np.full(self.data.shape, in_circle.sum())
+            else:
+                norms = nd.correlate(np.ones(self.data.shape), in_circle,
+                                     mode='constant', cval=0.)
+        elif periodic:
+            pad_weights = np.pad(self.weights, pix_rad, mode="wrap")
+        else:
+            pad_weights = np.pad(self.weights, pix_rad, padwithnans)
 
         # Loop through every point within the non-padded shape.
         for i in range(pix_rad, pad_img.shape[0] - pix_rad):
             for j in range(pix_rad, pad_img.shape[1] - pix_rad):
                 img_slice = pad_img[i - pix_rad:i + pix_rad + 1,
                                     j - pix_rad:j + pix_rad + 1]
-                wgt_slice = pad_weights[i - pix_rad:i + pix_rad + 1,
-                                        j - pix_rad:j + pix_rad + 1]
 
-                if np.isnan(img_slice).all() or np.isnan(wgt_slice).all():
+                if pad_weights is None:
+                    wgt_slice = None
+                    all_nan = np.isnan(img_slice).all()
+                else:
+                    wgt_slice = pad_weights[i - pix_rad:i + pix_rad + 1,
+                                            j - pix_rad:j + pix_rad + 1]
+                    all_nan = np.isnan(img_slice).all() or \
+                        np.isnan(wgt_slice).all()
+
+                if all_nan:
                     # Subtract off pix_rad to account for padding.
                     self.mean_array[i - pix_rad, j - pix_rad] = np.NaN
                     self.variance_array[i - pix_rad, j - pix_rad] = np.NaN
@@ -141,9 +164,15 @@ class StatMoments(BaseStatisticMixIn):
 
                 else:
                     img_slice = img_slice * circle_mask
-                    wgt_slice = wgt_slice * circle_mask
 
-                    moments = compute_moments(img_slice, wgt_slice)
+                    if wgt_slice is None:
+                        moments = \
+                            compute_moments(img_slice,
+                                            norm=norms[i - pix_rad,
+                                                       j - pix_rad])
+                    else:
+                        wgt_slice = wgt_slice * circle_mask
+                        moments = compute_moments(img_slice, wgt_slice)
 
                     self.mean_array[i - pix_rad, j - pix_rad] = moments[0]
                     self.variance_array[i - pix_rad, j - pix_rad] = moments[1]
@@ -619,7 +648,7 @@ def circular_region(radius):
     return circle
 
 
-def compute_moments(img, weights):
+def compute_moments(img, weights=None, norm=None):
     '''
     Compute the moments of the given image.
 
@@ -627,8 +656,11 @@ def compute_moments(img, weights):
     ----------
     img : numpy.ndarray
         2D image.
-    weights : numpy.ndarray
-        2D weight image.
+    weights : numpy.ndarray, optional
+        2D weight image. Uniform weights are used if none are given.
+    norm : float, optional
+        Sum of the uniform weights. Defaults to the size of `img`. Only used
+        when `weights` is None.
 
     Returns
     -------
@@ -643,12 +675,18 @@ def compute_moments(img, weights):
 
     '''
 
-    mean = np.nansum(img * weights) / np.nansum(weights)
-    variance = np.nansum(weights * (img - mean) ** 2.) / np.nansum(weights)
+    if weights is None:
+        weights = 1.
+        weight_sum = img.size if norm is None else norm
+    else:
+        weight_sum = np.nansum(weights)
+
+    mean = np.nansum(img * weights) / weight_sum
+    variance = np.nansum(weights * (img - mean) ** 2.) / weight_sum
     skewness = np.nansum(weights * ((img - mean) / np.sqrt(variance)) ** 3.) / \
-        np.nansum(weights)
+        weight_sum
     kurtosis = np.nansum(weights * ((img - mean) / np.sqrt(variance)) ** 4.) / \
-        np.nansum(weights) - 3
+        weight_sum - 3
 
     return mean, variance, skewness, kurtosis
 
@@ -3,9 +3,11 @@ from __future__ import print_function, absolute_import, division
 
 import numpy as np
 import math
-from scipy.optimize import leastsq
 import astropy.wcs as wcs
 
+from .precision import float_dtype, as_working, rfftn, irfftn
+from .apodizing_kernels import fast_fft_shape
+
 
 def hellinger(data1, data2, bin_width=1.0):
     '''
@@ -29,11 +31,22 @@ def hellinger(data1, data2, bin_width=1.0):
     return distance
 
 
-def standardize(x, dtype=np.float64):
+def standardize(x, dtype=None):
     '''
-    Center and divide by standard deviation (i.e., z-scores).
+    Center and divide by standard deviation (i.e., z-scores). The output has
+    the working precision (`~turbustat.statistics.precision`) unless `dtype`
+    is given. The mean and standard deviation are accumulated in double
+    precision.
     '''
-    return (x - np.nanmean(x.astype(dtype))) / np.nanstd(x.astype(dtype))
+    if dtype is None:
+        dtype = float_dtype()
+
+    x = np.asarray(x, dtype=dtype)
+
+    stand = (x - np.nanmean(x, dtype=np.float64)) / \
+        np.nanstd(x, dtype=np.float64)
+
+    return stand.astype(dtype, copy=False)
 
 
 def normalize_by_mean(x):
@@ -238,76 +251,16 @@ class EllipseModel(object):
         # another REFERENCE: [2] http://mathworld.wolfram.com/Ellipse.html
         # _check_data_dim(data, dim=2)
 
-        x = data[:, 0]
-        y = data[:, 1]
-
-        # Quadratic part of design matrix [eqn. 15] from [1]
-        D1 = np.vstack([x ** 2, x * y, y ** 2]).T
-        # Linear part of design matrix [eqn. 16] from [1]
-        D2 = np.vstack([x, y, np.ones(len(x))]).T
-
-        # forming scatter matrix [eqn. 17] from [1]
-        S1 = np.dot(D1.T, D1)
-        S2 = np.dot(D1.T, D2)
-        S3 = np.dot(D2.T, D2)
-
-        # Constraint matrix [eqn. 18]
-        C1 = np.array([[0., 0., 2.], [0., -1., 0.], [2., 0., 0.]])
-
-        try:
-            # Reduced scatter matrix [eqn. 29]
-            M = np.linalg.inv(C1).dot(
-                S1 - np.dot(S2, np.linalg.inv(S3)).dot(S2.T))
-        except np.linalg.LinAlgError:  # LinAlgError: Singular matrix
-            return False
-
-        # M*|a b c >=l|a b c >. Find eigenvalues and eigenvectors
-        # from this equation [eqn. 28]
-        eig_vals, eig_vecs = np.linalg.eig(M)
+        params, success = fit_ellipse_batch(data)
 
-        # eigenvector must meet constraint 4ac - b^2 to be valid.
-        cond = 4 * np.multiply(eig_vecs[0, :], eig_vecs[2, :]) \
-               - np.power(eig_vecs[1, :], 2)
-        a1 = eig_vecs[:, (cond > 0)]
-        # seeks for empty matrix
-        if 0 in a1.shape or len(a1.ravel()) != 3:
+        if not success:
             return False
-        a, b, c = a1.ravel()
-
-        # |d f g> = -S3^(-1)*S2^(T)*|a b c> [eqn. 24]
-        a2 = np.dot(-np.linalg.inv(S3), S2.T).dot(a1)
-        d, f, g = a2.ravel()
-
-        # eigenvectors are the coefficients of an ellipse in general form
-        # a*x^2 + 2*b*x*y + c*y^2 + 2*d*x + 2*f*y + g = 0 (eqn. 15) from [2]
-        b /= 2.
-        d /= 2.
-        f /= 2.
-
-        # finding center of ellipse [eqn.19 and 20] from [2]
-        x0 = (c * d - b * f) / (b ** 2. - a * c)
-        y0 = (a * f - b * d) / (b ** 2. - a * c)
-
-        # Find the semi-axes lengths [eqn. 21 and 22] from [2]
-        numerator = a * f ** 2 + c * d ** 2 + g * b ** 2 \
-                    - 2 * b * d * f - a * c * g
-        term = np.sqrt((a - c) ** 2 + 4 * b ** 2)
-        denominator1 = (b ** 2 - a * c) * (term - (a + c))
-        denominator2 = (b ** 2 - a * c) * (- term - (a + c))
-        width = np.sqrt(2 * numerator / denominator1)
-        height = np.sqrt(2 * numerator / denominator2)
-
-        # angle of counterclockwise rotation of major-axis of ellipse
-        # to x-axis [eqn. 23] from [2].
-        phi = 0.5 * np.arctan((2. * b) / (a - c))
-        if a > c:
-            phi += 0.5 * np.pi
 
-        self.params = np.nan_to_num([x0, y0, width, height, phi])
+        self.params = params
 
         return True
 
-    def residuals(self, data):
+    def residuals(self, data, tol=1e-10, max_iter=100):
         """
         Determine residuals of data to model.
         For each point the shortest distance to the ellipse is returned.
@@ -316,6 +269,10 @@ class EllipseModel(object):
         ----------
         data : (N, 2) array
             N points with ``(x, y)`` coordinates, respectively.
+        tol : float, optional
+            Convergence tolerance on the position along the ellipse.
+        max_iter : int, optional
+            Maximum number of iterations.
         Returns
         -------
         residuals : (N, ) array
@@ -332,38 +289,57 @@ class EllipseModel(object):
         x = data[:, 0]
         y = data[:, 1]
 
-        N = data.shape[0]
-
-        def fun(t, xi, yi):
-            ct = math.cos(t)
-            st = math.sin(t)
-            xt = xc + a * ctheta * ct - b * stheta * st
-            yt = yc + a * stheta * ct + b * ctheta * st
-            return (xi - xt) ** 2 + (yi - yt) ** 2
-
-        # def Dfun(t, xi, yi):
-        #     ct = math.cos(t)
-        #     st = math.sin(t)
-        #     xt = xc + a * ctheta * ct - b * stheta * st
-        #     yt = yc + a * stheta * ct + b * ctheta * st
-        #     dfx_t = - 2 * (xi - xt) * (- a * ctheta * st
-        #                                - b * stheta * ct)
-        #     dfy_t = - 2 * (yi - yt) * (- a * stheta * st
-        #                                + b * ctheta * ct)
-        #     return [dfx_t + dfy_t]
-
-        residuals = np.empty((N, ), dtype=np.double)
+        def dist2(t):
+            ct = np.cos(t)
+            st = np.sin(t)
+            dx = x - (xc + a * ctheta * ct - b * stheta * st)
+            dy = y - (yc + a * stheta * ct + b * ctheta * st)
+            return dx, dy, ct, st
 
         # initial guess for parameter t of closest point on ellipse
-        t0 = np.arctan2(y - yc, x - xc) - theta
-
-        # determine shortest distance to ellipse for each point
-        for i in range(N):
-            xi = x[i]
-            yi = y[i]
-            # faster without Dfun, because of the python overhead
-            t, _ = leastsq(fun, t0[i], args=(xi, yi))
-            residuals[i] = np.sqrt(fun(t, xi, yi))
+        t = np.arctan2(y - yc, x - xc) - theta
+
+        dx, dy, ct, st = dist2(t)
+        fval = dx ** 2 + dy ** 2
+
+        # Newton iterations for the closest point, run for all of the
+        # points at once. Where the second derivative is not positive, the
+        # Gauss-Newton step is used instead. Steps that do not decrease the
+        # distance are halved.
+        for _ in range(max_iter):
+            dxt = - a * ctheta * st - b * stheta * ct
+            dyt = - a * stheta * st + b * ctheta * ct
+
+            d2xt = - a * ctheta * ct + b * stheta * st
+            d2yt = - a * stheta * ct - b * ctheta * st
+
+            gn_denom = dxt ** 2 + dyt ** 2
+            denom = gn_denom - dx * d2xt - dy * d2yt
+            denom = np.where(denom > 0., denom, gn_denom)
+            denom[denom == 0.] = 1.
+            step = (dx * dxt + dy * dyt) / denom
+
+            for _ in range(10):
+                new_dx, new_dy, new_ct, new_st = dist2(t + step)
+                new_fval = new_dx ** 2 + new_dy ** 2
+
+                worse = new_fval > fval
+                if not worse.any():
+                    break
+                step[worse] *= 0.5
+
+            better = ~worse
+            t[better] += step[better]
+            dx[better] = new_dx[better]
+            dy[better] = new_dy[better]
+            ct[better] = new_ct[better]
+            st[better] = new_st[better]
+            fval[better] = new_fval[better]
+
+            if np.all(np.abs(step) < tol):
+                break
+
+        residuals = np.sqrt(fval)
 
         return residuals
 
@@ -397,7 +373,8 @@ class EllipseModel(object):
 
         return np.concatenate((x[..., None], y[..., None]), axis=t.ndim)
 
-    def estimate_stderrs(self, data, niters=100, alpha=0.6827, debug=False):
+    def estimate_stderrs(self, data, niters=100, alpha=0.6827, debug=False,
+                         seed=None):
         '''
         Use residual bootstrapping to estimate the uncertainty on each
         parameter. *Not part of scikit-image.*
@@ -409,42 +386,45 @@ class EllipseModel(object):
         niters : int, optional
             Number of bootstrap iterations. Defaults to 100.
         alpha : float, optional
+            Confidence level of the bootstrap interval used for the standard
+            errors.
+        debug : bool, optional
+            Plot the bootstrap parameter distributions.
+        seed : int, optional
+            Seed for the bootstrap resampling.
 
         '''
 
-        if not hasattr(self, "params"):
+        if self.params is None:
             raise AttributeError("Run EllipseModel.estimate first.")
 
         if alpha < 0 or alpha >= 1.:
             raise ValueError("alpha must be between 0 and 1.")
 
         niters = int(niters)
-        params = np.empty((5, niters))
 
         resid = self.residuals(data)
 
-        for i in range(niters):
-            boot_fit = EllipseModel()
+        rng = np.random.RandomState(seed)
 
-            resamp_resid = resid[np.random.permutation(resid.size)]
+        # Generate all of the resampled point sets at once.
+        perms = np.argsort(rng.random_sample((niters, resid.size)), axis=1)
+        resamp_resid = resid[perms]
 
-            # Now we need to add the residuals to the x and y values.
-            # The residuals themselves are distances from the ellipse
-            # Assume a dirichlet prior of equal weight when adding the
-            # residuals to the x and y data, which will preserve the overall
-            # residual distance
-            prior_weights = np.random.dirichlet((1, 1), size=resid.size)
-            # We also need to randomly sample to add or subtract that distance
-            prior_dirn = np.random.choice([-1, 1], size=(resid.size, 2))
+        # Now we need to add the residuals to the x and y values.
+        # The residuals themselves are distances from the ellipse
+        # Assume a dirichlet prior of equal weight when adding the
+        # residuals to the x and y data, which will preserve the overall
+        # residual distance
+        prior_weights = rng.dirichlet((1, 1), size=(niters, resid.size))
+        # We also need to randomly sample to add or subtract that distance
+        prior_dirn = rng.choice([-1, 1], size=(niters, resid.size, 2))
 
-            resamp_resid = np.tile(resamp_resid, (2, 1)).T * prior_weights * \
-                prior_dirn
+        resamp_y = data + resamp_resid[..., np.newaxis] * prior_weights * \
+            prior_dirn
 
-            resamp_y = data + resamp_resid
-
-            boot_fit.estimate(resamp_y)
-
-            params[:, i] = boot_fit.params
+        # Failed fits are NaN and are ignored in the percentiles.
+        params = fit_ellipse_batch(resamp_y)[0].T
 
         if debug:
             import matplotlib.pyplot as plt
@@ -465,10 +445,10 @@ class EllipseModel(object):
             _ = plt.hist(params[4], bins=10)
             plt.axvline(self.params[4])
 
-        self.percentiles = np.percentile(params,
-                                         [100 * (0.5 - alpha / 2.),
-                                          100 * (0.5 + alpha / 2.)],
-                                         axis=1)
+        self.percentiles = np.nanpercentile(params,
+                                            [100 * (0.5 - alpha / 2.),
+                                             100 * (0.5 + alpha / 2.)],
+                                            axis=1)
 
         # We're going to ASSUME the percentile regions are symmetric enough
         # to do this. Testing on a number of data sets shows this isn't a bad
@@ -476,6 +456,126 @@ class EllipseModel(object):
         self.param_errs = 0.5 * (self.percentiles[1] - self.percentiles[0])
 
 
+def fit_ellipse_batch(data):
+    '''
+    Direct least squares ellipse fits to a stack of point sets. This is the
+    vectorized form of `EllipseModel.estimate`; the fits are a series of
+    3x3 eigenproblems that are solved together.
+
+    Parameters
+    ----------
+    data : (..., N, 2) array
+        Sets of N points with ``(x, y)`` coordinates.
+
+    Returns
+    -------
+    params : (..., 5) array
+        Ellipse parameters `xc`, `yc`, `a`, `b`, `theta` for each set. Failed
+        fits are NaN.
+    success : (...) bool array
+        Whether each fit succeeded.
+    '''
+
+    data = np.asarray(data, dtype=np.float64)
+
+    x = data[..., 0]
+    y = data[..., 1]
+
+    # Quadratic and linear parts of the design matrix [eqns. 15 and 16]
+    # from Halir & Flusser
+    D1 = np.stack([x ** 2, x * y, y ** 2], axis=-1)
+    D2 = np.stack([x, y, np.ones_like(x)], axis=-1)
+
+    # forming scatter matrix [eqn. 17]
+    S1 = np.einsum('...ni,...nj->...ij', D1, D1)
+    S2 = np.einsum('...ni,...nj->...ij', D1, D2)
+    S3 = np.einsum('...ni,...nj->...ij', D2, D2)
+
+    S3_inv = _batch_inv(S3)
+
+    # Inverse of the constraint matrix [eqn. 18]
+    C1_inv = np.linalg.inv(np.array([[0., 0., 2.],
+                                     [0., -1., 0.],
+                                     [2., 0., 0.]]))
+
+    # Reduced scatter matrix [eqn. 29]
+    S2T = np.swapaxes(S2, -1, -2)
+    M = np.matmul(C1_inv, S1 - np.matmul(np.matmul(S2, S3_inv), S2T))
+
+    success = np.isfinite(M).all(axis=(-2, -1))
+    # Swap in a placeholder for failed sets so the rest can be solved
+    M[~success] = np.eye(3)
+
+    # M*|a b c >=l|a b c >. Find eigenvalues and eigenvectors
+    # from this equation [eqn. 28]
+    eig_vecs = np.linalg.eig(M)[1].real
+
+    # eigenvector must meet constraint 4ac - b^2 to be valid.
+    cond = 4 * eig_vecs[..., 0, :] * eig_vecs[..., 2, :] - \
+        eig_vecs[..., 1, :] ** 2
+    valid = cond > 0
+    success &= valid.sum(axis=-1) == 1
+
+    a1 = (eig_vecs * valid[..., np.newaxis, :]).sum(axis=-1)
+
+    # |d f g> = -S3^(-1)*S2^(T)*|a b c> [eqn. 24]
+    a2 = -np.matmul(np.matmul(S3_inv, S2T), a1[..., np.newaxis])[..., 0]
+
+    a, b, c = np.rollaxis(a1, -1)
+    d, f, g = np.rollaxis(a2, -1)
+
+    # eigenvectors are the coefficients of an ellipse in general form
+    # a*x^2 + 2*b*x*y + c*y^2 + 2*d*x + 2*f*y + g = 0 (eqn. 15) from [2]
+    b = b / 2.
+    d = d / 2.
+    f = f / 2.
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # finding center of ellipse [eqn.19 and 20] from [2]
+        x0 = (c * d - b * f) / (b ** 2. - a * c)
+        y0 = (a * f - b * d) / (b ** 2. - a * c)
+
+        # Find the semi-axes lengths [eqn. 21 and 22] from [2]
+        numerator = a * f ** 2 + c * d ** 2 + g * b ** 2 \
+            - 2 * b * d * f - a * c * g
+        term = np.sqrt((a - c) ** 2 + 4 * b ** 2)
+        denominator1 = (b ** 2 - a * c) * (term - (a + c))
+        denominator2 = (b ** 2 - a * c) * (- term - (a + c))
+        width = np.sqrt(2 * numerator / denominator1)
+        height = np.sqrt(2 * numerator / denominator2)
+
+        # angle of counterclockwise rotation of major-axis of ellipse
+        # to x-axis [eqn. 23] from [2].
+        phi = 0.5 * np.arctan((2. * b) / (a - c))
+    phi = np.where(a > c, phi + 0.5 * np.pi, phi)
+
+    params = np.nan_to_num(np.stack([x0, y0, width, height, phi], axis=-1))
+    params[~success] = np.nan
+
+    return params, success
+
+
+def _batch_inv(arr):
+    '''
+    Invert a stack of matrices. Singular matrices are returned as NaNs
+    instead of raising an error for the whole stack.
+    '''
+
+    try:
+        return np.linalg.inv(arr)
+    except np.linalg.LinAlgError:
+        pass
+
+    arr_inv = np.empty_like(arr)
+    for idx in np.ndindex(arr.shape[:-2]):
+        try:
+            arr_inv[idx] = np.linalg.inv(arr[idx])
+        except np.linalg.LinAlgError:
+            arr_inv[idx] = np.nan
+
+    return arr_inv
+
+
 def common_scale(wcs1, wcs2, tol=1e-5):
     '''
     Return the factor to make the pixel scales in the WCS objects the same.
@@ -542,27 +642,155 @@ def fourier_shift(x, shift, axis=0):
     x2 : np.ndarray
         Shifted array.
     '''
-    mask = ~np.isfinite(x)
-    nonan = x.copy()
-    nonan[mask] = 0.0
+    return FourierShifter(x, axis=axis).shift(shift)
+
+
+class FourierShifter(object):
+    """
+    Apply many fractional shifts along one axis of an array. The array and
+    its NaN mask are only transformed once, and each shift only requires
+    the phase ramp and an inverse transform.
+
+    Since the array is real, only the positive frequencies are kept (see
+    `~numpy.fft.rfft`).
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Array to be shifted. NaNs are set to zero before transforming, and
+        the shifted NaN mask is applied to each shifted array.
+    axis : int, optional
+        Axis to shift along.
+    """
+
+    def __init__(self, x, axis=0):
+        super(FourierShifter, self).__init__()
 
-    nonan_shift = _shifter(nonan, shift, axis)
-    mask_shift = _shifter(mask, shift, axis) > 0.5
+        self.axis = axis
+        self.size = x.shape[axis]
 
-    nonan_shift[mask_shift] = np.NaN
+        mask = ~np.isfinite(x)
 
-    return nonan_shift
+        self._ft = np.fft.rfft(np.where(mask, 0.0, x), axis=axis)
 
+        if mask.any():
+            self._mask_ft = np.fft.rfft(mask.astype(np.float64), axis=axis)
+        else:
+            self._mask_ft = None
 
-def _shifter(x, shift, axis):
-    ftx = np.fft.fft(x, axis=axis)
-    m = np.fft.fftfreq(x.shape[axis])
-    m_shape = [1] * len(x.shape)
-    m_shape[axis] = m.shape[0]
-    m = m.reshape(m_shape)
-    phase = np.exp(-2 * np.pi * m * 1j * shift)
-    x2 = np.real(np.fft.ifft(ftx * phase, axis=axis))
-    return x2
+        freqs = np.fft.rfftfreq(self.size)
+        freq_shape = [1] * x.ndim
+        freq_shape[axis] = freqs.size
+        self._freqs = freqs.reshape(freq_shape)
+
+    def shift(self, shift):
+        '''
+        Return the array shifted by `shift` pixels.
+
+        Parameters
+        ----------
+        shift : int or float
+            Number of pixels to shift.
+
+        Returns
+        -------
+        x2 : np.ndarray
+            Shifted array.
+        '''
+
+        phase = np.exp(-2j * np.pi * self._freqs * shift)
+
+        x2 = np.fft.irfft(self._ft * phase, n=self.size, axis=self.axis)
+
+        if self._mask_ft is not None:
+            mask_shift = np.fft.irfft(self._mask_ft * phase, n=self.size,
+                                      axis=self.axis) > 0.5
+            x2[mask_shift] = np.nan
+
+        return x2
+
+
+class FourierGaussianSmoother(object):
+    r'''
+    Smooth an image with Gaussian kernels of many widths. The zero-padded
+    image and its NaN mask are only transformed once, and each width only
+    requires the Gaussian transfer function and an inverse transform.
+
+    The result matches `~astropy.convolution.convolve_fft` with a normalized
+    `~astropy.convolution.Gaussian2DKernel`, `boundary='fill'` and
+    `fill_value=0`. When the image contains NaNs, they are interpolated over
+    by dividing by the smoothed weights, as with
+    `nan_treatment='interpolate'`. The Gaussian is not truncated to a kernel
+    size, but the image is only padded by `truncate` times the largest
+    width, so contributions wrapping around from the opposite edge are
+    below :math:`\exp(-{\rm truncate}^2 / 2)`.
+
+    Parameters
+    ----------
+    img : np.ndarray
+        2D image to smooth.
+    max_width : float
+        Largest standard deviation, in pixels, that will be smoothed with.
+    truncate : float, optional
+        Pad the image by this many times `max_width`.
+    '''
+
+    def __init__(self, img, max_width, truncate=4.0):
+        super(FourierGaussianSmoother, self).__init__()
+
+        img = as_working(img)
+
+        self.shape = img.shape
+
+        pad = int(np.ceil(truncate * max_width))
+        self.fft_shape = fast_fft_shape([size + pad for size in self.shape])
+
+        mask = ~np.isfinite(img)
+
+        self._ft = rfftn(np.where(mask, 0.0, img).astype(img.dtype),
+                         s=self.fft_shape)
+
+        if mask.any():
+            self._mask_ft = rfftn(mask.astype(img.dtype), s=self.fft_shape)
+        else:
+            self._mask_ft = None
+
+        yfreqs = np.fft.fftfreq(self.fft_shape[0])
+        xfreqs = np.fft.rfftfreq(self.fft_shape[1])
+        self._freq_sq = as_working(yfreqs[:, np.newaxis]**2 +
+                                   xfreqs[np.newaxis]**2)
+
+    def smooth(self, width):
+        '''
+        Return the image smoothed by a Gaussian.
+
+        Parameters
+        ----------
+        width : float
+            Standard deviation of the Gaussian in pixels.
+
+        Returns
+        -------
+        smooth_img : np.ndarray
+            Smoothed image.
+        '''
+
+        transfer = np.exp(-2 * np.pi**2 * float(width)**2 * self._freq_sq)
+
+        crop = (slice(0, self.shape[0]), slice(0, self.shape[1]))
+
+        smooth_img = irfftn(self._ft * transfer, s=self.fft_shape)[crop]
+
+        if self._mask_ft is not None:
+            # Weights are one outside of the image, as the fill value is
+            # treated as data.
+            wts = 1 - irfftn(self._mask_ft * transfer, s=self.fft_shape)[crop]
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                smooth_img = smooth_img / wts
+            smooth_img[wts < 10 * np.finfo(wts.dtype).eps] = 0.
+
+        return smooth_img
 
 
 def pixel_shift(x, shift, axis=0):
@@ -604,3 +832,48 @@ def padwithnans(vector, pad_width, iaxis, kwargs):
     vector[:pad_width[0]] = np.NaN
     vector[-pad_width[1]:] = np.NaN
     return vector
+
+
+def parallel_map(func, iterable, n_jobs=1, use_threads=False):
+    '''
+    Apply a function to each item, optionally in parallel.
+
+    Parameters
+    ----------
+    func : function
+        Function to apply. Must be picklable (i.e., defined at the top level
+        of a module) when using processes.
+    iterable : iterable
+        Items to apply the function to.
+    n_jobs : int, optional
+        Number of workers. Values less than 1 use all available CPUs.
+        Default is 1, which does not create a pool.
+    use_threads : bool, optional
+        Use a pool of threads instead of processes. Threads are preferable
+        when `func` spends most of its time in numpy routines that release
+        the GIL (e.g., FFTs).
+
+    Returns
+    -------
+    results : list
+        Output of `func` for each item, in order.
+    '''
+
+    if n_jobs is None or n_jobs == 1:
+        return list(map(func, iterable))
+
+    import multiprocessing as mp
+    from multiprocessing.pool import ThreadPool
+
+    if n_jobs < 1:
+        n_jobs = mp.cpu_count()
+
+    pool = ThreadPool(n_jobs) if use_threads else mp.Pool(n_jobs)
+
+    try:
+        results = pool.map(func, iterable)
+    finally:
+        pool.close()
+        pool.join()
+
+    return results
@@ -28,36 +28,42 @@ def intensity_data(cube, p=0.2, noise_lim=-np.inf, norm=True):
     intensity_vecs : numpy.ndarray
         2D dataset of size (# channels, p * cube.shape[1] * cube.shape[2]).
     '''
+    nchan = cube.shape[0]
     vec_length = int(round(p * cube.shape[1] * cube.shape[2]))
-    intensity_vecs = np.empty((cube.shape[0], vec_length))
-
-    delete_channels = []
 
     if norm:
         maxval = np.nanmax(cube)
     else:
         maxval = 1.0
 
-    for dv in range(cube.shape[0]):
-        vec_vec = cube[dv, :, :]
-        # Remove nans from the slice
-        vel_vec = vec_vec[np.isfinite(vec_vec)]
-        # Apply noise limit
-        vel_vec = vel_vec[vel_vec > noise_lim]
-        vel_vec = np.sort(vel_vec)[::-1]
-        if len(vel_vec) < vec_length:
-            diff = vec_length - len(vel_vec)
-            vel_vec = np.append(vel_vec, [0.0] * diff)
-        else:
-            vel_vec = vel_vec[:vec_length]
-
-        # Return the normalized, shortened vector
-        if maxval != 0.0:
-            intensity_vecs[dv, :] = vel_vec / maxval
-        else:
-            delete_channels.append(dv)
-    # Remove channels
-    intensity_vecs = np.delete(intensity_vecs, delete_channels, axis=0)
+    # All channels are removed when they cannot be normalized.
+    if maxval == 0.0:
+        return np.empty((0, vec_length))
+
+    flat = np.array(cube, dtype=np.float64).reshape((nchan, -1))
+
+    # Remove NaNs and values below the noise limit by moving them to the end
+    # of each sorted channel.
+    good = np.isfinite(flat)
+    good[good] = flat[good] > noise_lim
+    flat[~good] = -np.inf
+
+    intensity_vecs = np.zeros((nchan, vec_length))
+
+    num_keep = min(vec_length, flat.shape[1])
+    if num_keep == 0:
+        return intensity_vecs
+
+    # Only the brightest values in each channel need to be sorted
+    if num_keep < flat.shape[1]:
+        flat = -np.partition(-flat, num_keep - 1, axis=1)[:, :num_keep]
+    brightest = -np.sort(-flat, axis=1)[:, :num_keep]
+
+    # Channels with too few values are padded with zeros
+    brightest[~np.isfinite(brightest)] = 0.0
+
+    # Return the normalized, shortened vectors
+    intensity_vecs[:, :num_keep] = brightest / maxval
 
     return intensity_vecs
 
@@ -68,7 +74,7 @@ def _format_data(cube, data_format='intensity', num_spec=1000,
     Rearrange data into a 2D object using the given format.
     '''
 
-    if data_format is "spectra":
+    if data_format == "spectra":
         if num_spec is None:
             raise ValueError('Must specify num_spec for data format',
                              'spectra.')
@@ -79,16 +85,11 @@ def _format_data(cube, data_format='intensity', num_spec=1000,
         bright_spectra = \
             np.argpartition(mom0.ravel(), -num_spec)[-num_spec:]
 
-        x = np.empty((num_spec,), dtype=int)
-        y = np.empty((num_spec,), dtype=int)
+        y, x = np.unravel_index(bright_spectra, mom0.shape)
 
-        for i in range(num_spec):
-            x[i] = int(bright_spectra[i] / cube.shape[1])
-            y[i] = int(bright_spectra[i] % cube.shape[2])
+        data_matrix = cube[:, y, x]
 
-        data_matrix = cube[:, x, y]
-
-    elif data_format is "intensity":
+    elif data_format == "intensity":
         data_matrix = intensity_data(cube, noise_lim=noise_lim,
                                      p=p)
 
@@ -104,17 +105,25 @@ def _format_data(cube, data_format='intensity', num_spec=1000,
     return data_matrix
 
 
-def var_cov_cube(cube, mean_sub=False):
+def var_cov_cube(cube, mean_sub=False, block_size=None):
     '''
     Compute the variance-covariance matrix of a data cube, with proper
     handling of NaNs.
 
+    The channels are flattened to the rows of a matrix with NaNs set to zero.
+    The sums of the products between channels and the number of pixels where
+    both channels are finite are then matrix products of the data and of the
+    finite mask with their transposes.
+
     Parameters
     ----------
     cube : numpy.ndarray
         PPV cube. Spectral dimension assumed to be 0th axis.
     mean_sub : bool, optional
         Subtract column means.
+    block_size : int, optional
+        Number of spatial pixels used in each matrix product. Limits the
+        memory used for large cubes. Defaults to pixel blocks of ~32 MB.
 
     Returns
     -------
@@ -124,44 +133,46 @@ def var_cov_cube(cube, mean_sub=False):
 
     n_velchan = cube.shape[0]
 
-    cov_matrix = np.zeros((n_velchan, n_velchan))
+    chans = cube.reshape((n_velchan, -1))
+    npix = chans.shape[1]
 
-    for i, chan in enumerate(_iter_2D(cube)):
-        norm_chan = chan
-        if mean_sub:
-            norm_chan -= np.nanmean(chan)
-        for j, chan2 in enumerate(_iter_2D(cube[:i+1, :, :])):
-            norm_chan2 = chan2
-            if mean_sub:
-                norm_chan2 -= np.nanmean(chan2)
+    if block_size is None:
+        block_size = max(2**22 // n_velchan, 1)
 
-            divisor = np.sum(np.isfinite(norm_chan*norm_chan2))
+    blocks = [slice(start, start + block_size)
+              for start in range(0, npix, block_size)]
 
-            # Apply Bessel's correction when mean subtracting
-            if mean_sub:
-                divisor -= 1.0
+    if mean_sub:
+        sums = np.zeros(n_velchan)
+        counts = np.zeros(n_velchan)
+        for block in blocks:
+            chan_block = chans[:, block]
+            finite = np.isfinite(chan_block)
+            sums += np.where(finite, chan_block, 0.).sum(axis=1)
+            counts += finite.sum(axis=1)
 
-            cov_matrix[i, j] = \
-                np.nansum(norm_chan*norm_chan2) / divisor
-
-        # Variances
-        # Divided in half to account for doubling in line below
-        var_divis = np.sum(np.isfinite(norm_chan))
-        if mean_sub:
-            var_divis -= 1.0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = sums / counts
+    else:
+        means = np.zeros(n_velchan)
 
-        cov_matrix[i, i] = 0.5 * \
-            np.nansum(norm_chan*norm_chan) / var_divis
+    products = np.zeros((n_velchan, n_velchan))
+    divisor = np.zeros((n_velchan, n_velchan))
 
-    cov_matrix = cov_matrix + cov_matrix.T
+    for block in blocks:
+        chan_block = chans[:, block] - means[:, np.newaxis]
+        finite = np.isfinite(chan_block)
+        chan_block[~finite] = 0.
+        finite = finite.astype(np.float64)
 
-    return np.nan_to_num(cov_matrix)
+        products += np.dot(chan_block, chan_block.T)
+        divisor += np.dot(finite, finite.T)
 
+    # Apply Bessel's correction when mean subtracting
+    if mean_sub:
+        divisor -= 1.0
 
-def _iter_2D(arr):
-    '''
-    Flatten a 3D cube into 2D by its channels.
-    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov_matrix = products / divisor
 
-    for chan in arr.reshape((arr.shape[0], -1)):
-        yield chan.copy()
+    return np.nan_to_num(cov_matrix)
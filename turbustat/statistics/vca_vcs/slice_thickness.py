@@ -3,10 +3,13 @@ from __future__ import print_function, absolute_import, division
 
 import numpy as np
 from astropy import units as u
+from astropy.wcs import WCS
 from spectral_cube.spectral_cube import BaseSpectralCube
 from astropy.convolution import Gaussian1DKernel
 from warnings import warn
 
+from ..apodizing_kernels import fast_fft_shape
+
 
 def spectral_regrid_cube(cube, channel_width):
     '''
@@ -44,16 +47,42 @@ def spectral_regrid_cube(cube, channel_width):
     if not isinstance(channel_width, u.Quantity):
         raise TypeError("channel_width must be an astropy.units.Quantity.")
 
-    fwhm_factor = np.sqrt(8 * np.log(2))
+    current_resolution = np.diff(cube.spectral_axis[:2])[0]
 
-    pix_unit = channel_width.unit.is_equivalent(u.pix)
+    diff_factor, gaussian_width = \
+        _regrid_factors(current_resolution, channel_width)
 
-    spec_width = np.diff(cube.spectral_axis[:2])[0]
+    if diff_factor == 1:
+        return cube
+
+    kernel = Gaussian1DKernel(gaussian_width)
+    new_cube = cube.spectral_smooth(kernel)
+
+    # Now define the new spectral axis at the new resolution
+    num_chan = int(np.floor_divide(cube.shape[0], diff_factor))
+    new_specaxis = np.linspace(cube.spectral_axis.min().value,
+                               cube.spectral_axis.max().value,
+                               num_chan) * current_resolution.unit
+    # Keep the same order (max to min or min to max)
+    if current_resolution.value < 0:
+        new_specaxis = new_specaxis[::-1]
+
+    return new_cube.spectral_interpolate(new_specaxis,
+                                         suppress_smooth_warning=True)
 
-    current_resolution = np.diff(cube.spectral_axis[:2])[0]
+
+def _regrid_factors(current_resolution, channel_width):
+    '''
+    Ratio of the new and current channel widths, and the width (in
+    channels) of the Gaussian used to smooth to the new width.
+    '''
+
+    fwhm_factor = np.sqrt(8 * np.log(2))
+
+    pix_unit = channel_width.unit.is_equivalent(u.pix)
 
     if pix_unit:
-        target_resolution = channel_width.value * spec_width
+        target_resolution = channel_width.value * current_resolution
     else:
         target_resolution = channel_width.to(current_resolution.unit)
 
@@ -62,7 +91,7 @@ def spectral_regrid_cube(cube, channel_width):
     if diff_factor == 1:
         warn("The requested channel width match the original channel width. "
              "The original cube is returned.")
-        return cube
+        return diff_factor, None
 
     if diff_factor < 1:
         raise ValueError("Only down-sampling the spectral grid is supported. "
@@ -74,17 +103,137 @@ def spectral_regrid_cube(cube, channel_width):
 
     gaussian_width = ((target_resolution**2 - current_resolution**2)**0.5 /
                       pixel_scale / fwhm_factor)
-    kernel = Gaussian1DKernel(gaussian_width)
-    new_cube = cube.spectral_smooth(kernel)
 
-    # Now define the new spectral axis at the new resolution
-    num_chan = int(np.floor_divide(cube.shape[0], diff_factor))
-    new_specaxis = np.linspace(cube.spectral_axis.min().value,
-                               cube.spectral_axis.max().value,
-                               num_chan) * current_resolution.unit
-    # Keep the same order (max to min or min to max)
-    if current_resolution.value < 0:
-        new_specaxis = new_specaxis[::-1]
+    return diff_factor, float(gaussian_width.to(u.dimensionless_unscaled))
 
-    return new_cube.spectral_interpolate(new_specaxis,
-                                         suppress_smooth_warning=True)
+
+def spectral_regrid_array(data, header, channel_width, block_size=None):
+    '''
+    Spectrally regrid a cube given as an array and header to a given channel
+    width, without creating a `~spectral_cube.SpectralCube`. This follows
+    `spectral_regrid_cube`: each spectrum is convolved with the same
+    Gaussian kernel (using FFTs along the spectral axis, with NaNs
+    interpolated over) and linearly interpolated onto the same number of
+    channels spanning the original spectral range. Samples that are NaN in
+    the original cube are NaN before the interpolation, as they are masked
+    in the `~spectral_cube.SpectralCube`.
+
+    Parameters
+    ----------
+    data : `~numpy.ndarray`
+        Cube with the spectral axis first.
+    header : `~astropy.io.fits.Header`
+        Header of the cube.
+    channel_width : `~astropy.units.Quantity`
+        The width of the new channels in equivalent spectral units or in
+        pixel units. See `spectral_regrid_cube`.
+    block_size : int, optional
+        Number of spectra smoothed and interpolated together. Limits the
+        memory used for large cubes. Defaults to blocks of ~32 MB.
+
+    Returns
+    -------
+    regridded_data : `~numpy.ndarray`
+        The smoothed and regridded cube.
+    regridded_header : `~astropy.io.fits.Header`
+        Header with the new spectral axis.
+    '''
+
+    if not isinstance(channel_width, u.Quantity):
+        raise TypeError("channel_width must be an astropy.units.Quantity.")
+
+    wcs = WCS(header)
+
+    if wcs.wcs.spec < 0:
+        raise ValueError("Header does not have spectral axis.")
+
+    spec_wcs = wcs.sub([wcs.wcs.spec + 1])
+    spec_unit = u.Unit(spec_wcs.wcs.cunit[0])
+
+    nchan = data.shape[0]
+    spec_axis = spec_wcs.wcs_pix2world(np.arange(nchan), 0)[0]
+
+    current_resolution = (spec_axis[1] - spec_axis[0]) * spec_unit
+
+    diff_factor, gaussian_width = \
+        _regrid_factors(current_resolution, channel_width)
+
+    if diff_factor == 1:
+        return data, header
+
+    num_chan = int(np.floor_divide(nchan, diff_factor))
+
+    if num_chan < 2:
+        raise ValueError("The requested channel width leaves fewer than 2 "
+                         "channels.")
+
+    kernel = Gaussian1DKernel(gaussian_width).array
+    conv_size = fast_fft_shape((nchan + kernel.size - 1,))[0]
+    kernel_fft = np.fft.rfft(kernel, conv_size)[:, np.newaxis]
+
+    # Keep the output aligned with the input channels.
+    conv_slice = slice(kernel.size // 2, kernel.size // 2 + nchan)
+
+    # Positions of the new channels in the original channels. The new axis
+    # spans the same range and keeps the same order.
+    posns = np.linspace(0, nchan - 1, num_chan)
+    lower = np.minimum(np.floor(posns).astype(int), nchan - 1)
+    upper = np.minimum(lower + 1, nchan - 1)
+    fracs = (posns - lower)[:, np.newaxis]
+
+    spectra = data.reshape((nchan, -1))
+    npix = spectra.shape[1]
+
+    if block_size is None:
+        block_size = max(2**22 // conv_size, 1)
+
+    regridded = np.empty((num_chan, npix))
+
+    for start in range(0, npix, block_size):
+        block = slice(start, start + block_size)
+
+        spec_block = np.asarray(spectra[:, block], dtype=np.float64)
+        nans = np.isnan(spec_block)
+
+        smoothed = np.fft.irfft(np.fft.rfft(np.where(nans, 0., spec_block),
+                                            conv_size, axis=0) * kernel_fft,
+                                conv_size, axis=0)[conv_slice]
+
+        if nans.any():
+            # Normalize by the kernel weight on the finite samples. The fill
+            # value beyond the spectrum counts as data.
+            wts = 1 - np.fft.irfft(np.fft.rfft(nans.astype(np.float64),
+                                               conv_size, axis=0) *
+                                   kernel_fft, conv_size, axis=0)[conv_slice]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                smoothed /= wts
+            smoothed[nans] = np.NaN
+
+        low_vals = smoothed[lower]
+        regridded[:, block] = \
+            np.where(fracs == 0, low_vals,
+                     low_vals + fracs * (smoothed[upper] - low_vals))
+
+    regridded = regridded.reshape((num_chan,) + data.shape[1:])
+
+    new_header = header.copy()
+
+    # The new channels are evenly spaced in the original pixels, so the
+    # spectral axis is rescaled in pixel units. This leaves the header units
+    # and any CD or PC matrix in place.
+    axis_num = wcs.wcs.spec + 1
+    step = (nchan - 1) / (num_chan - 1)
+
+    crpix_key = 'CRPIX{}'.format(axis_num)
+    new_header[crpix_key] = 1. + (header.get(crpix_key, 0.) - 1.) / step
+
+    cd_key = 'CD{0}_{0}'.format(axis_num)
+    if cd_key in header:
+        new_header[cd_key] = header[cd_key] * step
+    else:
+        cdelt_key = 'CDELT{}'.format(axis_num)
+        new_header[cdelt_key] = header.get(cdelt_key, 1.) * step
+
+    new_header['NAXIS{}'.format(axis_num)] = num_chan
+
+    return regridded, new_header
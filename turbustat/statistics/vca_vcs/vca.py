@@ -7,11 +7,13 @@ from numpy.fft import fftshift
 import astropy.units as u
 
 from ..rfft_to_fft import rfft_to_fft
-from .slice_thickness import spectral_regrid_cube
-from ..base_pspec2 import StatisticBase_PSpec2D
+from ..apodizing_kernels import apodize_and_pad
+from .slice_thickness import spectral_regrid_array
+from ..base_pspec2 import StatisticBase_PSpec2D, fit_pspec_batch
+from ..psds import rfft_radial_bins
+from ..precision import rfftn, as_working
 from ..base_statistic import BaseStatisticMixIn
 from ...io import common_types, threed_types
-from ...io.input_base import to_spectral_cube
 from ..fitting_utils import check_fit_limits
 
 
@@ -44,12 +46,10 @@ class VCA(BaseStatisticMixIn, StatisticBase_PSpec2D):
 
         # Regrid the data when channel_width is given
         if channel_width is not None:
-            sc_cube = to_spectral_cube(self.data, self.header)
+            reg_data, reg_header = \
+                spectral_regrid_array(self.data, self.header, channel_width)
 
-            reg_cube = spectral_regrid_cube(sc_cube, channel_width)
-
-            # Don't pass the header. It will read the new one in reg_cube
-            self.input_data_header(reg_cube, None)
+            self.input_data_header(reg_data, reg_header)
 
         if np.isnan(self.data).any():
             self.data[np.isnan(self.data)] = 0
@@ -59,19 +59,181 @@ class VCA(BaseStatisticMixIn, StatisticBase_PSpec2D):
 
         self._ps1D_stddev = None
 
-    def compute_pspec(self):
+    def compute_pspec(self, apodize_kernel=None, alpha=0.3, beta=0.0,
+                      pad_to_fast_len=False):
         '''
         Compute the 2D power spectrum.
+
+        Parameters
+        ----------
+        apodize_kernel : {None, 'tukey', 'hanning', 'splitcosinebell'}, optional
+            Apodizing window applied to each channel before the FFT. See
+            `~turbustat.statistics.apodizing_kernels.apodizing_window`.
+            The window is divided by the square root of its mean squared
+            value so the spectrum amplitude does not depend on the window.
+        alpha : float, optional
+            Taper fraction of the 'tukey' and 'splitcosinebell' windows.
+        beta : float, optional
+            Fraction of the 'splitcosinebell' window that is not tapered.
+        pad_to_fast_len : bool, optional
+            Zero-pad the spatial dimensions to the next size with a fast FFT.
+        '''
+
+        data = apodize_and_pad(self.data, apodize_kernel=apodize_kernel,
+                               alpha=alpha, beta=beta,
+                               pad_to_fast_len=pad_to_fast_len)
+
+        vca_fft = fftshift(rfft_to_fft(data))
+
+        self._ps2D = np.square(vca_fft).sum(axis=0, dtype=np.float64)
+
+    def sweep_channel_widths(self, channel_widths, logspacing=False,
+                             low_cut=None, high_cut=None,
+                             apodize_kernel=None, alpha=0.3, beta=0.0,
+                             pad_to_fast_len=False):
+        '''
+        Fit the VCA slope for many channel widths without regridding the
+        cube for each width.
+
+        Each channel is transformed once and the transforms are summed
+        cumulatively along the spectral axis. A thick channel spanning
+        channels :math:`a` to :math:`b` is then the difference of the
+        cumulative sums at :math:`b` and :math:`a`, with linear interpolation
+        for fractional edges, divided by the width. Since the FFT is linear,
+        this is the transform of the average of the channels, so no further
+        FFTs are needed for each width. As in `~spectral_regrid_cube`, the
+        number of thick channels is the number of channels divided by the
+        width factor, rounded down. The thick channels are centered within
+        the spectral range.
+
+        This uses top-hat averaging of the channels rather than the Gaussian
+        smoothing and interpolation of `~spectral_regrid_cube`, so the
+        slopes differ slightly from `VCA(cube, channel_width=width)`. A
+        width equal to the channel width gives the same power spectrum as
+        `~VCA.compute_pspec`.
+
+        Parameters
+        ----------
+        channel_widths : `~astropy.units.Quantity`
+            Channel widths in pixel or spectral units. Must be no smaller than
+            the current channel width.
+        logspacing : bool, optional
+            Use logarithmically spaced bins.
+        low_cut : `~astropy.units.Quantity`, optional
+            Lowest frequency to consider in the fits.
+        high_cut : `~astropy.units.Quantity`, optional
+            Highest frequency to consider in the fits.
+        apodize_kernel : {None, 'tukey', 'hanning', 'splitcosinebell'}, optional
+            See `~VCA.compute_pspec`.
+        alpha : float, optional
+            See `~VCA.compute_pspec`.
+        beta : float, optional
+            See `~VCA.compute_pspec`.
+        pad_to_fast_len : bool, optional
+            See `~VCA.compute_pspec`.
+
+        Returns
+        -------
+        slopes : `~numpy.ndarray`
+            Fitted slope for each channel width.
+        slope_errs : `~numpy.ndarray`
+            1-sigma errors on the slopes.
         '''
 
-        vca_fft = fftshift(rfft_to_fft(self.data))
+        if not isinstance(channel_widths, u.Quantity):
+            raise TypeError("channel_widths must be an "
+                            "astropy.units.Quantity.")
+
+        factors = \
+            np.atleast_1d(self._to_spectral(channel_widths, u.pix).value)
+
+        if (factors < 1).any():
+            raise ValueError("Only down-sampling the spectral grid is "
+                             "supported. All channel widths must be at least "
+                             "the current channel width.")
+
+        data = apodize_and_pad(self.data, apodize_kernel=apodize_kernel,
+                               alpha=alpha, beta=beta,
+                               pad_to_fast_len=pad_to_fast_len)
+
+        nchan = data.shape[0]
+        fft_shape = data.shape[1:]
 
-        self._ps2D = np.power(vca_fft, 2.).sum(axis=0)
+        freqs, bin_matrix = rfft_radial_bins(fft_shape, logspacing=logspacing)
+
+        # Cumulative sum of the channel transforms, starting from zero. The
+        # sum is kept in double precision since thick channels are found
+        # from differences of the sum.
+        chan_ffts = rfftn(as_working(data), axes=(1, 2))
+        cumul_fft = np.zeros((nchan + 1,) + chan_ffts.shape[1:],
+                             dtype=np.complex128)
+        np.cumsum(chan_ffts, axis=0, out=cumul_fft[1:])
+        del chan_ffts
+
+        def cumul_at(edge):
+            lower = min(int(np.floor(edge)), nchan - 1)
+            frac = edge - lower
+            return cumul_fft[lower] + \
+                frac * (cumul_fft[lower + 1] - cumul_fft[lower])
+
+        ps1Ds = np.empty((factors.size, freqs.size))
+
+        for i, factor in enumerate(factors):
+            num_chan = int(np.floor_divide(nchan, factor))
+            offset = 0.5 * (nchan - num_chan * factor)
+
+            ps2D = np.zeros(cumul_fft.shape[1:])
+
+            lower_cumul = cumul_at(offset)
+            for j in range(1, num_chan + 1):
+                upper_cumul = cumul_at(offset + j * factor)
+
+                chan_fft = (upper_cumul - lower_cumul) / factor
+                ps2D += chan_fft.real**2 + chan_fft.imag**2
+
+                lower_cumul = upper_cumul
+
+            # Match the normalization of the 3D FFT in compute_pspec
+            ps1Ds[i] = num_chan * bin_matrix.dot(ps2D.ravel())
+
+        freqs = freqs / u.pix
+
+        if low_cut is not None:
+            low_cut = self._to_pixel_freq(low_cut)
+        if high_cut is not None:
+            high_cut = self._to_pixel_freq(high_cut)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slopes, slope_errs = \
+                fit_pspec_batch(freqs, ps1Ds, low_cut=low_cut,
+                                high_cut=high_cut, shape=fft_shape)
+
+        self._sweep_freqs = freqs
+        self._sweep_ps1D = ps1Ds
+
+        return slopes, slope_errs
+
+    @property
+    def sweep_freqs(self):
+        '''
+        Spatial frequencies of the power spectra from
+        `~VCA.sweep_channel_widths`.
+        '''
+        return self._sweep_freqs
+
+    @property
+    def sweep_ps1D(self):
+        '''
+        1D power spectra for each channel width in
+        `~VCA.sweep_channel_widths`.
+        '''
+        return self._sweep_ps1D
 
     def run(self, verbose=False, save_name=None, return_stddev=True,
             logspacing=False, low_cut=None, high_cut=None,
             fit_2D=True, fit_2D_kwargs={},
-            xunit=u.pix**-1, use_wavenumber=False, **fit_kwargs):
+            xunit=u.pix**-1, use_wavenumber=False, apodize_kernel=None,
+            alpha=0.3, beta=0.0, pad_to_fast_len=False, **fit_kwargs):
         '''
         Full computation of VCA.
 
@@ -98,10 +260,19 @@ class VCA(BaseStatisticMixIn, StatisticBase_PSpec2D):
             Choose the unit to convert the x-axis in the plot to.
         use_wavenumber : bool, optional
             Plot the x-axis as the wavenumber rather than spatial frequency.
+        apodize_kernel : {None, 'tukey', 'hanning', 'splitcosinebell'}, optional
+            Passed to `~VCA.compute_pspec`.
+        alpha : float, optional
+            Passed to `~VCA.compute_pspec`.
+        beta : float, optional
+            Passed to `~VCA.compute_pspec`.
+        pad_to_fast_len : bool, optional
+            Passed to `~VCA.compute_pspec`.
         fit_kwargs : Passed to `~VCA.fit_pspec`.
         '''
 
-        self.compute_pspec()
+        self.compute_pspec(apodize_kernel=apodize_kernel, alpha=alpha,
+                           beta=beta, pad_to_fast_len=pad_to_fast_len)
         self.compute_radial_pspec(return_stddev=return_stddev,
                                   logspacing=logspacing)
         self.fit_pspec(low_cut=low_cut, high_cut=high_cut, **fit_kwargs)
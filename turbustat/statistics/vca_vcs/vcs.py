@@ -7,12 +7,12 @@ from numpy.fft import fftfreq
 from astropy import units as u
 
 from ..lm_seg import Lm_Seg
-from ..rfft_to_fft import rfft_to_fft
+from ..precision import rfftn, as_working
+from ..stats_utils import parallel_map
 from ..base_statistic import BaseStatisticMixIn
 from ...io import common_types, threed_types
-from ...io.input_base import to_spectral_cube
 from ..fitting_utils import clip_func
-from .slice_thickness import spectral_regrid_cube
+from .slice_thickness import spectral_regrid_array
 
 
 class VCS(BaseStatisticMixIn):
@@ -43,12 +43,10 @@ class VCS(BaseStatisticMixIn):
         self.input_data_header(cube, header)
 
         if channel_width is not None:
-            sc_cube = to_spectral_cube(self.data, self.header)
+            reg_data, reg_header = \
+                spectral_regrid_array(self.data, self.header, channel_width)
 
-            reg_cube = spectral_regrid_cube(sc_cube, channel_width)
-
-            # Don't pass the header. It will read the new one in reg_cube
-            self.input_data_header(reg_cube, None)
+            self.input_data_header(reg_data, reg_header)
 
         self._has_nan_flag = False
         if np.isnan(self.data).any():
@@ -60,9 +58,23 @@ class VCS(BaseStatisticMixIn):
         self.freqs = \
             np.abs(fftfreq(self.data.shape[0])) / u.pix
 
-    def compute_pspec(self):
+    def compute_pspec(self, block_size=None, n_jobs=1):
         '''
         Take the FFT of each spectrum in the velocity dimension and average.
+
+        Summing the power of the 3D FFT over both spatial frequencies is
+        equal (Parseval's theorem) to the number of spatial pixels times the
+        sum of the power of the 1D spectral FFTs. Only the spectral axis is
+        transformed, in blocks of spatial pixels.
+
+        Parameters
+        ----------
+        block_size : int, optional
+            Number of spatial pixels transformed together. Limits the
+            memory used and keeps each block in the CPU cache. Defaults to
+            pixel blocks of ~1 MB.
+        n_jobs : int, optional
+            Number of threads used to transform the blocks.
         '''
 
         if self._has_nan_flag:
@@ -72,9 +84,31 @@ class VCS(BaseStatisticMixIn):
             good_pixel_count = \
                 float(self.data.shape[1] * self.data.shape[2])
 
-        ps3D = np.power(rfft_to_fft(self.data), 2.)
-        self._ps1D = np.nansum(ps3D, axis=(1, 2)) /\
-            good_pixel_count
+        nchan = self.data.shape[0]
+
+        spectra = as_working(self.data).reshape((nchan, -1))
+        npix = spectra.shape[1]
+
+        if block_size is None:
+            block_size = max(2**17 // nchan, 1)
+
+        blocks = [slice(start, start + block_size)
+                  for start in range(0, npix, block_size)]
+
+        def block_power(block):
+            spec_fft = rfftn(spectra[:, block], axes=(0,))
+            return np.sum(spec_fft.real**2 + spec_fft.imag**2, axis=1,
+                          dtype=np.float64)
+
+        rpower = np.sum(parallel_map(block_power, blocks, n_jobs=n_jobs,
+                                     use_threads=True), axis=0)
+
+        # Fill in the negative frequencies to match the order of fftfreq.
+        power = np.empty(nchan)
+        power[:rpower.size] = rpower
+        power[rpower.size:] = rpower[1:(nchan + 1) // 2][::-1]
+
+        self._ps1D = power * npix / good_pixel_count
 
     @property
     def ps1D(self):
@@ -225,7 +259,7 @@ class VCS(BaseStatisticMixIn):
         return self.fit.brk_err
 
     def run(self, verbose=False, save_name=None, xunit=u.pix**-1,
-            **fit_kwargs):
+            n_jobs=1, **fit_kwargs):
         '''
         Run the entire computation.
 
@@ -237,10 +271,12 @@ class VCS(BaseStatisticMixIn):
             Save the figure when a file name is given.
         xunit : u.Unit, optional
             Choose the unit to convert the x-axis in the plot to.
+        n_jobs : int, optional
+            See `~VCS.compute_pspec`.
         fit_kwargs : Passed to `~VCS.fit_pspec`.
 
         '''
-        self.compute_pspec()
+        self.compute_pspec(n_jobs=n_jobs)
         self.fit_pspec(**fit_kwargs)
 
         if verbose:
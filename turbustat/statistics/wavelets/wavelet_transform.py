@@ -5,12 +5,12 @@ import numpy as np
 import warnings
 from astropy.convolution import convolve_fft, MexicanHat2DKernel
 import astropy.units as u
-import statsmodels.api as sm
 
 from ..base_statistic import BaseStatisticMixIn
 from ...io import common_types, twod_types
 from ..fitting_utils import check_fit_limits
-from ..lm_seg import Lm_Seg
+from ..lm_seg import Lm_Seg, ols_fit
+from ..precision import float_dtype, as_working, convolve_fft_kwargs
 
 
 class Wavelet(BaseStatisticMixIn):
@@ -104,7 +104,7 @@ class Wavelet(BaseStatisticMixIn):
         n0, m0 = self.data.shape
         A = len(self.scales)
 
-        self._Wf = np.zeros((A, n0, m0), dtype=np.float)
+        self._Wf = np.zeros((A, n0, m0), dtype=float_dtype())
 
         factor = 2
         if not scale_normalization:
@@ -115,11 +115,14 @@ class Wavelet(BaseStatisticMixIn):
 
         pix_scales = self._to_pixel(self.scales).value
 
+        data = as_working(self.data)
+
         for i, an in enumerate(pix_scales):
             psi = MexicanHat2DKernel(an)
 
             self._Wf[i] = \
-                convolve_fft(self.data, psi, normalize_kernel=False).real * \
+                convolve_fft(data, psi, normalize_kernel=False,
+                             **convolve_fft_kwargs()).real * \
                 an**factor
 
     @property
@@ -137,7 +140,7 @@ class Wavelet(BaseStatisticMixIn):
 
         self._values = np.empty_like(self.scales.value)
         for i, plane in enumerate(self.Wf):
-            self._values[i] = (plane[plane > 0]).mean()
+            self._values[i] = (plane[plane > 0]).mean(dtype=np.float64)
 
     @property
     def values(self):
@@ -240,11 +243,8 @@ class Wavelet(BaseStatisticMixIn):
         # model failed.
         if self.brk is None:
 
-            x = sm.add_constant(x)
-
-            model = sm.OLS(y, x, missing='drop')
-
-            self.fit = model.fit()
+            self.fit = ols_fit(np.column_stack((np.ones_like(x), x)), y)
+            model = self.fit
 
             self._slope = self.fit.params[1]
             self._slope_err = self.fit.bse[1]
@@ -32,3 +32,54 @@ def test_Bispec_distance():
 
     npt.assert_almost_equal(tester_dist.distance,
                             computed_distances['bispec_distance'])
+
+
+@pytest.mark.parametrize(('shape', 'mean_subtract'),
+                         [((8, 8), False), ((8, 8), True), ((9, 6), False)])
+def test_Bispec_exact(shape, mean_subtract):
+    '''
+    Compare the exact bispectrum to summing over all pairs of wavevectors in
+    each pair of shells.
+    '''
+
+    img = np.random.RandomState(0).normal(3., 1., size=shape)
+
+    tester = BiSpectrum(img.copy())
+    tester.run(mean_subtract=mean_subtract, method='exact')
+
+    if mean_subtract:
+        img = img - img.mean()
+
+    fftarr = np.fft.fft2(img)
+    yfreqs = np.fft.fftfreq(shape[0]) * shape[0]
+    xfreqs = np.fft.fftfreq(shape[1]) * shape[1]
+    shells = np.round(np.sqrt(yfreqs[:, np.newaxis]**2 +
+                              xfreqs[np.newaxis]**2)).astype(int)
+
+    bispec = np.zeros((shape[0] // 2, shape[1] // 2), dtype=complex)
+    biconorm = np.zeros_like(bispec, dtype=float)
+
+    for k1 in range(bispec.shape[0]):
+        for k2 in range(bispec.shape[1]):
+            for y1, x1 in zip(*np.where(shells == k1)):
+                for y2, x2 in zip(*np.where(shells == k2)):
+                    samp = fftarr[y1, x1] * fftarr[y2, x2] * \
+                        np.conj(fftarr[(y1 + y2) % shape[0],
+                                       (x1 + x2) % shape[1]])
+                    bispec[k1, k2] += samp
+                    biconorm[k1, k2] += np.abs(samp)
+
+    npt.assert_allclose(tester.bispectrum, bispec,
+                        atol=1e-10 * np.abs(bispec).max())
+    npt.assert_allclose(tester.bicoherence, np.abs(bispec) / biconorm,
+                        atol=1e-10)
+
+    # Splitting the shells into blocks gives the same sums.
+    tester_block = BiSpectrum(tester.data.copy())
+    tester_block.run(mean_subtract=mean_subtract, method='exact',
+                     block_size=2, n_jobs=2)
+
+    npt.assert_allclose(tester_block.bispectrum, tester.bispectrum,
+                        atol=1e-10 * np.abs(bispec).max())
+    npt.assert_allclose(tester_block.bicoherence, tester.bicoherence,
+                        atol=1e-10)
@@ -6,9 +6,11 @@ from __future__ import print_function, absolute_import, division
 Test functions for Cramer
 '''
 
+import numpy as np
 import numpy.testing as npt
 
 from ..statistics import Cramer_Distance
+from ..statistics.threeD_to_twoD import _format_data, intensity_data
 from ._testing_data import \
     dataset1, dataset2, computed_data, computed_distances
 
@@ -36,3 +38,36 @@ def test_cramer_spatial_diff():
     tester3.distance_metric(normalize=False)
 
     npt.assert_almost_equal(tester2.distance, tester3.distance)
+
+
+def test_intensity_data():
+
+    cube = np.random.RandomState(0).normal(size=(5, 8, 12))
+    cube[0, 1, 1] = np.NaN
+
+    intensity_vecs = intensity_data(cube, p=0.5, noise_lim=0.5, norm=False)
+
+    assert intensity_vecs.shape == (5, 48)
+
+    for chan, vec in zip(cube, intensity_vecs):
+        vals = chan[np.isfinite(chan)]
+        vals = np.sort(vals[vals > 0.5])[::-1]
+
+        npt.assert_allclose(vec[:vals.size], vals)
+        npt.assert_allclose(vec[vals.size:], 0.)
+
+
+def test_format_spectra_nonsquare():
+    '''
+    The brightest spectra must be found correctly in non-square maps.
+    '''
+
+    cube = np.random.RandomState(1).random_sample((5, 6, 9))
+
+    data_matrix = _format_data(cube, data_format='spectra', num_spec=4,
+                               normalize=False)
+
+    mom0 = cube.sum(0)
+
+    npt.assert_allclose(np.sort(data_matrix.sum(0)),
+                        np.sort(mom0.ravel())[-4:])
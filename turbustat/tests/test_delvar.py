@@ -1,13 +1,17 @@
 # Licensed under an MIT open source license - see LICENSE
 from __future__ import print_function, absolute_import, division
 
+import pytest
 
+import numpy as np
 import numpy.testing as npt
 import astropy.units as u
 
 from ..statistics import DeltaVariance, DeltaVariance_Distance
+from ..statistics.delta_variance.delta_variance import \
+    _unit_weight_convolutions, PYRAMID_TOLERANCE
 from ._testing_data import \
-    dataset1, dataset2, computed_data, computed_distances
+    dataset1, dataset2, computed_data, computed_distances, make_extended
 
 
 def test_DelVar_method():
@@ -66,6 +70,70 @@ def test_DelVar_method_fitlimits():
     npt.assert_allclose(tester.slope, tester3.slope)
 
 
+@pytest.mark.parametrize('boundary', ['wrap', 'fill'])
+def test_DelVar_unweighted(boundary):
+
+    lags = np.array([3., 5., 8.]) * u.pix
+
+    tester = DeltaVariance(dataset1["moment0"], lags=lags)
+    tester.run(boundary=boundary)
+
+    ones = np.ones_like(dataset1["moment0"][0])
+    tester2 = DeltaVariance(dataset1["moment0"], weights=ones, lags=lags)
+    tester2.run(boundary=boundary)
+
+    assert tester.unweighted
+    assert not tester2.unweighted
+
+    npt.assert_allclose(tester.delta_var, tester2.delta_var)
+    npt.assert_allclose(tester.delta_var_error, tester2.delta_var_error)
+
+    # The convolved uniform weights are shared between instances
+    if boundary == 'fill':
+        shape = dataset1["moment0"][0].shape
+        conv_weights = _unit_weight_convolutions(shape, 5., 1.5, boundary)
+        conv_weights2 = _unit_weight_convolutions(shape, 5., 1.5, boundary)
+
+        assert conv_weights[0] is conv_weights2[0]
+        assert conv_weights[1] is conv_weights2[1]
+
+
+@pytest.mark.parametrize('boundary', ['wrap', 'fill'])
+def test_DelVar_pyramid(boundary):
+
+    np.random.seed(0)
+    img = make_extended(256, powerlaw=3.)
+    img[10:20, 30:45] = np.NaN
+    weights = np.random.uniform(0.5, 1.5, img.shape)
+
+    header = dataset1["moment0"][1]
+
+    tester = DeltaVariance(img, header=header, weights=weights)
+    tester.run(boundary=boundary)
+
+    tester2 = DeltaVariance(img, header=header, weights=weights)
+    tester2.run(boundary=boundary, pyramid=True, pyramid_threshold=16.)
+
+    factors = tester2.pyramid_factors
+    assert (factors[tester2.lags.value < 32] == 1).all()
+    assert factors.max() == 8
+
+    # Lags below the threshold are unchanged
+    small = factors == 1
+    npt.assert_allclose(tester2.delta_var[small], tester.delta_var[small])
+
+    # With periodic boundaries, kernels larger than the image are not
+    # periodic. Only compare where the kernels fit in the image.
+    if boundary == 'wrap':
+        valid = tester.lags.value < 256 / (2 * np.sqrt(2))
+    else:
+        valid = np.ones(len(tester.lags), dtype=bool)
+
+    npt.assert_allclose(tester2.delta_var[valid], tester.delta_var[valid],
+                        rtol=PYRAMID_TOLERANCE)
+    npt.assert_allclose(tester2.slope, tester.slope, atol=1e-2)
+
+
 def test_DelVar_distance():
     tester_dist = \
         DeltaVariance_Distance(dataset1["moment0"],
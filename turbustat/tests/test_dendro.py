@@ -11,6 +11,7 @@ import numpy.testing as npt
 import os
 
 from ..statistics import Dendrogram_Stats, DendroDistance
+from ..statistics.dendrograms.dendro_stats import prune_sweep
 from ._testing_data import \
     dataset1, dataset2, computed_data, computed_distances
 
@@ -61,3 +62,22 @@ def test_DendroDistance():
                             computed_distances["dendrohist_distance"])
     npt.assert_almost_equal(tester_dist.num_distance,
                             computed_distances["dendronum_distance"])
+
+
+def test_prune_sweep():
+
+    from astrodendro import Dendrogram
+
+    d = Dendrogram.compute(dataset1["cube"][0], min_delta=min_deltas[0],
+                           min_value=0.001, min_npix=10)
+
+    numfeatures, values = prune_sweep(d, min_deltas[1:])
+
+    # Compare to pruning the dendrogram object
+    for delta, num, value in zip(min_deltas[1:], numfeatures, values):
+        d.prune(min_delta=delta)
+
+        assert num == len(d)
+        npt.assert_equal(value,
+                         np.array([struct.vmax for struct in
+                                   d.all_structures]))
@@ -99,3 +99,55 @@ def test_simple_ellipplaw_2D(plaw, ellip, theta):
 
         npt.assert_allclose(theta, fit_theta,
                             atol=0.08)
+
+
+@pytest.mark.parametrize(('ellip', 'theta'),
+                         [(0.5, np.pi / 4.), (0.75, 2 * np.pi / 3.)])
+def test_ellipplaw_leastsq(ellip, theta):
+
+    imsize = 128
+    plaw = 3.
+
+    np.random.seed(3434)
+    psd = make_extended(imsize, powerlaw=plaw, ellip=ellip, theta=theta,
+                        return_psd=True)
+
+    psd = np.abs(psd)**2
+
+    p0 = (3.7, interval_transform(ellip, 0, 1.), np.pi / 2., plaw)
+
+    yy, xx = np.mgrid[-imsize / 2:imsize / 2, -imsize / 2:imsize / 2]
+
+    valids = np.ones_like(yy, dtype=bool)
+    valids[imsize // 2 - 1, imsize // 2 - 1] = False
+
+    args = (np.log10(psd[valids]), xx[valids], yy[valids], p0)
+
+    levmarq_fit = fit_elliptical_powerlaw(*args, fit_method='LevMarq',
+                                          bootstrap=False)[0]
+    leastsq_fit = fit_elliptical_powerlaw(*args, fit_method='LeastSq',
+                                          bootstrap=False)[0]
+
+    # Both fitters return theta wrapped into [0, pi).
+    assert 0 <= levmarq_fit[2] < np.pi
+    assert 0 <= leastsq_fit[2] < np.pi
+
+    # Compare theta modulo pi so fits landing on either side of the wrap
+    # still agree.
+    dtheta = (levmarq_fit[2] - leastsq_fit[2] + np.pi / 2.) % np.pi - \
+        np.pi / 2.
+    npt.assert_allclose(dtheta, 0., atol=1e-4)
+
+    npt.assert_allclose(np.delete(levmarq_fit, 2), np.delete(leastsq_fit, 2),
+                        rtol=1e-4, atol=1e-6)
+
+    # Bootstrap errors only depend on the seed.
+    boot_stderr = fit_elliptical_powerlaw(*args, fit_method='LeastSq',
+                                          bootstrap=True, niters=20,
+                                          seed=0)[1]
+    boot_stderr_2 = fit_elliptical_powerlaw(*args, fit_method='LeastSq',
+                                            bootstrap=True, niters=20,
+                                            seed=0, n_jobs=2)[1]
+
+    npt.assert_allclose(boot_stderr, boot_stderr_2)
+    assert (boot_stderr > 0).all()
@@ -0,0 +1,74 @@
+# Licensed under an MIT open source license - see LICENSE
+from __future__ import print_function, absolute_import, division
+
+import pytest
+import gc
+
+import numpy as np
+import numpy.testing as npt
+
+from ..statistics.fft_cache import FFTCache, rfft_to_complex_fft
+
+
+@pytest.mark.parametrize('shape', [(32, 32), (31, 32), (32, 31), (15, 17),
+                                   (8, 9, 10)])
+def test_rfft_to_complex_fft(shape):
+
+    arr = np.random.random(shape)
+
+    npt.assert_allclose(rfft_to_complex_fft(np.fft.rfftn(arr), shape[-1]),
+                        np.fft.fftn(arr))
+
+
+def test_fft_cache_reuse():
+
+    cache = FFTCache()
+
+    arr = np.random.random((32, 32))
+    arr_copy = arr.copy()
+
+    rfft = cache.rfftn(arr)
+
+    # Same contents give the same transform.
+    assert cache.rfftn(arr_copy) is rfft
+    assert len(cache) == 1
+
+    npt.assert_allclose(cache.fftn(arr), np.fft.fft2(arr))
+
+    # A different normalization is a new entry
+    cache.rfftn(arr, norm='ortho')
+    assert len(cache) == 2
+
+    # Changing the contents must not return the old transform.
+    arr_copy[0, 0] += 1.
+    npt.assert_allclose(cache.rfftn(arr_copy), np.fft.rfftn(arr_copy))
+
+
+def test_fft_cache_weakref():
+
+    cache = FFTCache()
+
+    arr = np.random.random((32, 32))
+    cache.rfftn(arr)
+    assert len(cache) == 1
+
+    del arr
+    gc.collect()
+
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+
+
+def test_fft_cache_bounded():
+
+    arrs = [np.random.random((16, 16)) for _ in range(4)]
+
+    one_size = np.fft.rfftn(arrs[0]).nbytes
+
+    cache = FFTCache(max_bytes=2 * one_size)
+
+    for arr in arrs:
+        cache.rfftn(arr)
+
+    assert len(cache) == 2
+    assert cache.nbytes <= 2 * one_size
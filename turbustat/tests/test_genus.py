@@ -5,9 +5,12 @@ from __future__ import print_function, absolute_import, division
 Test functions for Genus
 '''
 
+import pytest
+
 import numpy as np
 import numpy.testing as npt
 import astropy.units as u
+from astropy.convolution import Gaussian2DKernel, convolve_fft
 from copy import copy
 
 from ..statistics import GenusDistance, Genus
@@ -40,6 +43,39 @@ def test_Genus_method_headerbeam():
     npt.assert_allclose(tester.genus_stats, tester2.genus_stats)
 
 
+@pytest.mark.parametrize(('add_nans'), (False, True))
+def test_Genus_fourier_smoothing(add_nans):
+    '''
+    Compare smoothing with the Gaussian transfer function to convolving with
+    a Gaussian kernel much larger than the image.
+    '''
+
+    rs = np.random.RandomState(0)
+    img = rs.normal(size=(40, 34)).cumsum(axis=0).cumsum(axis=1)
+
+    if add_nans:
+        img[rs.uniform(size=img.shape) < 0.05] = np.NaN
+
+    tester = Genus(img, smoothing_radii=np.array([3., 8., 15.]))
+    tester.make_smooth_arrays(method='fourier')
+
+    for width, smooth_img in zip(tester.smoothing_radii,
+                                 tester.smoothed_images):
+        size = 2 * int(6 * width) + 1
+        kernel = Gaussian2DKernel(width, x_size=size, y_size=size)
+
+        expected = convolve_fft(img, kernel, normalize_kernel=True,
+                                nan_treatment='interpolate',
+                                allow_huge=True)
+
+        npt.assert_allclose(smooth_img, expected,
+                            atol=1e-3 * np.nanmax(np.abs(expected)))
+
+    # convolve_fft keywords are not used by the Fourier smoothing.
+    with pytest.raises(ValueError):
+        tester.make_smooth_arrays(method='fourier', allow_huge=True)
+
+
 def test_Genus_method_value_vs_perc():
 
     min_perc1 = 20
@@ -0,0 +1,66 @@
+# Licensed under an MIT open source license - see LICENSE
+from __future__ import print_function, absolute_import, division
+
+import pytest
+
+import numpy as np
+import numpy.testing as npt
+import statsmodels.api as sm
+
+from ..statistics.lm_seg import Lm_Seg, ols_fit, fit_segmented_batch
+
+
+def make_broken_plaw(x, brk=-0.8, noise=0.05, seed=0):
+    rng = np.random.RandomState(seed)
+    return np.where(x < brk, -2 * x, -2 * x - 1.5 * (x - brk)) + \
+        rng.normal(0, noise, x.size)
+
+
+def test_ols_fit():
+
+    x = np.linspace(0, 1, 50)
+    y = 2 * x + 1 + np.random.RandomState(1).normal(0, 0.1, 50)
+    y[10] = np.NaN
+
+    X = np.column_stack((np.ones_like(x), x))
+
+    fit = ols_fit(X, y)
+    sm_fit = sm.OLS(y, X, missing='drop').fit()
+
+    npt.assert_allclose(fit.params, sm_fit.params)
+    npt.assert_allclose(fit.bse, sm_fit.bse)
+    npt.assert_allclose(fit.cov_params(), sm_fit.cov_params())
+    npt.assert_allclose(fit.fittedvalues, sm_fit.fittedvalues)
+
+
+def test_lm_seg():
+
+    x = np.linspace(-2, 0, 60)
+    y = make_broken_plaw(x, noise=0.01)
+
+    model = Lm_Seg(x, y, -1.0)
+    model.fit_model(verbose=False)
+
+    assert model.params.size == 5
+    npt.assert_allclose(model.brk, -0.8, atol=0.05)
+    npt.assert_allclose(model.slopes, [-2., -3.5], atol=0.1)
+
+
+def test_lm_seg_batch():
+
+    x = np.linspace(-2, 0, 60)
+    ys = np.array([make_broken_plaw(x, seed=i) for i in range(5)])
+    # Mask one point in one spectrum
+    ys[2, 5] = np.NaN
+
+    results = fit_segmented_batch(x, ys, -1.0)
+
+    for i, y in enumerate(ys):
+        model = Lm_Seg(x, y, -1.0)
+        model.fit_model(verbose=False)
+
+        assert results['break_flag'][i]
+        npt.assert_allclose(results['brk'][i], model.brk)
+        npt.assert_allclose(results['brk_err'][i], model.brk_err)
+        npt.assert_allclose(results['slopes'][i], model.slopes)
+        npt.assert_allclose(results['slope_errs'][i], model.slope_errs)
@@ -1,12 +1,16 @@
 # Licensed under an MIT open source license - see LICENSE
 from __future__ import print_function, absolute_import, division
 
+import numpy as np
 import numpy.testing as npt
 import astropy.units as u
+from astropy.convolution import convolve
+from scipy import ndimage as nd
 import os
 from glob import glob
 
 from ..data_reduction import Mask_and_Moments
+from ..data_reduction.make_moments import moment_masking, gauss_kern
 from ._testing_data import dataset1, sc1, props1
 
 
@@ -37,3 +41,41 @@ def test_loading():
     moment_fits = glob("dataset1*.fits")
     for file in moment_fits:
         os.remove(file)
+
+
+def test_fused_moments():
+
+    test = Mask_and_Moments(sc1, scale=props1.scale, moment_method='fused')
+    test.make_moments()
+    test.make_moment_errors()
+
+    npt.assert_allclose(test.channel_range, props1.channel_range)
+
+    for arr, fused_arr in zip(props1.all_moments() + props1.all_moment_errs(),
+                              test.all_moments() + test.all_moment_errs()):
+        npt.assert_allclose(np.asarray(fused_arr), np.asarray(arr))
+
+
+def test_moment_masking():
+
+    rng = np.random.RandomState(0)
+
+    cube = rng.normal(size=(40, 20, 21))
+    cube[10:20, 5:10, 5:15] += 3.
+    cube[5, 5, 5] = np.NaN
+
+    # Smooth, clip and dilate the whole cube at once.
+    smooth = convolve(cube, gauss_kern(2))
+    expected = np.isfinite(cube) & (smooth > 5 * 0.3)
+    expected = nd.binary_dilation(expected,
+                                  structure=nd.generate_binary_structure(3, 3),
+                                  iterations=2)
+
+    mask = moment_masking(cube, 2, clip=5, dilations=2, scale=0.3,
+                          chunk_size=7, n_jobs=2)
+    npt.assert_equal(mask, expected)
+
+    packed = moment_masking(cube, 2, clip=5, dilations=2, scale=0.3,
+                            chunk_size=7, packed=True)
+    unpacked = np.unpackbits(packed, axis=-1)[..., :cube.shape[2]]
+    npt.assert_equal(unpacked.astype(bool), expected)
@@ -1,10 +1,12 @@
 # Licensed under an MIT open source license - see LICENSE
 from __future__ import print_function, absolute_import, division
 
+import numpy as np
 import numpy.testing as npt
 import astropy.units as u
 
-from ..statistics import MVC, MVC_Distance
+from ..statistics import MVC, MVC_Distance, mvc_pspec_batch
+from ..statistics.apodizing_kernels import apodizing_window, fast_fft_shape
 from ._testing_data import \
     dataset1, dataset2, computed_data, computed_distances
 
@@ -61,3 +63,56 @@ def test_MVC_distance():
         MVC_Distance(dataset1, dataset2).distance_metric()
     npt.assert_almost_equal(tester_dist.distance,
                             computed_distances['mvc_distance'])
+
+
+def test_MVC_apodize_pad():
+
+    tester = MVC(dataset1["centroid"],
+                 dataset1["moment0"],
+                 dataset1["linewidth"],
+                 dataset1["centroid"][1])
+    tester.compute_pspec(apodize_kernel='splitcosinebell', alpha=0.3,
+                         beta=0.2, pad_to_fast_len=True)
+
+    window = apodizing_window(tester.moment0.shape,
+                              apodize_kernel='splitcosinebell',
+                              alpha=0.3, beta=0.2)
+    window = window / np.sqrt(np.mean(window**2))
+    shape = fast_fft_shape(window.shape)
+
+    term2 = np.nanmean(tester.linewidth**2 + tester.centroid**2)
+
+    mvc_fft = np.fft.fft2(tester.centroid * tester.moment0 * window, s=shape) - \
+        term2 * np.fft.fft2(tester.moment0 * window, s=shape)
+
+    npt.assert_allclose(tester.ps2D,
+                        np.abs(np.fft.fftshift(mvc_fft))**2)
+
+
+def test_mvc_pspec_batch():
+
+    rs = np.random.RandomState(0)
+
+    shape = (4, 20, 17)
+    centroids = rs.normal(size=shape)
+    moment0s = rs.uniform(1., 2., size=shape)
+    linewidths = rs.uniform(0.5, 1., size=shape)
+
+    ps2Ds = mvc_pspec_batch(centroids, moment0s, linewidths)
+
+    for centroid, moment0, linewidth, ps2D in \
+            zip(centroids, moment0s, linewidths, ps2Ds):
+
+        tester = MVC(centroid.copy(), moment0.copy(), linewidth.copy(),
+                     header=dataset1["centroid"][1])
+        tester.compute_pspec()
+
+        npt.assert_allclose(ps2D, tester.ps2D)
+
+        # Compare to transforming each term separately.
+        term2 = np.mean(linewidth**2 + centroid**2)
+
+        mvc_fft = np.fft.fft2(centroid * moment0) - \
+            term2 * np.fft.fft2(moment0)
+
+        npt.assert_allclose(ps2D, np.abs(np.fft.fftshift(mvc_fft))**2)
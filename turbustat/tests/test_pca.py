@@ -7,6 +7,7 @@ import numpy as np
 import numpy.testing as npt
 import astropy.units as u
 import astropy.constants as const
+from scipy.signal import argrelmin
 
 try:
     import emcee
@@ -16,6 +17,8 @@ except ImportError:
 
 from ..statistics import PCA, PCA_Distance
 from ..statistics.pca.width_estimate import WidthEstimate1D, WidthEstimate2D
+from ..statistics.stats_utils import EllipseModel, fit_ellipse_batch
+from ..statistics.threeD_to_twoD import var_cov_cube
 from ._testing_data import (dataset1, dataset2, computed_data,
                             computed_distances, generate_2D_array,
                             generate_1D_array, assert_between)
@@ -128,6 +131,42 @@ def test_PCA_auto_n_eigs(method, min_eigval):
     assert tester.n_eigs == fit_values["n_eigs_" + method]
 
 
+@pytest.mark.parametrize(("n_eigs", "method", "min_eigval"),
+                         [(5, "value", None), ("auto", "proportion", 0.99),
+                          ("auto", "value", 0.001)])
+def test_PCA_partial_eigen(n_eigs, method, min_eigval):
+
+    full = PCA(dataset1["cube"])
+    full.compute_pca(mean_sub=True, n_eigs=n_eigs, min_eigval=min_eigval,
+                     eigen_cut_method=method, eigen_solver='full')
+
+    partial = PCA(dataset1["cube"])
+    partial.compute_pca(mean_sub=True, n_eigs=n_eigs, min_eigval=min_eigval,
+                        eigen_cut_method=method, eigen_solver='partial')
+
+    num = full.n_eigs
+    assert partial.n_eigs == num
+
+    scale = full.eigvals[0]
+
+    npt.assert_allclose(partial.eigvals[:num], full.eigvals[:num],
+                        atol=1e-10 * scale)
+    npt.assert_allclose(partial.total_variance, full.total_variance)
+    npt.assert_allclose(partial.var_proportion, full.var_proportion)
+
+    # Eigenvectors are the same up to their sign
+    npt.assert_allclose(np.abs(np.sum(partial.eigvecs[:, :num] *
+                                      full.eigvecs[:, :num], axis=0)),
+                        1.)
+
+    # The noise eigenvectors have the same eigenvalues
+    noise_vecs = partial._trailing_eigvecs(10)
+    noise_vals = np.sum(noise_vecs * full.cov_matrix.dot(noise_vecs), axis=0)
+    npt.assert_allclose(noise_vals,
+                        full.eigvals[full._valid_eigenvectors()[-10:]],
+                        atol=1e-10 * scale)
+
+
 def test_PCA_distance():
     tester_dist = \
         PCA_Distance(dataset1["cube"],
@@ -182,6 +221,100 @@ def test_spatial_with_beam():
     npt.assert_approx_equal(widths[0], 7.071, significant=4)
 
 
+def _halir_flusser_fit(data):
+    '''
+    Per-fit direct least-squares ellipse fit (Halir & Flusser 1998), kept
+    here as a reference for the vectorized fits.
+    '''
+
+    x = data[:, 0]
+    y = data[:, 1]
+
+    D1 = np.vstack([x ** 2, x * y, y ** 2]).T
+    D2 = np.vstack([x, y, np.ones(len(x))]).T
+
+    S1 = np.dot(D1.T, D1)
+    S2 = np.dot(D1.T, D2)
+    S3 = np.dot(D2.T, D2)
+
+    C1 = np.array([[0., 0., 2.], [0., -1., 0.], [2., 0., 0.]])
+
+    M = np.linalg.inv(C1).dot(S1 - np.dot(S2, np.linalg.inv(S3)).dot(S2.T))
+
+    eig_vals, eig_vecs = np.linalg.eig(M)
+
+    cond = 4 * np.multiply(eig_vecs[0, :], eig_vecs[2, :]) \
+        - np.power(eig_vecs[1, :], 2)
+    a1 = eig_vecs[:, (cond > 0)]
+    a, b, c = a1.ravel()
+
+    a2 = np.dot(-np.linalg.inv(S3), S2.T).dot(a1)
+    d, f, g = a2.ravel()
+
+    b /= 2.
+    d /= 2.
+    f /= 2.
+
+    x0 = (c * d - b * f) / (b ** 2. - a * c)
+    y0 = (a * f - b * d) / (b ** 2. - a * c)
+
+    numerator = a * f ** 2 + c * d ** 2 + g * b ** 2 \
+        - 2 * b * d * f - a * c * g
+    term = np.sqrt((a - c) ** 2 + 4 * b ** 2)
+    denominator1 = (b ** 2 - a * c) * (term - (a + c))
+    denominator2 = (b ** 2 - a * c) * (- term - (a + c))
+    width = np.sqrt(2 * numerator / denominator1)
+    height = np.sqrt(2 * numerator / denominator2)
+
+    phi = 0.5 * np.arctan((2. * b) / (a - c))
+    if a > c:
+        phi += 0.5 * np.pi
+
+    return np.nan_to_num([x0, y0, width, height, phi])
+
+
+def test_ellipse_batch_fit():
+    '''
+    The vectorized ellipse fits should match fitting each set of points
+    and recover the generating ellipse.
+    '''
+
+    t = np.linspace(0, 2 * np.pi, 50)
+    params = (1., -2., 8., 4., np.deg2rad(30))
+    xy = EllipseModel().predict_xy(t, params=params)
+
+    rng = np.random.RandomState(0)
+    pts = xy + rng.normal(0, 0.1, (10,) + xy.shape)
+
+    # The fit returns the same ellipse with the axes swapped and the angle
+    # rotated by pi / 2.
+    exp_params = (1., -2., 4., 8., np.deg2rad(30) + np.pi / 2.)
+
+    batch_params, success = fit_ellipse_batch(pts)
+
+    assert success.all()
+
+    for these_pts, these_params in zip(pts, batch_params):
+        npt.assert_allclose(these_params, _halir_flusser_fit(these_pts))
+
+        npt.assert_allclose(these_params[:4], exp_params[:4], atol=0.1)
+        npt.assert_allclose(these_params[4], exp_params[4], atol=0.02)
+
+    ellip = EllipseModel()
+    ellip.estimate(pts[0])
+
+    # Points on the ellipse have no residual
+    npt.assert_allclose(ellip.residuals(ellip.predict_xy(t)), 0., atol=1e-8)
+
+    ellip.estimate_stderrs(pts[0], seed=1)
+    errs = ellip.param_errs.copy()
+
+    ellip.estimate_stderrs(pts[0], seed=1)
+    npt.assert_allclose(ellip.param_errs, errs)
+
+    assert (errs > 0).all()
+
+
 @pytest.mark.parametrize(('method'), ('fit', 'interpolate', 'walk-down'))
 def test_spectral_width_methods(method):
     '''
@@ -204,6 +337,161 @@ def test_spectral_width_methods(method):
     npt.assert_allclose(widths[0], 10.0, atol=errors[0])
 
 
+@pytest.mark.parametrize(('method'), ('fit', 'interpolate', 'walk-down'))
+def test_spectral_width_batch(method):
+    '''
+    Widths of many autocorrelation spectra estimated together should match
+    estimating each one on its own.
+    '''
+
+    stds = [4., 7., 10., 13.]
+
+    model_gauss = np.array([generate_1D_array(std=std, mean=100.)
+                            for std in stds]).T
+
+    fftx = np.fft.fft(model_gauss, axis=0)
+    fftxs = np.conjugate(fftx)
+    acors = np.fft.ifft((fftx - fftx.mean(axis=0)) *
+                        (fftxs - fftxs.mean(axis=0)), axis=0).real
+    acors /= acors.max(axis=0)
+
+    widths, errors = WidthEstimate1D(acors, method=method)
+
+    for i, std in enumerate(stds):
+        width, error = WidthEstimate1D(acors[:, i:i + 1], method=method)
+
+        npt.assert_allclose(widths[i], width[0])
+        npt.assert_allclose(errors[i], error[0])
+
+        npt.assert_allclose(widths[i], std, atol=errors[i])
+
+
+def _reference_width_1D(y, method):
+    '''
+    Per-column width estimates, as computed before the estimation was
+    batched.
+    '''
+
+    from astropy.modeling import models, fitting
+    from scipy.interpolate import interp1d
+
+    x = np.fft.fftfreq(len(y)) * len(y) / 2.0
+    minima = argrelmin(y)[0]
+
+    if method == 'interpolate':
+        interpolator = interp1d(y[0:minima[0] + 1], x[0:minima[0] + 1])
+        return interpolator(np.exp(-1))
+
+    g = models.Gaussian1D(amplitude=y[0], mean=0., stddev=10.,
+                          fixed={'amplitude': True, 'mean': True})
+    fit_g = fitting.LevMarLSQFitter()
+    if minima[0] > 1:
+        xtrans = np.abs(x)[0:minima[0]]
+        yfit = y[0:minima[0]]
+    else:
+        xtrans = np.abs(x)
+        yfit = y
+    output = fit_g(g, xtrans, yfit)
+
+    return np.abs(output.stddev.value) * np.sqrt(2)
+
+
+@pytest.mark.parametrize(('method'), ('fit', 'interpolate'))
+def test_spectral_width_batch_noisy(method):
+    '''
+    Compare the batched estimates on noisy autocorrelation spectra to
+    estimating each column with the previous per-column code.
+    '''
+
+    rng = np.random.RandomState(42)
+
+    stds = [4., 7., 10., 13., 6., 9.]
+
+    model_gauss = np.array([generate_1D_array(std=std, mean=100.)
+                            for std in stds]).T
+    model_gauss += rng.normal(0, 0.05, model_gauss.shape)
+
+    fftx = np.fft.fft(model_gauss, axis=0)
+    fftxs = np.conjugate(fftx)
+    acors = np.fft.ifft((fftx - fftx.mean(axis=0)) *
+                        (fftxs - fftxs.mean(axis=0)), axis=0).real
+    acors /= acors.max(axis=0)
+
+    widths = WidthEstimate1D(acors, method=method)[0]
+
+    ref_widths = np.array([_reference_width_1D(acor, method)
+                           for acor in acors.T])
+
+    if method == 'interpolate':
+        npt.assert_allclose(widths, ref_widths)
+        return
+
+    # The per-column fit can wander off to a zero width on noisy spectra.
+    # Where it converged, the batched fit should agree.
+    converged = ref_widths > 1.
+    assert converged.sum() >= len(stds) - 1
+    npt.assert_allclose(widths[converged], ref_widths[converged], rtol=1e-4)
+
+    # The batched fit should never have a larger residual.
+    x = np.fft.fftfreq(acors.shape[0]) * acors.shape[0] / 2.0
+
+    for acor, width, ref_width in zip(acors.T, widths, ref_widths):
+        first_min = argrelmin(acor)[0][0]
+        end = first_min if first_min > 1 else acor.size
+
+        def ssr(wid):
+            model = acor[0] * np.exp(-x[:end]**2 / wid**2)
+            return np.sum((acor[:end] - model)**2)
+
+        assert ssr(width) <= ssr(ref_width) * (1 + 1e-8)
+
+
+def test_spectral_width_no_minimum():
+    '''
+    A column without a local minimum gives a NaN width when interpolating,
+    instead of raising an error, while the other columns are unaffected.
+    '''
+
+    model_gauss = generate_1D_array(std=10, mean=100.)
+
+    fftx = np.fft.fft(model_gauss)
+    fftxs = np.conjugate(fftx)
+    acor = np.fft.ifft((fftx - fftx.mean()) * (fftxs - fftxs.mean())).real
+    acor /= acor.max()
+
+    # Monotonically decreasing, so there is no local minimum.
+    no_min = np.linspace(1., 0., acor.size)
+
+    acors = np.vstack([acor, no_min]).T
+
+    with pytest.warns(UserWarning, match="No local minimum found"):
+        widths = WidthEstimate1D(acors, method='interpolate')[0]
+
+    assert np.isnan(widths[1])
+    npt.assert_allclose(widths[0], _reference_width_1D(acor, 'interpolate'))
+
+
+@pytest.mark.parametrize(('mean_sub', 'block_size'),
+                         [(False, None), (True, None), (True, 50)])
+def test_var_cov_cube(mean_sub, block_size):
+
+    cube = np.random.RandomState(0).normal(size=(12, 15, 17))
+    cube[cube > 1.8] = np.NaN
+
+    cov = var_cov_cube(cube, mean_sub=mean_sub, block_size=block_size)
+
+    # Compare to the covariance between each pair of channels
+    chans = cube.reshape((12, -1))
+    if mean_sub:
+        chans = chans - np.nanmean(chans, axis=1)[:, np.newaxis]
+
+    for i in range(12):
+        for j in range(12):
+            prod = chans[i] * chans[j]
+            divisor = np.isfinite(prod).sum() - (1 if mean_sub else 0)
+            npt.assert_allclose(cov[i, j], np.nansum(prod) / divisor)
+
+
 @pytest.mark.xfail(raises=Warning)
 def test_PCA_velocity_axis():
     '''
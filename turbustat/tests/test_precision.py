@@ -0,0 +1,80 @@
+# Licensed under an MIT open source license - see LICENSE
+from __future__ import print_function, absolute_import, division
+
+import pytest
+
+import numpy as np
+import numpy.testing as npt
+
+from ..statistics import (PowerSpectrum, VCA, DeltaVariance, Wavelet, Genus,
+                          get_precision, precision_mode)
+from ..statistics.precision import SINGLE_PRECISION_TOLERANCES
+from ..statistics.rfft_to_fft import rfft_to_fft
+from ._testing_data import dataset1
+
+rtol = SINGLE_PRECISION_TOLERANCES['spectrum']
+slope_atol = SINGLE_PRECISION_TOLERANCES['slope']
+
+
+def run_pspec():
+    tester = PowerSpectrum(dataset1["moment0"]).run(fit_2D=False)
+    return tester.ps1D, tester.slope
+
+
+def run_vca():
+    tester = VCA(dataset1["cube"]).run(fit_2D=False)
+    return tester.ps1D, tester.slope
+
+
+def run_delvar():
+    tester = DeltaVariance(dataset1["moment0"]).run()
+    return tester.delta_var, tester.slope
+
+
+def run_wavelet():
+    tester = Wavelet(dataset1["moment0"]).run()
+    return tester.values, tester.slope
+
+
+@pytest.mark.parametrize('run_stat', [run_pspec, run_vca, run_delvar,
+                                      run_wavelet])
+def test_single_precision(run_stat):
+
+    with precision_mode('double'):
+        values, slope = run_stat()
+
+    with precision_mode('single'):
+        values_single, slope_single = run_stat()
+
+    assert get_precision() == 'double'
+
+    npt.assert_allclose(values_single, values, rtol=rtol)
+    npt.assert_allclose(slope_single, slope, atol=slope_atol)
+
+
+def test_single_precision_genus():
+
+    with precision_mode('double'):
+        tester = Genus(dataset1["moment0"]).run()
+
+    with precision_mode('single'):
+        tester_single = Genus(dataset1["moment0"]).run()
+
+        assert tester_single.smoothed_images[0].dtype == np.float32
+
+    npt.assert_allclose(tester_single.genus_stats, tester.genus_stats)
+
+
+def test_single_precision_dtypes():
+
+    img = dataset1["moment0"][0]
+
+    assert rfft_to_fft(img).dtype == np.float64
+
+    with precision_mode('single'):
+        assert rfft_to_fft(img).dtype == np.float32
+        assert rfft_to_fft(img, use_cache=True).dtype == np.float32
+
+        tester = Wavelet(dataset1["moment0"])
+        tester.compute_transform()
+        assert tester.Wf.dtype == np.float32
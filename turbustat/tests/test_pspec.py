@@ -1,12 +1,19 @@
 # Licensed under an MIT open source license - see LICENSE
 from __future__ import print_function, absolute_import, division
 
+import pytest
+
+import numpy as np
 import numpy.testing as npt
 import astropy.units as u
 
 from ..statistics import PowerSpectrum, PSpec_Distance
+from ..statistics.base_pspec2 import fit_pspec_batch
+from ..statistics.psds import pspec, radial_bins, rfft_radial_bins
+from ..statistics.apodizing_kernels import (tukey_window, apodizing_window,
+                                            fast_fft_shape)
 from ._testing_data import \
-    dataset1, dataset2, computed_data, computed_distances
+    dataset1, dataset2, computed_data, computed_distances, make_extended
 
 
 def test_PSpec_method():
@@ -64,3 +71,204 @@ def test_pspec_nonequal_shape():
 
     npt.assert_almost_equal(test.slope, test_T.slope, decimal=7)
     npt.assert_almost_equal(test.slope2D, test_T.slope2D, decimal=3)
+
+
+def test_pspec_batch_fit():
+
+    testers = [PowerSpectrum(data["moment0"]).run(fit_2D=False)
+               for data in [dataset1, dataset2]]
+
+    ps1Ds = np.array([tester.ps1D for tester in testers])
+
+    slopes, slope_errs = \
+        fit_pspec_batch(testers[0].freqs, ps1Ds,
+                        shape=testers[0].ps2D.shape)
+
+    for i, tester in enumerate(testers):
+        npt.assert_allclose(slopes[i], tester.slope)
+        npt.assert_allclose(slope_errs[i], tester.slope_err)
+
+
+@pytest.mark.parametrize('log_break', [False, True])
+def test_pspec_batch_fit_break(log_break):
+
+    # Adding white noise flattens the spectra at high frequencies. The
+    # noiseless image has the break rejected.
+    np.random.seed(0)
+    header = dataset1["moment0"][1]
+
+    imgs = []
+    for noise in [0.03, 0.1, 0.3, 0.]:
+        img = make_extended(128, powerlaw=4.)
+        img = img / img.std() + noise * np.random.normal(size=img.shape)
+        imgs.append(img)
+
+    if log_break:
+        brk = np.log10(0.1) * u.dimensionless_unscaled
+    else:
+        brk = 0.1 / u.pix
+
+    testers = [PowerSpectrum((img, header)).run(fit_2D=False, brk=brk,
+                                                log_break=log_break)
+               for img in imgs]
+
+    ps1Ds = np.array([tester.ps1D for tester in testers])
+
+    slopes, slope_errs, brks, brk_errs = \
+        fit_pspec_batch(testers[0].freqs, ps1Ds, brk=brk,
+                        log_break=log_break, shape=testers[0].ps2D.shape)
+
+    assert testers[0].brk is not None
+    assert testers[-1].brk is None
+
+    for i, tester in enumerate(testers):
+        if tester.brk is None:
+            npt.assert_allclose(slopes[i, 0], tester.slope)
+            npt.assert_allclose(slope_errs[i, 0], tester.slope_err)
+            assert np.isnan(slopes[i, 1])
+            assert np.isnan(brks[i])
+        else:
+            npt.assert_allclose(slopes[i], tester.slope)
+            npt.assert_allclose(slope_errs[i], tester.slope_err)
+            npt.assert_allclose(brks[i].value, tester.brk.value)
+            npt.assert_allclose(brk_errs[i].value, tester.brk_err.value)
+
+
+@pytest.mark.parametrize('shape', [(16, 16), (15, 17)])
+def test_rfft_radial_bins(shape):
+
+    img = np.random.random(shape)
+
+    ps2D = np.abs(np.fft.fftshift(np.fft.fft2(img)))**2
+    freqs, ps1D = pspec(ps2D, logspacing=False)
+
+    bin_freqs, bin_matrix = rfft_radial_bins(shape, logspacing=False)
+
+    ps2D_rfft = np.abs(np.fft.rfft2(img))**2
+
+    npt.assert_allclose(bin_freqs, freqs)
+    npt.assert_allclose(bin_matrix.dot(ps2D_rfft.ravel()), ps1D)
+
+
+@pytest.mark.parametrize(('shape', 'return_freqs'),
+                         [((16, 16), True), ((15, 17), True),
+                          ((16, 16), False), ((15, 17), False)])
+def test_radial_bins(shape, return_freqs):
+
+    surface = np.random.random(shape)
+
+    freqs, ps1D = pspec(surface, logspacing=False,
+                        return_freqs=return_freqs)
+
+    bin_freqs, bin_matrix = radial_bins(shape, logspacing=False,
+                                        return_freqs=return_freqs)
+
+    npt.assert_allclose(bin_freqs, freqs)
+    npt.assert_allclose(bin_matrix.dot(surface.ravel()), ps1D)
+
+
+@pytest.mark.parametrize('alpha', [0., 0.3])
+def test_local_pspec(alpha):
+
+    img, hdr = dataset1["moment0"]
+
+    tester = PowerSpectrum(dataset1["moment0"])
+    tester.compute_local_pspec(16, window_step=5, alpha=alpha, chunk_size=3)
+
+    window = tukey_window((16, 16), alpha=alpha)
+    window /= np.sqrt(np.mean(window**2))
+
+    # Compare a few windows to the power spectrum of the cut-out
+    for i, j in [(0, 0), (1, 2), (2, 1)]:
+        y0 = int(tester.local_window_centers[0][i] - 7.5)
+        x0 = int(tester.local_window_centers[1][j] - 7.5)
+
+        cutout = img[y0:y0 + 16, x0:x0 + 16] * window
+
+        test = PowerSpectrum((cutout, hdr)).run(fit_2D=False)
+
+        npt.assert_allclose(tester.local_ps1D[i, j], test.ps1D)
+        npt.assert_allclose(tester.local_slope_map[i, j], test.slope)
+        npt.assert_allclose(tester.local_slope_err_map[i, j],
+                            test.slope_err)
+        npt.assert_allclose(tester.local_amplitude_map[i, j],
+                            10**test.fit.params[0])
+
+
+def test_apodizing_window_cache():
+
+    window = apodizing_window((12, 15), apodize_kernel='splitcosinebell',
+                              alpha=0.5, beta=0.2)
+
+    assert apodizing_window((12, 15), apodize_kernel='splitcosinebell',
+                            alpha=0.5, beta=0.2) is window
+    assert not window.flags.writeable
+
+    # The centre is not tapered and the corners go to zero.
+    assert window[6, 7] == 1.
+    assert window[0, 0] == 0.
+
+    npt.assert_allclose(apodizing_window((12, 15), apodize_kernel='hanning'),
+                        tukey_window((12, 15), alpha=1.))
+
+
+@pytest.mark.parametrize(('apodize_kernel', 'pad_to_fast_len'),
+                         [(None, True), ('tukey', False),
+                          ('hanning', True), ('splitcosinebell', False)])
+def test_PSpec_apodize_pad(apodize_kernel, pad_to_fast_len):
+
+    img = dataset1["moment0"][0][:, :-3]
+
+    tester = PowerSpectrum((img, dataset1["moment0"][1]))
+    tester.compute_pspec(apodize_kernel=apodize_kernel, alpha=0.4, beta=0.1,
+                         pad_to_fast_len=pad_to_fast_len)
+
+    if apodize_kernel is not None:
+        window = apodizing_window(img.shape, apodize_kernel=apodize_kernel,
+                                  alpha=0.4, beta=0.1)
+        img = img * window / np.sqrt(np.mean(window**2))
+
+    shape = fast_fft_shape(img.shape) if pad_to_fast_len else img.shape
+
+    ps2D = np.abs(np.fft.fftshift(np.fft.fft2(img, s=shape)))**2
+
+    assert tester.ps2D.shape == shape
+    npt.assert_allclose(tester.ps2D, ps2D)
+
+
+def test_PSpec_apodize_power():
+
+    # The window is normalized, so the power of white noise is kept.
+    img = np.random.RandomState(0).normal(size=(64, 64))
+    hdr = dataset1["moment0"][1]
+
+    tester = PowerSpectrum((img, hdr))
+    tester.compute_pspec()
+    ps2D = tester.ps2D
+
+    for apodize_kernel in ['tukey', 'hanning', 'splitcosinebell']:
+        tester = PowerSpectrum((img, hdr))
+        tester.compute_pspec(apodize_kernel=apodize_kernel, alpha=0.4)
+
+        npt.assert_allclose(tester.ps2D.mean(), ps2D.mean(), rtol=0.1)
+
+
+def test_local_pspec_padded():
+
+    img, hdr = dataset1["moment0"]
+
+    tester = PowerSpectrum(dataset1["moment0"])
+    tester.compute_local_pspec(14, window_step=7, apodize_kernel='hanning',
+                               pad_to_fast_len=True)
+
+    window = apodizing_window((14, 14), apodize_kernel='hanning')
+    window = window / np.sqrt(np.mean(window**2))
+
+    cutout = img[7:21, 14:28] * window
+
+    test = PowerSpectrum((cutout, hdr)).run(fit_2D=False,
+                                            pad_to_fast_len=True)
+
+    npt.assert_allclose(tester.local_freqs, test.freqs)
+    npt.assert_allclose(tester.local_ps1D[1, 2], test.ps1D)
+    npt.assert_allclose(tester.local_slope_map[1, 2], test.slope)
@@ -10,6 +10,7 @@ import astropy.units as u
 import os
 
 from ..statistics import SCF, SCF_Distance
+from ..statistics.stats_utils import FourierShifter
 from ._testing_data import \
     dataset1, dataset2, computed_data, computed_distances
 
@@ -95,6 +96,91 @@ def test_SCF_noninteger_shift():
     tester_nonint.run()
 
 
+def test_fourier_shifter():
+
+    arr = np.random.RandomState(0).normal(size=(8, 16, 15))
+    arr[:, 3, 4] = np.NaN
+
+    for axis in [1, 2]:
+        shifter = FourierShifter(arr, axis=axis)
+
+        for shift in [-2.5, 0.3, 1.5]:
+            # Compare to shifting with the full FFT
+            mask = ~np.isfinite(arr)
+            freqs = np.fft.fftfreq(arr.shape[axis])
+            freq_shape = [1] * 3
+            freq_shape[axis] = freqs.size
+            phase = np.exp(-2j * np.pi * freqs.reshape(freq_shape) * shift)
+
+            expected = np.fft.ifft(np.fft.fft(np.where(mask, 0., arr),
+                                              axis=axis) * phase,
+                                   axis=axis).real
+            mask_shift = np.fft.ifft(np.fft.fft(mask.astype(float),
+                                                axis=axis) * phase,
+                                     axis=axis).real > 0.5
+            expected[mask_shift] = np.NaN
+
+            npt.assert_allclose(shifter.shift(shift), expected, atol=1e-12)
+
+
+def test_SCF_noninteger_shift_njobs():
+
+    rolls = np.array([-1.5, 0, 1.5]) * u.pix
+    tester = SCF(dataset1["cube"], roll_lags=rolls)
+    tester.compute_surface(boundary='cut')
+
+    tester2 = SCF(dataset1["cube"], roll_lags=rolls)
+    tester2.compute_surface(boundary='cut', n_jobs=2)
+
+    npt.assert_allclose(tester.scf_surface, tester2.scf_surface)
+
+
+def test_SCF_slope_map():
+
+    data = dataset1["cube"][0]
+    size = min(data.shape[1:])
+    data = data[:, :size, :size]
+
+    # A single tile covering the map is the usual SCF.
+    for boundary in ['continuous', 'cut']:
+        tester = SCF([data, dataset1["cube"][1]], size=5)
+        tester.run(boundary=boundary, fit_2D=False)
+
+        tester.compute_slope_map(size, boundary=boundary)
+
+        assert tester.slope_map.shape == (1, 1)
+        npt.assert_allclose(tester.tile_surfaces[0, 0], tester.scf_surface)
+        npt.assert_allclose(tester.slope_map[0, 0], tester.slope)
+        npt.assert_allclose(tester.slope_map_err[0, 0], tester.slope_err)
+
+    # Compare one tile to the values computed directly. As in
+    # compute_surface, each pixel is paired with the shifted cube offset by
+    # the shift, and pairs that leave the map are excluded.
+    tile_size = 8
+    tester.compute_slope_map(tile_size, tile_step=4, boundary='cut',
+                             n_jobs=2)
+
+    i0, j0 = tester.tile_centers[0][1] - 3.5, tester.tile_centers[1][2] - 3.5
+    tile = (slice(int(i0), int(i0) + tile_size),
+            slice(int(j0), int(j0) + tile_size))
+
+    posn = np.arange(size)
+
+    for i, dx in enumerate(range(-2, 3)):
+        for j, dy in enumerate(range(-2, 3)):
+            shifted = np.roll(np.roll(data, dx, axis=1), dy, axis=2)
+            paired = np.roll(np.roll(shifted, dx, axis=1), dy, axis=2)
+            values = np.nansum((data - paired)**2, axis=0) / \
+                (np.nansum(data**2, axis=0) + np.nansum(paired**2, axis=0))
+
+            valid = ((posn - dx >= 0) & (posn - dx < size))[:, np.newaxis] & \
+                ((posn - dy >= 0) & (posn - dy < size))
+            values[~valid] = np.NaN
+
+            npt.assert_allclose(tester.tile_surfaces[1, 2, i, j],
+                                1 - np.sqrt(np.nanmean(values[tile])))
+
+
 def test_SCF_nonpixelunit_shift():
     # Not testing against anything, just make sure it runs w/o issue.
     rolls = np.array([-4.5, -3.0, -1.5, 0, 1.5, 3.0, 4.5]) * u.pix
@@ -69,6 +69,26 @@ def test_moments_nonperiodic():
                        computed_data['skewness_nonper_val'])
 
 
+@pytest.mark.parametrize('periodic', [True, False])
+def test_moments_unweighted(periodic):
+
+    tester = StatMoments(dataset1["moment0"], radius=4 * u.pix)
+    tester.array_moments()
+    tester.compute_spatial_distrib(periodic=periodic)
+
+    ones = np.ones_like(dataset1["moment0"][0])
+    tester2 = StatMoments(dataset1["moment0"], weights=ones,
+                          radius=4 * u.pix)
+    tester2.array_moments()
+    tester2.compute_spatial_distrib(periodic=periodic)
+
+    npt.assert_allclose(tester.kurtosis, tester2.kurtosis)
+    npt.assert_allclose(tester.mean_array, tester2.mean_array)
+    npt.assert_allclose(tester.variance_array, tester2.variance_array)
+    npt.assert_allclose(tester.skewness_array, tester2.skewness_array)
+    npt.assert_allclose(tester.kurtosis_array, tester2.kurtosis_array)
+
+
 def test_moment_distance():
     tester_dist = \
         StatMoments_Distance(dataset1["moment0"],
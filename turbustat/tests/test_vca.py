@@ -8,7 +8,9 @@ import numpy as np
 import astropy.units as u
 
 from ..statistics import VCA, VCA_Distance
-from ..statistics.vca_vcs.slice_thickness import spectral_regrid_cube
+from ..statistics.vca_vcs.slice_thickness import (spectral_regrid_cube,
+                                                  spectral_regrid_array)
+from ..statistics.apodizing_kernels import apodizing_window, fast_fft_shape
 from ..io.input_base import to_spectral_cube
 from ._testing_data import \
     dataset1, dataset2, computed_data, computed_distances
@@ -96,3 +98,147 @@ def test_spectral_regrid(channel_width):
 
     npt.assert_allclose(sc_pix_regrid.header['CDELT3'],
                         sc_spec_regrid.header["CDELT3"])
+
+
+@pytest.mark.parametrize("channel_width",
+                         [2, 3.5] * u.pix)
+def test_spectral_regrid_array(channel_width):
+
+    cube = dataset1['cube'][0].copy()
+    cube[:3, 2, 3] = np.NaN
+
+    sc_cube = to_spectral_cube(cube, dataset1['cube'][1])
+    sc_regrid = spectral_regrid_cube(sc_cube, channel_width)
+
+    regrid, regrid_hdr = spectral_regrid_array(cube, dataset1['cube'][1],
+                                               channel_width)
+
+    npt.assert_allclose(regrid, sc_regrid.filled_data[:].value,
+                        atol=1e-10)
+
+    regrid_axis = to_spectral_cube(regrid, regrid_hdr).spectral_axis
+    npt.assert_allclose(regrid_axis.to(u.m / u.s).value,
+                        sc_regrid.spectral_axis.to(u.m / u.s).value)
+
+
+def test_spectral_regrid_array_cd_matrix():
+    '''
+    Headers with a CD matrix give the same spectral axis as with CDELT.
+    '''
+
+    cube, hdr = dataset1['cube']
+
+    cd_hdr = hdr.copy()
+    for i in range(1, 4):
+        cd_hdr['CD{0}_{0}'.format(i)] = cd_hdr['CDELT{}'.format(i)]
+        del cd_hdr['CDELT{}'.format(i)]
+
+    channel_width = 4 * np.abs(hdr['CDELT3']) * u.m / u.s
+
+    regrid, regrid_hdr = spectral_regrid_array(cube, hdr, channel_width)
+    cd_regrid, cd_regrid_hdr = spectral_regrid_array(cube, cd_hdr,
+                                                     channel_width)
+
+    npt.assert_allclose(cd_regrid, regrid)
+
+    assert 'CDELT3' not in cd_regrid_hdr
+
+    regrid_axis = to_spectral_cube(regrid, regrid_hdr).spectral_axis
+    cd_regrid_axis = to_spectral_cube(cd_regrid, cd_regrid_hdr).spectral_axis
+
+    npt.assert_allclose(cd_regrid_axis.to(u.m / u.s).value,
+                        regrid_axis.to(u.m / u.s).value)
+
+
+def test_VCA_apodize_pad():
+
+    cube = dataset1["cube"][0][:, :-3]
+
+    tester = VCA((cube, dataset1["cube"][1]))
+    tester.compute_pspec(apodize_kernel='tukey', alpha=0.4,
+                         pad_to_fast_len=True)
+
+    window = apodizing_window(cube.shape[1:], apodize_kernel='tukey',
+                              alpha=0.4)
+    cube = cube * window / np.sqrt(np.mean(window**2))
+    shape = cube.shape[:1] + fast_fft_shape(cube.shape[1:])
+
+    ps2D = (np.abs(np.fft.fftshift(np.fft.fftn(cube, s=shape)))**2).sum(0)
+
+    npt.assert_allclose(tester.ps2D, ps2D)
+
+
+def _tophat_channels(cube, factor):
+    '''
+    Average the channels over thick channels of `factor` channels, centered
+    within the spectral range. Channels partly covered by a thick channel
+    are weighted by the overlap.
+    '''
+
+    nchan = cube.shape[0]
+    num_chan = int(nchan // factor)
+    offset = 0.5 * (nchan - num_chan * factor)
+
+    lower = offset + factor * np.arange(num_chan)[:, np.newaxis]
+    upper = lower + factor
+    chans = np.arange(nchan)[np.newaxis]
+
+    weights = np.clip(np.minimum(upper, chans + 1) -
+                      np.maximum(lower, chans), 0, None)
+
+    return np.tensordot(weights, cube, axes=1) / factor
+
+
+def test_VCA_sweep_channel_widths():
+
+    tester = VCA(dataset1["cube"])
+    tester.run(fit_2D=False)
+
+    orig_width = np.abs(dataset1['cube'][1]["CDELT3"]) * u.m / u.s
+
+    slopes, slope_errs = \
+        tester.sweep_channel_widths(u.Quantity([orig_width, 2 * orig_width]))
+
+    # The original channel width gives the usual VCA
+    npt.assert_allclose(tester.sweep_ps1D[0], tester.ps1D)
+    npt.assert_allclose(slopes[0], tester.slope)
+    npt.assert_allclose(slope_errs[0], tester.slope_err)
+
+    # Compare to averaging pairs of channels. The cube has an even number
+    # of channels, so none are trimmed.
+    cube = dataset1["cube"][0]
+    num_chan = cube.shape[0] // 2
+    thick_cube = cube.reshape((num_chan, 2) + cube.shape[1:]).mean(1)
+
+    npt.assert_allclose(_tophat_channels(cube, 2), thick_cube)
+
+    thick_tester = VCA([thick_cube, dataset1["cube"][1]])
+    thick_tester.run(fit_2D=False)
+
+    npt.assert_allclose(tester.sweep_ps1D[1], thick_tester.ps1D)
+    npt.assert_allclose(slopes[1], thick_tester.slope)
+
+
+@pytest.mark.parametrize("factor", [2., 2.5])
+def test_VCA_sweep_channel_widths_fractional(factor):
+    '''
+    With an odd number of channels or a non-integer width, the thick channels
+    start part way through a channel. Compare to averaging the channels with
+    the fractional edges weighted explicitly.
+    '''
+
+    cube = dataset1["cube"][0][:-1]
+
+    tester = VCA([cube, dataset1["cube"][1]])
+    tester.sweep_channel_widths(u.Quantity([factor], u.pix))
+
+    thick_cube = _tophat_channels(cube, factor)
+
+    # The first thick channel starts part way through a channel.
+    offset = 0.5 * (cube.shape[0] - thick_cube.shape[0] * factor)
+    assert offset % 1 != 0
+
+    thick_tester = VCA([thick_cube, dataset1["cube"][1]])
+    thick_tester.run(fit_2D=False)
+
+    npt.assert_allclose(tester.sweep_ps1D[0], thick_tester.ps1D)
@@ -61,3 +61,25 @@ def test_VCS_method_fitlimits():
     tester2.run(high_cut=high_cut, low_cut=low_cut)
 
     npt.assert_allclose(tester.slope, tester2.slope, atol=0.02)
+
+
+@pytest.mark.parametrize(('block_size', 'n_jobs'), [(None, 1), (37, 2)])
+def test_VCS_spectral_fft(block_size, n_jobs):
+    '''
+    The spectral power summed over pixels should match summing the power of
+    the 3D FFT over the spatial frequencies.
+    '''
+
+    cube = dataset1['cube'][0].copy()
+    cube[:, 3, 4] = np.NaN
+
+    tester = VCS([cube, dataset1['cube'][1]])
+    tester.compute_pspec(block_size=block_size, n_jobs=n_jobs)
+
+    cube[np.isnan(cube)] = 0.
+    good_pixel_count = np.sum(cube.max(axis=0) != 0)
+
+    ps1D = np.sum(np.abs(np.fft.fftn(cube))**2, axis=(1, 2)) / \
+        good_pixel_count
+
+    npt.assert_allclose(tester.ps1D, ps1D)